@@ -2,19 +2,13 @@ import os
 import models
 from os import getenv
 from dotenv import load_dotenv
-import io
 import requests
 import json
 import boto3
 from llama_index.llms.openrouter import OpenRouter
 from llama_index.core.llms import ChatMessage
-import pytesseract
-from PIL import Image
-import fitz  # PyMuPDF
-import numpy as np
-import cv2
 
-from weaviate.classes.query import Filter
+from weaviate.classes.config import Configure, DataType, Property
 
 # from langchain_core.chains import LLMChain
 from llama_index.core import (
@@ -25,6 +19,8 @@ from llama_index.core import (
     load_index_from_storage,
     Document,
 )
+from llama_index.core.schema import QueryBundle
+from llama_index.core.vector_stores import ExactMatchFilter, MetadataFilters
 from llama_index.vector_stores.weaviate import WeaviateVectorStore
 from llama_index.embeddings.huggingface import HuggingFaceEmbedding
 from llama_index.core.node_parser import TokenTextSplitter
@@ -32,18 +28,34 @@ from llama_index.core.node_parser import SimpleNodeParser
 from llama_index.llms.ollama import Ollama
 from typing import List, Optional, Dict, Any
 import weaviate
-from weaviate.util import generate_uuid5
 from PyPDF2 import PdfReader
 import pymupdf
 import pymupdf4llm
-import pdfplumber
 import logging
 from pathlib import Path
-import tempfile
 import asyncio
+import threading
+import time
 from datetime import datetime, timezone
 from botocore.exceptions import ClientError
 from exa_search import ExaSearch
+from pdf_extractor import PDFExtractor
+from dedup import chunk_owners, resolve_vector_doc_id, count_linked_documents
+from embedded_store import EmbeddedCentroids, EmbeddedChunkStore
+from embedding_cache import CachedEmbedding
+from http_clients import get_async_http_client, get_http_client
+from document_centroids import DocumentCentroids, centroid
+from answer_cache import SEMANTIC_CACHE_ENABLED, get_answer_cache
+from llm_router import LLMRouter
+from memory_cache import LRUCache
+from summarizer import EventCallback, Summarizer
+from tenants import TENANT_CLASS_NAME, WEAVIATE_MULTI_TENANCY, TenantManager
+from text_cleaner import clean_for_summary, merge_overlapping_chunks
+from vector_index import VectorIndexSettings
+from vector_store import VECTOR_BACKEND, SearchScope, WeaviateChunkStore
+from progress import ProgressPublisher
+from embedding_service import BatchedEmbedding, EmbeddingBatcher
+from onnx_embedding import OnnxEmbedding
 from database import Base, engine, sessionLocal
 import re
 
@@ -52,6 +64,58 @@ load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+# Embedding backend: "huggingface" (PyTorch), "onnx" or "onnx-int8"
+EMBED_BACKEND = os.getenv("EMBED_BACKEND", "huggingface")
+# Ready query engines kept per (doc_id, top_k, mode)
+QUERY_ENGINE_CACHE_SIZE = int(os.getenv("QUERY_ENGINE_CACHE_SIZE", 256))
+# Documents picked by centroid similarity before a library-wide chunk search
+LIBRARY_CANDIDATE_DOCS = int(os.getenv("LIBRARY_CANDIDATE_DOCS", 8))
+# The OpenRouter reasoning model's first-token timeout, in seconds
+LLM_PRIMARY_FIRST_TOKEN_TIMEOUT = float(os.getenv("LLM_PRIMARY_FIRST_TOKEN_TIMEOUT", 90))
+
+
+def create_chunk_collection(
+    client: weaviate.WeaviateClient,
+    class_name: str,
+    multi_tenancy: bool = False,
+    vector_index: Optional[VectorIndexSettings] = None,
+):
+    """
+    Create the chunk collection, optionally with one tenant per user.
+    HNSW and quantization settings default to the WEAVIATE_* environment.
+    """
+    vector_index = vector_index or VectorIndexSettings()
+    multi_tenancy_config = None
+    if multi_tenancy:
+        # Inserts create missing tenants and requests wake idle ones
+        multi_tenancy_config = Configure.multi_tenancy(
+            enabled=True,
+            auto_tenant_creation=True,
+            auto_tenant_activation=True,
+        )
+    return client.collections.create(
+        name=class_name,
+        vectorizer_config=Configure.Vectorizer.none(),
+        vector_index_config=vector_index.create_config(),
+        multi_tenancy_config=multi_tenancy_config,
+        properties=[
+            Property(
+                name="content",
+                data_type=DataType.TEXT,
+                index_filterable=True,
+                index_searchable=True,
+            ),
+            Property(name="doc_id", data_type=DataType.TEXT, index_filterable=True),
+            Property(name="source", data_type=DataType.TEXT),
+            Property(name="bucket", data_type=DataType.TEXT),
+            Property(name="key", data_type=DataType.TEXT),
+            Property(name="timestamp", data_type=DataType.DATE),
+            Property(name="user_id", data_type=DataType.TEXT),
+            Property(name="upload_date", data_type=DataType.TEXT),
+            Property(name="chunk_id", data_type=DataType.NUMBER),
+        ],
+    )
+
 
 class RAGPipeline:
 
@@ -61,6 +125,20 @@ class RAGPipeline:
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         """Async context manager exit"""
+        self.close()
+
+    def close(self) -> None:
+        """Close the chunk store, Weaviate client connection and extraction workers"""
+        if hasattr(self, "pdf_extractor"):
+            self.pdf_extractor.shutdown()
+        if hasattr(self, "embedding_service"):
+            self.embedding_service.shutdown()
+        if hasattr(self, "embed_model"):
+            logger.info(f"Embedding cache stats: {self.embed_model.stats()}")
+        if hasattr(self, "query_engines"):
+            logger.info(f"Query engine cache stats: {self.query_engines.stats()}")
+        if hasattr(self, "store"):
+            self.store.close()
         try:
             if hasattr(self, "weaviate_client") and self.weaviate_client is not None:
                 logger.info("Closing Weaviate client connection")
@@ -73,6 +151,7 @@ class RAGPipeline:
         weaviate_url: str = "http://localhost:5000",
         class_name: str = "PDFDocument",
         embed_model: str = "sentence-transformers/all-MiniLM-L6-v2",
+        embed_backend: str = EMBED_BACKEND,
         chunk_size: int = 1024,
         chunk_overlap: int = 50,
         aws_access_key_id: Optional[str] = None,
@@ -81,17 +160,28 @@ class RAGPipeline:
         base_model: str = "google/flan-t5-small",
         lora_adapter_path: str = "./summarization-lora-finetuned/final_model",
         openrouter_model: str = "nvidia/llama-3.1-nemotron-ultra-253b-v1:free",
+        multi_tenancy: bool = WEAVIATE_MULTI_TENANCY,
+        vector_backend: str = VECTOR_BACKEND,
     ):
         """
         Initialize the RAG Pipeline with Weaviate, LlamaIndex, and MiniLM.
+        With vector_backend="embedded" chunks are kept in-process instead
+        and no Weaviate server is needed.
         """
         logger.info("Initializing RAGPipeline...")
 
-        self.class_name = class_name
+        self.vector_backend = vector_backend
+        # Tenant mode keeps each user's chunks in their own tenant of a
+        # separate multi-tenant collection
+        self.multi_tenancy = multi_tenancy and vector_backend == "weaviate"
+        self.class_name = TENANT_CLASS_NAME if self.multi_tenancy else class_name
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
         self.openrouter_model = openrouter_model
 
+        # Guards reconnects of the shared Weaviate client across concurrent tasks
+        self._weaviate_lock = threading.Lock()
+
         # Initialize AWS S3 client
         self.s3_client = boto3.client(
             "s3",
@@ -100,31 +190,51 @@ class RAGPipeline:
             region_name=aws_region,
         )
 
-        # Initialize Weaviate client (v4)
-        client = weaviate.connect_to_local(host="127.0.0.1", port=5000, grpc_port=50051)
-        self.weaviate_client = client
-        # Create schema if it doesn't exist
-        self.ensure_schema()
+        self.weaviate_client = None
+        self.tenants = None
+        if vector_backend == "embedded":
+            self.store = EmbeddedChunkStore()
+            # Per-document centroids for library-wide search
+            self.centroids = EmbeddedCentroids(self.store)
+        elif vector_backend == "weaviate":
+            # Initialize Weaviate client (v4)
+            client = weaviate.connect_to_local(
+                host="127.0.0.1", port=5000, grpc_port=50051
+            )
+            self.weaviate_client = client
+            # Create schema if it doesn't exist
+            self.ensure_schema()
+            if self.multi_tenancy:
+                self.tenants = TenantManager(
+                    lambda: self.weaviate_client, self.class_name
+                )
+                logger.info(f"Storing chunks per user in tenants of {self.class_name}")
+            self.store = WeaviateChunkStore(
+                lambda: self.weaviate_client, self.class_name, self.tenants
+            )
+            # Per-document centroids for library-wide search
+            self.centroids = DocumentCentroids(lambda: self.weaviate_client)
+            self.centroids.ensure_schema()
+        else:
+            raise ValueError(f"Unknown vector backend: {vector_backend}")
+
+        self.pdf_extractor = PDFExtractor()
 
-        # Initialize embedding model
-        self.embed_model = HuggingFaceEmbedding(
-            model_name=embed_model, embed_batch_size=32
+        # Initialize embedding model behind the persistent embedding cache
+        self.embed_model = CachedEmbedding(
+            self._create_embed_backend(embed_backend, embed_model)
         )
+        # Coalesces embeds from concurrent queries and ingests into shared
+        # model batches; query engines reach it through Settings.embed_model
+        self.embedding_service = EmbeddingBatcher(self.embed_model)
 
         # Initialize LLM with fallback options
         self._setup_llm()
-
-        # Initialize vector store
-        self.vector_store = WeaviateVectorStore(
-            weaviate_client=self.weaviate_client,
-            class_name=self.class_name,
-            text_key="content",
-            metadata_key="metadata",
-        )
+        self.summarizer = Summarizer(self.llm)
 
         #  service context
         Settings.llm = self.llm
-        Settings.embed_model = self.embed_model
+        Settings.embed_model = BatchedEmbedding(self.embedding_service)
         Settings.node_parser = SimpleNodeParser.from_defaults(
             chunk_size=self.chunk_size, chunk_overlap=self.chunk_overlap
         )
@@ -136,7 +246,37 @@ class RAGPipeline:
         #     ),
         # )
 
-        # Initialize the index
+        # Query engines are built once per (doc_id, top_k, mode) on the
+        # shared index and reused by later queries. LlamaIndex's Weaviate
+        # store cannot address tenants or the embedded store, so those
+        # query through the chunk store instead
+        self.query_engines = LRUCache(QUERY_ENGINE_CACHE_SIZE)
+        self.index = None
+        if self._uses_index:
+            self._build_index()
+
+        self.exa_search = ExaSearch()
+
+    async def cache_stats(self) -> dict:
+        """Hit rates and sizes of this process's caches and the shared answer cache"""
+        stats = {
+            "embeddings": await asyncio.to_thread(self.embed_model.stats),
+            "query_engines": self.query_engines.stats(),
+        }
+        if SEMANTIC_CACHE_ENABLED:
+            try:
+                stats["answers"] = await get_answer_cache().stats()
+            except Exception as e:
+                logger.warning(f"Failed to read answer cache stats: {str(e)}")
+        return stats
+
+    @property
+    def _uses_index(self) -> bool:
+        """Whether queries go through the LlamaIndex index rather than the chunk store"""
+        return self.vector_backend == "weaviate" and not self.multi_tenancy
+
+    def _build_index(self):
+        """(Re)build the vector store and index on the current Weaviate client"""
         self.vector_store = WeaviateVectorStore(
             weaviate_client=self.weaviate_client,
             class_name=self.class_name,
@@ -144,7 +284,6 @@ class RAGPipeline:
             metadata_key="metadata",
         )
 
-        # Initialize the index
         try:
             self.index = VectorStoreIndex(
                 [],
@@ -154,82 +293,141 @@ class RAGPipeline:
             logger.error(f"Error initializing index: {str(e)}")
             raise
 
-        self.exa_search = ExaSearch()
+        # Cached engines hold the previous client
+        self.query_engines.clear()
+
+    def _get_query_engine(
+        self, doc_id: Optional[str], top_k: int, mode: str = "hybrid"
+    ):
+        """Query engine for a document filter, top_k and mode, from the LRU"""
+
+        def build():
+            logger.info(
+                f"Building query engine for doc_id={doc_id}, top_k={top_k}, mode={mode}"
+            )
+            filters = None
+            if doc_id:
+                filters = MetadataFilters(
+                    filters=[ExactMatchFilter(key="doc_id", value=doc_id)]
+                )
+            return self.index.as_query_engine(
+                similarity_top_k=top_k,
+                vector_store_query_mode=mode,
+                filters=filters,
+                llm=self.llm,
+            )
+
+        return self.query_engines.get_or_create((doc_id, top_k, mode), build)
+
+    async def _chunk_owner(self, doc_id: str, user_id: Optional[str] = None):
+        """
+        User whose partition holds a document's chunks: `user_id` when the
+        caller knows it, else the PDF's uploader. Only used by stores
+        partitioned per user (Weaviate tenants).
+        """
+        if not self.store.scoped_by_user or user_id:
+            return user_id
+        owners = await asyncio.to_thread(chunk_owners, [doc_id])
+        return owners.get(str(doc_id))
+
+    async def _scopes(self, doc_ids: List[str]) -> List[SearchScope]:
+        """Search scopes covering the given vector doc ids"""
+        if not self.store.scoped_by_user:
+            return [SearchScope(doc_ids=doc_ids)]
+        by_owner: Dict[str, List[str]] = {}
+        owners = await asyncio.to_thread(chunk_owners, doc_ids)
+        for doc_id in doc_ids:
+            if doc_id in owners:
+                by_owner.setdefault(owners[doc_id], []).append(doc_id)
+        return [
+            SearchScope(doc_ids=ids, user_id=owner) for owner, ids in by_owner.items()
+        ]
+
+    async def _search(
+        self,
+        query_text: str,
+        query_embedding: List[float],
+        scopes: List[SearchScope],
+        top_k: int,
+        alpha: float,
+    ) -> List[Dict[str, Any]]:
+        """
+        Hybrid search over chunks in any of the scopes, ranked with scores.
+        Stores partitioned per user search each scope concurrently and merge
+        by score; fusion scores are normalized per search, so that merged
+        order is approximate.
+        """
+        if not self.store.scoped_by_user or len(scopes) <= 1:
+            return await asyncio.to_thread(
+                self.store.search, query_text, query_embedding, scopes, top_k, alpha
+            )
+        searches = [
+            asyncio.to_thread(
+                self.store.search, query_text, query_embedding, [scope], top_k, alpha
+            )
+            for scope in scopes
+        ]
+        hits = [hit for result in await asyncio.gather(*searches) for hit in result]
+        hits.sort(key=lambda hit: hit["score"], reverse=True)
+        return hits[:top_k]
+
+    def _create_embed_backend(self, backend: str, model_name: str):
+        """Build the embedding model for the selected backend"""
+        logger.info(f"Using {backend} embedding backend for {model_name}")
+        if backend == "huggingface":
+            return HuggingFaceEmbedding(model_name=model_name, embed_batch_size=32)
+        if backend in ("onnx", "onnx-int8"):
+            return OnnxEmbedding(
+                model_name=model_name,
+                quantized=backend == "onnx-int8",
+                embed_batch_size=32,
+            )
+        raise ValueError(f"Unknown embedding backend: {backend}")
 
     def ensure_schema(self) -> None:
         """Create Weaviate schema if it doesn't exist"""
         try:
-            # Check if collection exists
-            collection = self.weaviate_client.collections.get(self.class_name)
-            if collection is None:
-                # Create collection with properties
-                collection = self.weaviate_client.collections.create(
-                    name=self.class_name,
-                    vectorizer_config=weaviate.config.Configure.Vectorizer.none(),
-                    properties=[
-                        weaviate.properties.Property(
-                            name="content",
-                            data_type=weaviate.properties.DataType.TEXT,
-                            indexing=weaviate.config.Configure.Property.Indexing(
-                                filterable=True,
-                                searchable=True,
-                            ),
-                        ),
-                        weaviate.properties.Property(
-                            name="doc_id",
-                            data_type=weaviate.properties.DataType.TEXT,
-                            indexing=weaviate.config.Configure.Property.Indexing(
-                                filterable=True,
-                            ),
-                        ),
-                        weaviate.properties.Property(
-                            name="source",
-                            data_type=weaviate.properties.DataType.TEXT,
-                        ),
-                        weaviate.properties.Property(
-                            name="bucket",
-                            data_type=weaviate.properties.DataType.TEXT,
-                        ),
-                        weaviate.properties.Property(
-                            name="key",
-                            data_type=weaviate.properties.DataType.TEXT,
-                        ),
-                        weaviate.properties.Property(
-                            name="timestamp",
-                            data_type=weaviate.properties.DataType.DATE,
-                        ),
-                        weaviate.properties.Property(
-                            name="user_id",
-                            data_type=weaviate.properties.DataType.TEXT,
-                        ),
-                        weaviate.properties.Property(
-                            name="upload_date",
-                            data_type=weaviate.properties.DataType.TEXT,
-                        ),
-                        weaviate.properties.Property(
-                            name="chunk_id",
-                            data_type=weaviate.properties.DataType.NUMBER,
-                        ),
-                    ],
+            # collections.get() returns a handle whether or not it exists
+            if not self.weaviate_client.collections.exists(self.class_name):
+                create_chunk_collection(
+                    self.weaviate_client, self.class_name, self.multi_tenancy
                 )
                 logger.info(f"Created Weaviate collection {self.class_name}")
+                return
+
+            try:
+                VectorIndexSettings().apply(
+                    self.weaviate_client.collections.get(self.class_name)
+                )
+            except Exception as e:
+                # The existing index keeps working with its current settings
+                logger.warning(
+                    f"Could not update vector index of {self.class_name}: {str(e)}"
+                )
         except Exception as e:
             logger.error(f"Error creating Weaviate schema: {str(e)}")
             raise
 
-    async def delete_document(self, doc_id: str) -> bool:
+    async def delete_document(self, doc_id: str, user_id: Optional[str] = None) -> bool:
         try:
-            # Ensure Weaviate is connected
-            self._ensure_weaviate_connected()
+            await asyncio.to_thread(self._ensure_weaviate_connected)
+            # The document leaves its owner's library even if its chunks stay
+            await asyncio.to_thread(self.centroids.delete, doc_id)
 
-            # Get the collection
-            collection = self.weaviate_client.collections.get(self.class_name)
-
-            # Create the v4-compatible filter
-            filters = Filter.by_property("doc_id").equal(doc_id)
+            # Chunks shared with deduplicated uploads must outlive this document
+            linked = await asyncio.to_thread(count_linked_documents, doc_id)
+            if linked:
+                logger.info(
+                    f"Keeping vectors for {doc_id}: still used by {linked} linked documents"
+                )
+                return True
 
-            # Delete objects matching the filter
-            collection.data.delete_many(where=filters)
+            # Delete every chunk of the document
+            owner = await self._chunk_owner(doc_id, user_id)
+            await asyncio.to_thread(self.store.delete, doc_id, owner)
+            self.query_engines.pop_where(lambda key: key[0] == doc_id)
+            if SEMANTIC_CACHE_ENABLED:
+                await get_answer_cache().invalidate(doc_id)
 
             logger.info(f"Deleted document {doc_id} from vector store")
             return True
@@ -253,70 +451,11 @@ class RAGPipeline:
             raise
 
     def _extract_text_from_pdf_bytes(self, pdf_bytes: bytes) -> str:
-        """Extract text content from PDF bytes using pdfplumber and OCR for images."""
+        """Extract text content from PDF bytes in a single in-memory pass."""
         try:
             logger.info(f"Starting PDF text extraction from {len(pdf_bytes)} bytes")
 
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as temp_file:
-                temp_file.write(pdf_bytes)
-                temp_file_path = temp_file.name
-
-            # Initialize text content
-            text_content = []
-
-            with pdfplumber.open(temp_file_path) as pdf:
-                for page_num, page in enumerate(pdf.pages):
-                    page_text = page.extract_text()
-                    if page_text:
-                        text_content.append(f"Page {page_num + 1}:\n{page_text}\n\n")
-
-            #  Extract and OCR images using PyMuPDF
-            pdf_document = fitz.open(temp_file_path)
-            for page_num in range(len(pdf_document)):
-                page = pdf_document[page_num]
-
-                image_list = page.get_images(full=True)
-
-                for img_index, img in enumerate(image_list):
-                    try:
-                        xref = img[0]
-                        base_image = pdf_document.extract_image(xref)
-                        image_bytes = base_image["image"]
-
-                        image = Image.open(io.BytesIO(image_bytes))
-
-                        cv_image = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
-
-                        gray = cv2.cvtColor(cv_image, cv2.COLOR_BGR2GRAY)
-
-                        gray = cv2.threshold(
-                            gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU
-                        )[1]
-
-                        kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (3, 3))
-                        gray = cv2.dilate(gray, kernel, iterations=1)
-
-                        pil_image = Image.fromarray(gray)
-
-                        ocr_text = pytesseract.image_to_string(
-                            pil_image, config="--psm 6 --oem 3"
-                        )
-
-                        if ocr_text.strip():
-                            text_content.append(
-                                f"Page {page_num + 1} - Image {img_index + 1} (OCR):\n{ocr_text}\n\n"
-                            )
-
-                    except Exception as img_error:
-                        logger.warning(
-                            f"Error processing image {img_index} on page {page_num + 1}: {str(img_error)}"
-                        )
-                        continue
-
-            pdf_document.close()
-            os.unlink(temp_file_path)
-
-            full_text = "\n".join(text_content)
+            full_text = self.pdf_extractor.extract(pdf_bytes).text
 
             if not full_text or len(full_text.strip()) < 10:
                 logger.warning("Extracted very short or empty text from the PDF.")
@@ -332,193 +471,107 @@ class RAGPipeline:
 
     def _ensure_weaviate_connected(self):
         """Ensure the Weaviate client is connected, reconnect if necessary"""
+        if self.vector_backend != "weaviate":
+            return
         try:
-            # Check if client is closed
-            if not hasattr(self, "weaviate_client") or self.weaviate_client is None:
-                logger.info("Weaviate client not initialized, connecting...")
-                self.weaviate_client = weaviate.connect_to_local(
-                    host="127.0.0.1", port=5000, grpc_port=50051
-                )
-                return
-
-            try:
-                self.weaviate_client.collections.get(self.class_name)
-            except weaviate.exceptions.WeaviateClosedClientError:
-                logger.info("Weaviate client disconnected, reconnecting...")
-                self.weaviate_client = weaviate.connect_to_local(
-                    host="127.0.0.1", port=5000, grpc_port=50051
-                )
+            with self._weaviate_lock:
+                # Check if client is closed
+                if not hasattr(self, "weaviate_client") or self.weaviate_client is None:
+                    logger.info("Weaviate client not initialized, connecting...")
+                    self.weaviate_client = weaviate.connect_to_local(
+                        host="127.0.0.1", port=5000, grpc_port=50051
+                    )
+                    if self._uses_index:
+                        self._build_index()
+                    return
+
+                if not self.weaviate_client.is_connected():
+                    logger.info("Weaviate client disconnected, reconnecting...")
+                    self.weaviate_client = weaviate.connect_to_local(
+                        host="127.0.0.1", port=5000, grpc_port=50051
+                    )
+                    if self._uses_index:
+                        self._build_index()
         except Exception as e:
             logger.error(f"Error connecting to Weaviate: {str(e)}")
             raise
 
-    def _chunk_text_for_summary(
-        self, text: str, max_chunk_size: int = 12000
-    ) -> List[str]:
-        """
-        Split text into chunks that preserve semantic structure and mathematical equations.
-        Uses section headers and natural breaks in the text to create meaningful chunks.
-        """
-        if len(text) <= max_chunk_size:
-            return [text]
-
-        section_headers = [
-            r"\n\d+\.\s+[A-Z][^\n]+",
-            r"\n[A-Z][^\n]+\n[-=]+\n",
-            r"\n##\s+[^\n]+\n",
-            r"\n[A-Z][^\n]+\n",
-        ]
-
-        # Combine all patterns
-        pattern = "|".join(section_headers)
-        sections = re.split(pattern, text)
-
-        # Filter out empty sections and normalize
-        sections = [s.strip() for s in sections if s.strip()]
-
-        chunks = []
-        current_chunk = []
-        current_size = 0
-
-        for section in sections:
-            section_size = len(section)
-
-            if section_size > max_chunk_size:
-                subsection_patterns = [
-                    r"\n\d+\.\d+\s+[^\n]+",
-                    r"\n###\s+[^\n]+\n",
-                    r"\n[A-Z][^\n]+\n[-]+\n",
-                ]
-                subpattern = "|".join(subsection_patterns)
-                subsections = re.split(subpattern, section)
-                subsections = [s.strip() for s in subsections if s.strip()]
-
-                for subsection in subsections:
-                    if (
-                        current_size + len(subsection) > max_chunk_size
-                        and current_chunk
-                    ):
-                        chunks.append("\n\n".join(current_chunk))
-                        current_chunk = [subsection]
-                        current_size = len(subsection)
-                    else:
-                        current_chunk.append(subsection)
-                        current_size += len(subsection)
-            else:
-                if current_size + section_size > max_chunk_size and current_chunk:
-                    chunks.append("\n\n".join(current_chunk))
-                    current_chunk = [section]
-                    current_size = section_size
-                else:
-                    current_chunk.append(section)
-                    current_size += section_size
-
-        if current_chunk:
-            chunks.append("\n\n".join(current_chunk))
-
-        logger.info(f"Split text into {len(chunks)} chunks")
-        for i, chunk in enumerate(chunks):
-            logger.info(f"Chunk {i+1} size: {len(chunk)} characters")
-
-        return chunks
-
-    async def summarize_document(self, doc_id: str) -> Dict[str, Any]:
+    async def summarize_document(
+        self,
+        doc_id: str,
+        mode: Optional[str] = None,
+        on_event: Optional[EventCallback] = None,
+        user_id: Optional[str] = None,
+    ) -> Dict[str, Any]:
         """
         Generate a summary and extract key concepts from a document.
+        `mode` overrides SUMMARY_MODE ("map_reduce" or "serial"); `on_event`
+        receives summary tokens as they are generated. `user_id` names the
+        chunks' owner for per-user stores (looked up if not given).
         """
         try:
             doc_id = str(doc_id)
-            self._ensure_weaviate_connected()
+            await asyncio.to_thread(self._ensure_weaviate_connected)
 
-            collection = self.weaviate_client.collections.get(self.class_name)
-
-            filters = Filter.by_property("doc_id").equal(doc_id)
-            results = collection.query.fetch_objects(limit=100, filters=filters).objects
+            owner = await self._chunk_owner(doc_id, user_id)
+            results = await asyncio.to_thread(self.store.fetch, doc_id, owner, 100)
 
             logger.info(f"Query returned {len(results)} results")
 
             if not results:
                 logger.info("Trying a broader query to debug...")
-                sample_results = collection.query.fetch_objects(limit=5).objects
+                sample_results = await asyncio.to_thread(
+                    self.store.fetch, None, owner, 5
+                )
                 if sample_results:
                     logger.info(f"Found {len(sample_results)} documents in collection")
-                    logger.info(
-                        f"Sample document properties: {sample_results[0].properties}"
-                    )
+                    logger.info(f"Sample document properties: {sample_results[0]}")
                 else:
                     logger.info("No documents found in collection at all")
 
                 return {"error": "Document not found"}
 
-            full_text = " ".join([obj.properties["content"] for obj in results])
+            # Weaviate returns objects in no particular order; restore the
+            # document order so the summaries follow the paper
+            results.sort(key=lambda properties: properties.get("chunk_id") or 0)
+            full_text = merge_overlapping_chunks(
+                [properties["content"] for properties in results]
+            )
             logger.info(f"Full text length: {len(full_text)} characters")
 
-            text_chunks = self._chunk_text_for_summary(full_text)
-            logger.info(f"Split text into {len(text_chunks)} chunks")
-
-            all_summaries = []
-            for i, chunk in enumerate(text_chunks):
-                logger.info(f"Processing chunk {i+1}/{len(text_chunks)}")
-
-                summary_prompt = f"""
-                    SYSTEM:
-                    You are a world‑class AI tutor and research explainer, especially skilled at unraveling complex math in ML/NLP/AI papers.  Whenever a formula or special function (e.g., sin, cos, exp, softmax) appears, you MUST:
-                    1. Explain the *purpose* of that function in this context (“why sine/cosine for positional encoding?”).  
-                    2. Give an intuitive analogy or real‑world metaphor (“treat each dimension like a clock hand…”).  
-                    3. Break down each symbol and term with a toy example.  
-                    4. Contrast with an alternative (e.g., “they didn't use linear or random encoding because…”).  
-
-                    Your overall response should follow this structure (using markdown):
-
-                    # Section Summary  
-                    _A concise 2–3 sentence overview of what this section is doing._
-
-                    # Key Concepts  
-                    - Concept A  
-                    - Concept B  
-                    - Concept C  
-
-                    # Detailed Explanations  
-                    ### Concept A  
-                    - **Intuition & Analogy:**  
-                    - [Describe as a story or real‑world metaphor]  
-                    - **Technical Details:**  
-                    - [Formal definition, equations]  
-                    - **Math Breakdown:**  
-                    1. **Equation (…), step by step:**  
-                        - *Term 1* (symbol → meaning)  
-                        - *Term 2* (why chosen, e.g., "cosine gives smooth periodic variation")  
-                        - *Why this function:* [deep why + alternative comparison]  
-                    2. **Concrete Example:**  
-                        - Numeric instantiation or simple code snippet  
-
-                    > **Always** include a short "Why this function?" mini‑section under every formula that tackles exactly why it was chosen and what would happen if you replaced it.
-
-                    # Examples & Applications  
-                    _Practical scenarios, code sketches, or visual analogies that show how these math pieces work in practice._
-
-                    ---
-
-                    USER:
-                    Here is the text chunk to analyze:
-
-                    {chunk}
-                """
-
-                message = ChatMessage(role="user", content=summary_prompt)
-                chunk_summary = await self._generate_summary_with_retry(message)
+            # References, front matter and extraction markers are not worth
+            # summarizing; drop them before chunking
+            cleaned = await asyncio.to_thread(
+                clean_for_summary, full_text, model=self.summarizer.model_id
+            )
+            logger.info(
+                f"Preprocessing saved {cleaned.tokens_saved} of {cleaned.tokens_before} "
+                f"tokens for doc_id {doc_id} (removed characters: {cleaned.removed})"
+            )
 
-                formatted_summary = self._format_summary(chunk_summary)
-                all_summaries.append(formatted_summary)
+            text_chunks = self.summarizer.chunk_text(cleaned.text)
+            logger.info(f"Split text into {len(text_chunks)} chunks")
 
-            combined_summary = "\n\n---\n\n".join(all_summaries)
+            if on_event is not None:
+                await on_event(
+                    "stage", {"stage": "summarizing", "chunks": len(text_chunks)}
+                )
+            summary = await self.summarizer.summarize(
+                text_chunks, mode=mode, on_event=on_event
+            )
+            combined_summary = summary.text
             logger.info(
-                f"Generated combined summary of length: {len(combined_summary)}"
+                f"Generated combined summary of length: {len(combined_summary)} "
+                f"in {summary.elapsed_seconds:.2f}s ({summary.mode})"
             )
 
             return {
                 "doc_id": doc_id,
                 "analysis": combined_summary,
+                "summary_mode": summary.mode,
+                "summary_seconds": summary.elapsed_seconds,
+                "summary_cache_hits": summary.cache_hits,
+                "preprocess_tokens_saved": cleaned.tokens_saved,
                 "timestamp": datetime.now(tz=timezone.utc).isoformat(),
             }
 
@@ -526,125 +579,45 @@ class RAGPipeline:
             logger.error(f"Error summarizing document {doc_id}: {str(e)}")
             raise
 
-    def _format_summary(self, summary: str) -> str:
-        """
-        Clean and format the summary text for better readability.
-        """
-        summary = re.sub(r"\n{3,}", "\n\n", summary.strip())
-
-        summary = re.sub(r"(#{1,6}\s+[^\n]+)\n", r"\1\n\n", summary)
-
-        summary = re.sub(r"(\n\s*[-*]\s+[^\n]+)\n", r"\1\n\n", summary)
-
-        summary = re.sub(r"```\n", "```\n\n", summary)
-        summary = re.sub(r"\n```", "\n\n```", summary)
-
-        # Add horizontal rule between major sections if not present
-        if not re.search(r"\n---\n", summary):
-            summary = re.sub(r"\n(##\s+[^\n]+)\n", r"\n---\n\n\1\n", summary)
-
-        return summary
-
-    async def _generate_summary_with_retry(self, message: ChatMessage) -> str:
-        """Helper method to generate summary with retries."""
-        max_retries = 3
-        retry_count = 0
-        last_error = None
-
-        while retry_count < max_retries:
-            try:
-                logger.info(
-                    f"Attempt {retry_count + 1} to generate summary with OpenRouter"
-                )
-                response = self.llm.stream_chat([message])
-                full_response = ""
-                chunk_count = 0
-
-                for r in response:
-                    if r.delta:
-                        print(r.delta, end="", flush=True)
-                        full_response += r.delta
-                        chunk_count += 1
-
-                        if chunk_count % 10 == 0:
-                            logger.info(
-                                f"Received {chunk_count} chunks, current response length: {len(full_response)}"
-                            )
-
-                logger.info(
-                    f"Successfully generated summary with {chunk_count} chunks, total length: {len(full_response)}"
-                )
-
-                if len(full_response) < 100:
-                    raise Exception("Response too short, likely incomplete")
-
-                return full_response
-
-            except Exception as e:
-                retry_count += 1
-                last_error = e
-                logger.warning(f"Attempt {retry_count} failed: {str(e)}")
-
-                if retry_count < max_retries:
-                    wait_time = 2**retry_count
-                    logger.info(f"Waiting {wait_time} seconds before retry...")
-                    await asyncio.sleep(wait_time)
-
-                if retry_count == max_retries - 1 and isinstance(self.llm, OpenRouter):
-                    logger.info("Switching to fallback LLM (Ollama)")
-                    try:
-                        backup_llm = Ollama(model="llama2", temperature=0.1)
-                        response = backup_llm.complete(message.content)
-                        logger.info("Successfully generated summary with fallback LLM")
-                        return str(response)
-                    except Exception as fallback_error:
-                        logger.error(f"Fallback LLM also failed: {str(fallback_error)}")
-
-        raise Exception(
-            f"Failed to generate summary after {max_retries} attempts: {str(last_error)}"
-        )
-
     async def query(
-        self, query_text: str, doc_id: Optional[str] = None, top_k: int = 5
+        self,
+        query_text: str,
+        doc_id: Optional[str] = None,
+        top_k: int = 5,
+        user_id: Optional[str] = None,
     ) -> Dict[str, Any]:
         """
-        Query the vector store and get relevant responses.
+        Query the vector store and get relevant responses. Without a doc_id
+        the search covers `user_id`'s chunks when going through the chunk
+        store (tenants or the embedded backend), and every chunk otherwise.
         """
         try:
-            self._ensure_weaviate_connected()
+            await asyncio.to_thread(self._ensure_weaviate_connected)
 
-            self.vector_store = WeaviateVectorStore(
-                weaviate_client=self.weaviate_client,
-                class_name=self.class_name,
-                text_key="content",
-                metadata_key="metadata",
-            )
-
-            self.index = VectorStoreIndex(
-                [],
-                vector_store=self.vector_store,
-            )
-
-            # Create query engine
-            query_engine = self.index.as_query_engine(
-                similarity_top_k=top_k,
-                vector_store_query_mode="hybrid",
-                llm=self.llm,
-            )
-
-            # Add document filter if doc_id provided
+            # Deduplicated uploads read the chunks of the original upload
             if doc_id:
-                filter_dict = {
-                    "where_filter": {
-                        "operator": "Equal",
-                        "path": ["doc_id"],
-                        "valueString": doc_id,
-                    }
-                }
-                query_engine = query_engine.update_vector_store_query_filter(
-                    filter_dict
-                )
-
+                doc_id = await asyncio.to_thread(resolve_vector_doc_id, doc_id)
+            query_engine = owner = None
+            if self.index is None:
+                owner = await self._chunk_owner(doc_id, None) if doc_id else user_id
+            else:
+                # Engines carry a fixed filter and no per-query state, so one
+                # instance is safely shared by concurrent queries
+                query_engine = self._get_query_engine(doc_id, top_k)
+
+            # Embedded once: looks up the semantic answer cache and feeds the
+            # retriever. Library-wide queries (no doc_id) are not cached
+            query_embedding = await self.embedding_service.embed_query(query_text)
+            answer_cache = None
+            if SEMANTIC_CACHE_ENABLED and doc_id:
+                answer_cache = get_answer_cache()
+            if answer_cache:
+                cached = await answer_cache.get(doc_id, query_embedding, top_k)
+                if cached:
+                    return cached
+
+            # Provider failover happens inside the LLM router; retries here
+            # cover transient retrieval and generation errors
             max_retries = 3
             retry_count = 0
             last_error = None
@@ -652,21 +625,31 @@ class RAGPipeline:
             while retry_count < max_retries:
                 try:
                     logger.info(f"Attempt {retry_count + 1} to execute query")
-                    response = await query_engine.aquery(query_text)
-
-                    result = {
-                        "answer": str(response.response),
-                        "sources": [
-                            {
-                                "content": str(node.node.text),
-                                "metadata": node.node.metadata,
-                                "score": float(node.score) if node.score else None,
-                            }
-                            for node in response.source_nodes
-                        ],
-                    }
+                    if query_engine is None:
+                        result = await self._query_store(
+                            query_text, query_embedding, doc_id, owner, top_k
+                        )
+                    else:
+                        response = await query_engine.aquery(
+                            QueryBundle(query_text, embedding=query_embedding)
+                        )
+                        result = {
+                            "answer": str(response.response),
+                            "sources": [
+                                {
+                                    "content": str(node.node.text),
+                                    "metadata": node.node.metadata,
+                                    "score": float(node.score) if node.score else None,
+                                }
+                                for node in response.source_nodes
+                            ],
+                        }
 
                     logger.info("Successfully executed query")
+                    if answer_cache:
+                        await answer_cache.set(
+                            doc_id, query_text, query_embedding, top_k, result
+                        )
                     return result
 
                 except Exception as e:
@@ -679,52 +662,6 @@ class RAGPipeline:
                         logger.info(f"Waiting {wait_time} seconds before retry...")
                         await asyncio.sleep(wait_time)
 
-                    if retry_count == max_retries - 1 and isinstance(
-                        self.llm, OpenRouter
-                    ):
-                        logger.info("Trying query with fallback LLM")
-                        try:
-                            # temporary backup LLM
-                            backup_llm = Ollama(model="llama2", temperature=0.1)
-
-                            # Get the retrieved nodes first (which doesn't use the LLM)
-                            retriever = self.index.as_retriever(similarity_top_k=top_k)
-                            nodes = await retriever.aretrieve(query_text)
-
-                            context = "\n\n".join([node.text for node in nodes])
-                            prompt = f"""
-                            Based on the following context, please answer the question.
-                            
-                            Context:
-                            {context}
-                            
-                            Question:
-                            {query_text}
-                            """
-
-                            answer = backup_llm.complete(prompt)
-
-                            result = {
-                                "answer": str(answer),
-                                "sources": [
-                                    {
-                                        "content": str(node.text),
-                                        "metadata": node.metadata,
-                                        "score": None,
-                                    }
-                                    for node in nodes
-                                ],
-                                "note": "Generated using fallback LLM",
-                            }
-
-                            logger.info("Successfully executed query with fallback LLM")
-                            return result
-
-                        except Exception as fallback_error:
-                            logger.error(
-                                f"Fallback LLM query also failed: {str(fallback_error)}"
-                            )
-
             logger.error(f"All {max_retries} query attempts failed")
             return {
                 "error": f"Failed to execute query after {max_retries} attempts: {str(last_error)}",
@@ -735,13 +672,153 @@ class RAGPipeline:
             logger.error(f"Error querying index: {str(e)}")
             raise
 
+    async def _query_store(
+        self,
+        query_text: str,
+        query_embedding: List[float],
+        doc_id: Optional[str],
+        owner: Optional[str],
+        top_k: int,
+    ) -> Dict[str, Any]:
+        """Retrieve through the chunk store and answer with the default QA prompt"""
+        scope = SearchScope(doc_ids=[doc_id] if doc_id else None, user_id=owner)
+        chunks = await self._search(query_text, query_embedding, [scope], top_k, 0.5)
+        context = "\n\n".join(chunk["content"] for chunk in chunks)
+        prompt = (
+            "Context information is below.\n---------------------\n"
+            f"{context}\n---------------------\n"
+            "Given the context information and not prior knowledge, "
+            f"answer the query.\nQuery: {query_text}\nAnswer: "
+        )
+        answer = await self.llm.acomplete(prompt)
+        return {
+            "answer": str(answer),
+            "sources": [
+                {
+                    "content": chunk["content"],
+                    "metadata": {
+                        "doc_id": chunk["doc_id"],
+                        "chunk_id": chunk["chunk_id"],
+                    },
+                    "score": chunk["score"],
+                }
+                for chunk in chunks
+            ],
+        }
+
+    async def search_chunks(
+        self,
+        query_text: str,
+        doc_ids: List[str],
+        top_k: int = 10,
+        alpha: float = 0.5,
+    ) -> List[Dict[str, Any]]:
+        """
+        Retrieval only: run a hybrid search over the given documents' chunks
+        and return them ranked, with scores. No LLM call.
+        """
+        if not doc_ids:
+            return []
+        try:
+            await asyncio.to_thread(self._ensure_weaviate_connected)
+            query_embedding = await self.embedding_service.embed_query(query_text)
+            scopes = await self._scopes(doc_ids)
+            return await self._search(query_text, query_embedding, scopes, top_k, alpha)
+        except Exception as e:
+            logger.error(f"Error searching chunks: {str(e)}")
+            raise
+
+    async def query_library(
+        self,
+        query_text: str,
+        user_id: str,
+        top_docs: int = LIBRARY_CANDIDATE_DOCS,
+        top_k: int = 8,
+        alpha: float = 0.5,
+    ) -> Dict[str, Any]:
+        """
+        Answer a question from all of a user's documents in two stages: pick
+        candidate documents by centroid similarity, then search chunks only
+        within those candidates and answer from the best chunks.
+        """
+        try:
+            await asyncio.to_thread(self._ensure_weaviate_connected)
+            user_id = str(user_id)
+            query_embedding = await self.embedding_service.embed_query(query_text)
+
+            start = time.perf_counter()
+            candidates = await asyncio.to_thread(
+                self.centroids.candidates, user_id, query_embedding, top_docs
+            )
+            select_seconds = time.perf_counter() - start
+            if not candidates:
+                return {
+                    "answer": "No processed documents found",
+                    "sources": [],
+                    "documents": [],
+                }
+
+            # Chunks of the user's own uploads are also filtered on user_id;
+            # deduplicated uploads read chunks stored under another user
+            owned = [c.vector_doc_id for c in candidates if c.vector_doc_id == c.doc_id]
+            shared = [
+                c.vector_doc_id for c in candidates if c.vector_doc_id != c.doc_id
+            ]
+            scopes = [SearchScope(doc_ids=owned, user_id=user_id)] if owned else []
+            if shared:
+                scopes += await self._scopes(shared)
+
+            start = time.perf_counter()
+            chunks = await self._search(query_text, query_embedding, scopes, top_k, alpha)
+            search_seconds = time.perf_counter() - start
+
+            # Report chunks under the user's document ids
+            doc_ids = {c.vector_doc_id: c.doc_id for c in candidates}
+            for chunk in chunks:
+                chunk["doc_id"] = doc_ids.get(chunk["doc_id"], chunk["doc_id"])
+
+            context = "\n\n".join(
+                f"[Document {chunk['doc_id']}, chunk {chunk['chunk_id']}]\n"
+                f"{chunk['content']}"
+                for chunk in chunks
+            )
+            prompt = (
+                "Answer the question using only the excerpts below, which come from "
+                "several papers in the user's library. Cite the document of each "
+                "claim as [Document <id>].\n\n"
+                f"Excerpts:\n{context}\n\nQuestion:\n{query_text}\n"
+            )
+            answer = await self.llm.acomplete(prompt)
+
+            logger.info(
+                f"Library query for user {user_id}: {len(candidates)} candidate docs "
+                f"in {select_seconds * 1000:.1f}ms, {len(chunks)} chunks in "
+                f"{search_seconds * 1000:.1f}ms"
+            )
+            return {
+                "answer": str(answer),
+                "sources": chunks,
+                "documents": [
+                    {"doc_id": c.doc_id, "similarity": round(c.similarity, 4)}
+                    for c in candidates
+                ],
+            }
+        except Exception as e:
+            logger.error(f"Error querying library for user {user_id}: {str(e)}")
+            raise
+
     async def process_pdf_from_s3(
         self,
         bucket: str,
         key: str,
         doc_id: str,
         metadata: Optional[Dict[str, Any]] = None,
+        progress: Optional[ProgressPublisher] = None,
     ) -> Dict[str, Any]:
+        """
+        Download, extract, chunk, embed, index and summarize a PDF from S3.
+        Stage transitions and summary tokens go to `progress` if given.
+        """
         try:
             logger.info(
                 f"Starting to process PDF from S3: bucket={bucket}, key={key}, doc_id={doc_id}"
@@ -749,123 +826,90 @@ class RAGPipeline:
 
             doc_id = str(doc_id)
 
-            self._ensure_weaviate_connected()
+            await asyncio.to_thread(self._ensure_weaviate_connected)
 
             # Download PDF from S3
             logger.info("Step 1: Downloading from S3")
-            pdf_bytes = self._download_from_s3(bucket, key)
+            pdf_bytes = await asyncio.to_thread(self._download_from_s3, bucket, key)
+            if progress:
+                await progress.stage("downloaded", bytes=len(pdf_bytes))
 
             # Extract text from PDF bytes
             logger.info("Step 2: Extracting text from PDF")
-            text = self._extract_text_from_pdf_bytes(pdf_bytes)
+            # Off the event loop: page shards run in the extraction process pool
+            text = await asyncio.to_thread(self._extract_text_from_pdf_bytes, pdf_bytes)
             logger.info(f"Extracted text length: {len(text)}")
+            if progress:
+                await progress.stage("extracted", characters=len(text))
 
             if not text:
                 logger.error(f"No text extracted from PDF {key}")
                 return False
 
-            logger.info("Step 3: Creating document with metadata")
-
-            # Split text into chunks
+            logger.info("Step 3: Splitting text into chunks")
             splitter = TokenTextSplitter(
                 chunk_size=self.chunk_size, chunk_overlap=self.chunk_overlap
             )
             chunks = splitter.split_text(text)
             logger.info(f"Split text into {len(chunks)} chunks")
-
-            # Insert chunks directly into Weaviate
-            collection = self.weaviate_client.collections.get(self.class_name)
-
-            for i, chunk in enumerate(chunks):
-                chunk_uuid = generate_uuid5(f"{doc_id}_{i}")
-
+            if progress:
+                await progress.stage("chunked", chunks=len(chunks))
+
+            # Each chunk is embedded exactly once, here, and the vectors are
+            # written alongside the chunks so Weaviate never re-embeds them
+            logger.info("Step 4: Embedding chunks")
+            embeddings = await self.embedding_service.embed_texts(chunks)
+            if progress:
+                await progress.stage("embedded", chunks=len(embeddings))
+
+            logger.info("Step 5: Batch inserting chunks into Weaviate")
+            properties = {
+                "doc_id": doc_id,
+                "source": "s3",
+                "bucket": bucket,
+                "key": key,
+                "timestamp": datetime.now(tz=timezone.utc).isoformat(),
+                "user_id": metadata.get("user_id", "") if metadata else "",
+                "upload_date": metadata.get("upload_date", "") if metadata else "",
+            }
+            inserted = await asyncio.to_thread(
+                self._insert_chunks, doc_id, chunks, embeddings, properties
+            )
+            if progress:
+                await progress.stage("indexed", chunks=inserted)
+            user_id = metadata.get("user_id") if metadata else None
+            if inserted > 0 and user_id:
                 try:
-                    collection.data.insert(
-                        {
-                            "content": chunk,
-                            "doc_id": doc_id,
-                            "source": "s3",
-                            "bucket": bucket,
-                            "key": key,
-                            "timestamp": datetime.now(tz=timezone.utc).isoformat(),
-                            "user_id": metadata.get("user_id", "") if metadata else "",
-                            "upload_date": (
-                                metadata.get("upload_date", "") if metadata else ""
-                            ),
-                            "chunk_id": i,
-                        }
+                    await asyncio.to_thread(
+                        self.centroids.upsert,
+                        doc_id,
+                        user_id,
+                        centroid(embeddings),
+                        inserted,
                     )
-                    logger.info(f"Inserted chunk {i} for doc_id {doc_id}")
                 except Exception as e:
-                    logger.error(f"Error inserting chunk {i}: {str(e)}")
-
-            # Verify insertion
-            filters = Filter.by_property("doc_id").equal(doc_id)
-            results = collection.query.fetch_objects(limit=100, filters=filters).objects
-            logger.info(
-                f"After insertion, found {len(results)} chunks for doc_id {doc_id}"
-            )
-
-            if len(results) > 0:
-                logger.info("Document successfully inserted into Weaviate")
-            else:
-                logger.error("Failed to insert document chunks into Weaviate")
-
-            # Still update the LlamaIndex index for other operations
-            document = Document(text=text, metadata={"doc_id": doc_id, "source": "s3"})
-
-            self.vector_store = WeaviateVectorStore(
-                weaviate_client=self.weaviate_client,
-                class_name=self.class_name,
-                text_key="content",
-                metadata_key="metadata",
-            )
-
-            # Update index
-            logger.info("Updating LlamaIndex index")
-            index = VectorStoreIndex.from_documents(
-                [document],
-                vector_store=self.vector_store,
-                embed_model=self.embed_model,
-                llm=self.llm,
-            )
-
-            self.index = index
+                    # Only library-wide search depends on it
+                    logger.error(
+                        f"Error storing centroid for doc_id {doc_id}: {str(e)}"
+                    )
+            # Answers cached against the previous chunks are stale now
+            if SEMANTIC_CACHE_ENABLED:
+                await get_answer_cache().invalidate(doc_id)
 
             # Try to summarize if we have chunks
-            if len(results) > 0:
-                summary_result = await self.summarize_document(doc_id)
+            if inserted > 0:
+                summary_result = await self.summarize_document(
+                    doc_id,
+                    on_event=progress.emit if progress else None,
+                    user_id=user_id,
+                )
 
                 # Search for related papers using Exa API
                 try:
                     # Use the first chunk as context for related papers search
-                    first_chunk = results[0].properties["content"]
-                    related_papers = self.exa_search.search_related_papers(
-                        content=first_chunk,
-                        filters=["machine learning", "deep learning", "NLP", "AI"],
+                    summary_result["related_papers"] = await asyncio.to_thread(
+                        self._store_related_papers, doc_id, chunks[0]
                     )
-
-                    # Store related papers in the database
-                    db = sessionLocal()
-                    try:
-                        for paper in related_papers:
-                            related_paper = models.RelatedPaper(
-                                doc_id=doc_id,
-                                title=paper["title"],
-                                url=paper["url"],
-                                authors=paper["authors"],
-                                publication_year=paper["publication_year"],
-                                abstract=paper["abstract"],
-                                categories=paper["categories"],
-                                relevance_score=paper["relevance_score"],
-                            )
-                            db.add(related_paper)
-                        db.commit()
-                    finally:
-                        db.close()
-
-                    # Add related papers to the summary result
-                    summary_result["related_papers"] = related_papers
                 except Exception as e:
                     logger.error(f"Error finding related papers: {str(e)}")
                     summary_result["related_papers"] = []
@@ -879,41 +923,130 @@ class RAGPipeline:
             logger.error(f"Error in process_pdf_from_s3: {str(e)}", exc_info=True)
             raise
 
+    def _store_related_papers(self, doc_id: str, content: str) -> List[Dict[str, Any]]:
+        """Find papers related to `content` with Exa and store them for the document"""
+        related_papers = self.exa_search.search_related_papers(
+            content=content,
+            filters=["machine learning", "deep learning", "NLP", "AI"],
+        )
+
+        db = sessionLocal()
+        try:
+            for paper in related_papers:
+                related_paper = models.RelatedPaper(
+                    doc_id=doc_id,
+                    title=paper["title"],
+                    url=paper["url"],
+                    authors=paper["authors"],
+                    publication_year=paper["publication_year"],
+                    abstract=paper["abstract"],
+                    categories=paper["categories"],
+                    relevance_score=paper["relevance_score"],
+                )
+                db.add(related_paper)
+            db.commit()
+        finally:
+            db.close()
+        return related_papers
+
+    def _insert_chunks(
+        self,
+        doc_id: str,
+        chunks: List[str],
+        embeddings: List[List[float]],
+        properties: Dict[str, Any],
+    ) -> int:
+        """Write chunks with their vectors to the chunk store"""
+        start = time.perf_counter()
+        inserted = self.store.insert(doc_id, chunks, embeddings, properties)
+        elapsed = time.perf_counter() - start
+
+        rate = inserted / elapsed if elapsed > 0 else 0.0
+        logger.info(
+            f"Inserted {inserted}/{len(chunks)} chunks for doc_id {doc_id} "
+            f"in {elapsed:.2f}s ({rate:.1f} chunks/s)"
+        )
+        return inserted
+
     def _setup_llm(self):
-        """Setup LLM with fallback options"""
+        """
+        Set up the LLM as a router over long-lived provider clients:
+        OpenRouter first when configured, the local Ollama model as fallback
+        """
         logger.info(f"Setting up LLM with primary model: {self.openrouter_model}")
+        providers = []
 
-        try:
-            api_key = os.getenv("OPENROUTER_API_KEY")
-            if not api_key:
-                logger.warning(
-                    "OpenRouter API key not found, falling back to local model"
+        api_key = os.getenv("OPENROUTER_API_KEY")
+        if api_key:
+            try:
+                # Shared pooled HTTP clients: keep-alive connections are reused
+                # across summaries and queries, and async calls never block
+                providers.append(
+                    OpenRouter(
+                        api_key=api_key,
+                        max_tokens=4000,  # Increased for longer responses
+                        context_window=8192,  # Increased context window
+                        model=self.openrouter_model,
+                        timeout=120,  # Increased timeout for longer responses
+                        http_client=get_http_client(),
+                        async_http_client=get_async_http_client(),
+                    )
                 )
-                self.llm = Ollama(model="llama2", temperature=0.1)
-                return
+                logger.info(
+                    f"Successfully initialized OpenRouter with model: {self.openrouter_model}"
+                )
+            except Exception as e:
+                logger.error(f"Failed to initialize OpenRouter: {str(e)}")
+        else:
+            logger.warning("OpenRouter API key not found, falling back to local model")
 
-            self.llm = OpenRouter(
-                api_key=api_key,
-                max_tokens=4000,  # Increased for longer responses
-                context_window=8192,  # Increased context window
-                model=self.openrouter_model,
-                timeout=120,  # Increased timeout for longer responses
+        try:
+            providers.append(
+                Ollama(model="llama2", temperature=0.1, request_timeout=120)
             )
-            logger.info(
-                f"Successfully initialized OpenRouter with model: {self.openrouter_model}"
+        except Exception as e:
+            logger.error(f"Failed to initialize fallback LLM: {str(e)}")
+
+        if not providers:
+            from llama_index.core.llms import MockLLM
+
+            providers.append(MockLLM())
+            logger.warning("Using MockLLM as last resort fallback")
+
+        # The reasoning-heavy OpenRouter model can think well past the
+        # generic first-token timeout before it streams anything
+        self.llm = LLMRouter(
+            providers,
+            first_token_timeouts={self.openrouter_model: LLM_PRIMARY_FIRST_TOKEN_TIMEOUT},
+        )
+        logger.info(f"LLM providers in priority order: {list(self.llm.stats())}")
+
+
+_shared_pipeline: Optional[RAGPipeline] = None
+_shared_pipeline_lock = threading.Lock()
+
+
+def get_shared_pipeline() -> RAGPipeline:
+    """
+    Return the process-wide RAGPipeline, creating it on first use.
+    The embedding model, Weaviate client and index are loaded once and
+    shared by every ingest and query task in this process.
+    """
+    global _shared_pipeline
+    with _shared_pipeline_lock:
+        if _shared_pipeline is None:
+            _shared_pipeline = RAGPipeline(
+                aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
+                aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY"),
+                aws_region=os.getenv("AWS_REGION"),
             )
+        return _shared_pipeline
 
-        except Exception as e:
-            logger.error(f"Failed to initialize OpenRouter: {str(e)}")
-            try:
-                # Fallback to a local model if available
-                self.llm = Ollama(model="llama2", temperature=0.1)
-                logger.info("Using fallback LLM (Ollama)")
-            except Exception as fallback_error:
-                logger.error(
-                    f"Failed to initialize fallback LLM: {str(fallback_error)}"
-                )
-                from llama_index.core.llms import MockLLM
 
-                self.llm = MockLLM()
-                logger.warning("Using MockLLM as last resort fallback")
+def close_shared_pipeline() -> None:
+    """Close the process-wide RAGPipeline if one was created"""
+    global _shared_pipeline
+    with _shared_pipeline_lock:
+        if _shared_pipeline is not None:
+            _shared_pipeline.close()
+            _shared_pipeline = None
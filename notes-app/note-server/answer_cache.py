@@ -0,0 +1,184 @@
+import base64
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from redis_config import async_redis_client
+
+logger = logging.getLogger(__name__)
+
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "true").lower() == "true"
+# Cosine similarity above which a new question reuses a cached answer
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", 0.93))
+SEMANTIC_CACHE_TTL = int(os.getenv("SEMANTIC_CACHE_TTL", 7 * 24 * 60 * 60))
+# Answers kept per document; the oldest are dropped first
+SEMANTIC_CACHE_MAX_PER_DOC = int(os.getenv("SEMANTIC_CACHE_MAX_PER_DOC", 200))
+
+_STATS_KEY = "answers:stats"
+
+
+def _index_key(doc_id: str) -> str:
+    return f"answers:{doc_id}"
+
+
+def _entry_key(doc_id: str, entry_id: str) -> str:
+    return f"answers:{doc_id}:{entry_id}"
+
+
+def _encode(embedding: List[float]) -> str:
+    vector = np.asarray(embedding, dtype=np.float32)
+    vector /= np.linalg.norm(vector) or 1.0
+    return base64.b64encode(vector.tobytes()).decode("ascii")
+
+
+def _decode(encoded: str) -> np.ndarray:
+    return np.frombuffer(base64.b64decode(encoded), dtype=np.float32)
+
+
+class SemanticAnswerCache:
+    """
+    Caches RAG answers per document, keyed by the question's embedding. A
+    new question whose cosine similarity to a cached one (same doc_id and
+    top_k) reaches SEMANTIC_CACHE_THRESHOLD gets the cached answer and
+    sources without retrieval or an LLM call.
+
+    Entries live in Redis, so every API process shares them. Each expires
+    after SEMANTIC_CACHE_TTL; invalidate() drops a document's entries when
+    it is reprocessed or deleted. Hit and miss counts are kept in Redis too.
+    """
+
+    def __init__(
+        self,
+        client=async_redis_client,
+        threshold: float = SEMANTIC_CACHE_THRESHOLD,
+        ttl: int = SEMANTIC_CACHE_TTL,
+        max_per_doc: int = SEMANTIC_CACHE_MAX_PER_DOC,
+    ):
+        self.redis = client
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_per_doc = max_per_doc
+
+    async def get(
+        self, doc_id: str, embedding: List[float], top_k: int
+    ) -> Optional[Dict[str, Any]]:
+        """Cached result for the closest earlier question, if close enough"""
+        try:
+            index = _index_key(doc_id)
+            # Index entries older than the TTL point at expired keys
+            await self.redis.zremrangebyscore(index, 0, time.time() - self.ttl)
+            entry_ids = await self.redis.zrange(index, 0, -1)
+            entries = []
+            if entry_ids:
+                values = await self.redis.mget(
+                    [_entry_key(doc_id, entry_id) for entry_id in entry_ids]
+                )
+                entries = [json.loads(value) for value in values if value]
+            entries = [entry for entry in entries if entry["top_k"] == top_k]
+
+            best = None
+            if entries:
+                query = _decode(_encode(embedding))
+                matrix = np.stack([_decode(entry["embedding"]) for entry in entries])
+                similarities = matrix @ query
+                i = int(np.argmax(similarities))
+                if similarities[i] >= self.threshold:
+                    best = entries[i]
+                    similarity = round(float(similarities[i]), 4)
+                    best["result"]["cache_similarity"] = similarity
+
+            await self.redis.hincrby(_STATS_KEY, "hits" if best else "misses", 1)
+            if best is None:
+                return None
+            logger.info(
+                f"Semantic cache hit for doc_id {doc_id} "
+                f"(similarity {best['result']['cache_similarity']}): {best['query']!r}"
+            )
+            return {**best["result"], "cached": True}
+        except Exception as e:
+            # The cache is an optimization; never fail the query over it
+            logger.warning(
+                f"Semantic cache lookup failed for doc_id {doc_id}: {str(e)}"
+            )
+            return None
+
+    async def set(
+        self,
+        doc_id: str,
+        query: str,
+        embedding: List[float],
+        top_k: int,
+        result: Dict[str, Any],
+    ) -> None:
+        try:
+            digest = hashlib.sha256(f"{top_k}:{query}".encode("utf-8"))
+            entry_id = digest.hexdigest()[:16]
+            entry = {
+                "query": query,
+                "top_k": top_k,
+                "embedding": _encode(embedding),
+                "result": result,
+            }
+            index = _index_key(doc_id)
+            pipe = self.redis.pipeline()
+            pipe.set(_entry_key(doc_id, entry_id), json.dumps(entry), ex=self.ttl)
+            pipe.zadd(index, {entry_id: time.time()})
+            pipe.expire(index, self.ttl)
+            await pipe.execute()
+
+            # Trim the oldest entries beyond the per-document cap
+            overflow = await self.redis.zcard(index) - self.max_per_doc
+            if overflow > 0:
+                stale = await self.redis.zrange(index, 0, overflow - 1)
+                pipe = self.redis.pipeline()
+                pipe.zrem(index, *stale)
+                pipe.delete(*[_entry_key(doc_id, entry_id) for entry_id in stale])
+                await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Semantic cache store failed for doc_id {doc_id}: {str(e)}")
+
+    async def invalidate(self, doc_id: str) -> int:
+        """Drop every cached answer for a document; returns how many"""
+        try:
+            index = _index_key(doc_id)
+            entry_ids = await self.redis.zrange(index, 0, -1)
+            pipe = self.redis.pipeline()
+            if entry_ids:
+                pipe.delete(*[_entry_key(doc_id, entry_id) for entry_id in entry_ids])
+            pipe.delete(index)
+            await pipe.execute()
+            if entry_ids:
+                logger.info(
+                    f"Invalidated {len(entry_ids)} cached answers for doc_id {doc_id}"
+                )
+            return len(entry_ids)
+        except Exception as e:
+            logger.warning(
+                f"Semantic cache invalidation failed for doc_id {doc_id}: {str(e)}"
+            )
+            return 0
+
+    async def stats(self) -> Dict[str, Any]:
+        counts = await self.redis.hgetall(_STATS_KEY)
+        hits, misses = int(counts.get("hits", 0)), int(counts.get("misses", 0))
+        lookups = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+        }
+
+
+_answer_cache: Optional[SemanticAnswerCache] = None
+
+
+def get_answer_cache() -> SemanticAnswerCache:
+    global _answer_cache
+    if _answer_cache is None:
+        _answer_cache = SemanticAnswerCache()
+    return _answer_cache
@@ -66,4 +66,22 @@ class JWTBearer(HTTPBearer):
             return False
 
 
+class EventStreamBearer(JWTBearer):
+    """
+    JWTBearer for server-sent event routes. The browser's EventSource
+    cannot set an Authorization header, so the token may also be passed
+    as the `token` query parameter. Use it only on these streams; URLs
+    end up in access logs.
+    """
+
+    async def __call__(self, request: Request):
+        token = request.query_params.get("token")
+        if token is None:
+            return await super(EventStreamBearer, self).__call__(request)
+
+        if not self.verify_jwt(token):
+            raise HTTPException(status_code=403, detail="Invalid token or expired token.")
+        return token
+
+
 jwt_bearer = JWTBearer()
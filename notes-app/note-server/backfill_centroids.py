@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Build document centroids for chunks indexed before library-wide search
+existed. Streams every chunk vector from the PDFDocument collection (or
+every tenant of the multi-tenant collection), keeps a running sum per
+doc_id and writes one centroid per document, then gives deduplicated
+uploads the centroid of the document they reuse.
+
+Safe to re-run: centroids are upserted by document id.
+
+Usage: python backfill_centroids.py [--dry-run]
+"""
+
+import argparse
+import logging
+
+import numpy as np
+import weaviate
+
+import models
+from database import sessionLocal
+from document_centroids import DocumentCentroids
+from tenants import TENANT_CLASS_NAME, WEAVIATE_MULTI_TENANCY
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+CLASS_NAME = TENANT_CLASS_NAME if WEAVIATE_MULTI_TENANCY else "PDFDocument"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    client = weaviate.connect_to_local(host="127.0.0.1", port=5000, grpc_port=50051)
+    try:
+        centroids = DocumentCentroids(lambda: client)
+        centroids.ensure_schema()
+
+        sums, counts, owners = {}, {}, {}
+        chunks = client.collections.get(CLASS_NAME)
+        scopes = [chunks]
+        if WEAVIATE_MULTI_TENANCY:
+            scopes = [chunks.with_tenant(name) for name in chunks.tenants.get()]
+        for scope in scopes:
+            for obj in scope.iterator(
+                include_vector=True, return_properties=["doc_id", "user_id"]
+            ):
+                doc_id = obj.properties["doc_id"]
+                vector = np.asarray(obj.vector["default"], dtype=np.float32)
+                vector /= np.linalg.norm(vector) or 1.0
+                sums[doc_id] = sums.get(doc_id, 0) + vector
+                counts[doc_id] = counts.get(doc_id, 0) + 1
+                owners[doc_id] = obj.properties.get("user_id") or ""
+
+        logger.info(f"Read {sum(counts.values())} chunks of {len(sums)} documents")
+        written = 0
+        for doc_id, total in sums.items():
+            if not owners[doc_id]:
+                logger.warning(f"Skipping doc_id {doc_id}: chunks have no user_id")
+                continue
+            mean = total / counts[doc_id]
+            mean /= np.linalg.norm(mean) or 1.0
+            if not args.dry_run:
+                centroids.upsert(doc_id, owners[doc_id], mean.tolist(), counts[doc_id])
+            written += 1
+
+        db = sessionLocal()
+        try:
+            duplicates = (
+                db.query(models.PdfDocument)
+                .filter(models.PdfDocument.source_doc_id.isnot(None))
+                .all()
+            )
+        finally:
+            db.close()
+        linked = 0
+        for pdf_doc in duplicates:
+            if args.dry_run or centroids.link(
+                str(pdf_doc.id), str(pdf_doc.user_id), str(pdf_doc.source_doc_id)
+            ):
+                linked += 1
+
+        action = "Would write" if args.dry_run else "Wrote"
+        logger.info(f"{action} {written} centroids and linked {linked} duplicate uploads")
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Measure latency of the retrieval-only chunk search (RAGPipeline.search_chunks,
+behind POST /search/chunks) against the local Weaviate instance.
+
+Runs a set of student-style questions against the given documents (or
+every document in the collection) and reports p50/p95/max latency, both
+sequentially and with --concurrency requests in flight. The first
+--warmup queries are discarded so model loading and connection setup are
+not counted. No results have been recorded yet.
+
+Usage: python benchmark_chunk_search.py [--doc-id ID ...] [--iterations N] [--concurrency N]
+"""
+
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+
+from RAG import close_shared_pipeline, get_shared_pipeline
+
+logging.basicConfig(level=logging.WARNING)
+
+QUESTIONS = [
+    "What is the main contribution of this paper?",
+    "How is the model trained?",
+    "What datasets are used for evaluation?",
+    "How does the method compare to the baselines?",
+    "What are the limitations?",
+    "Explain the loss function",
+    "What is the memory footprint?",
+    "How is quantization applied to the weights?",
+]
+
+
+def percentile(values, q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def report(name: str, seconds) -> None:
+    ms = [s * 1000 for s in seconds]
+    print(
+        f"{name:<14} n={len(ms):<5} p50={statistics.median(ms):>7.1f}ms  "
+        f"p95={percentile(ms, 0.95):>7.1f}ms  max={max(ms):>7.1f}ms"
+    )
+
+
+def all_doc_ids(rag) -> list:
+    collection = rag.weaviate_client.collections.get(rag.class_name)
+    doc_ids = set()
+    for obj in collection.iterator(return_properties=["doc_id"]):
+        doc_ids.add(obj.properties["doc_id"])
+    return sorted(doc_ids)
+
+
+async def timed_search(rag, question: str, doc_ids, top_k: int) -> float:
+    start = time.perf_counter()
+    await rag.search_chunks(question, doc_ids, top_k=top_k)
+    return time.perf_counter() - start
+
+
+async def run(args) -> None:
+    rag = get_shared_pipeline()
+    doc_ids = args.doc_id or all_doc_ids(rag)
+    if not doc_ids:
+        print("No documents indexed; upload a PDF first")
+        return
+    print(f"Searching {len(doc_ids)} documents, top_k={args.top_k}\n")
+
+    for i in range(args.warmup):
+        await timed_search(rag, QUESTIONS[i % len(QUESTIONS)], doc_ids, args.top_k)
+
+    sequential = [
+        await timed_search(rag, QUESTIONS[i % len(QUESTIONS)], doc_ids, args.top_k)
+        for i in range(args.iterations)
+    ]
+    report("sequential", sequential)
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def bounded(i: int) -> float:
+        async with semaphore:
+            return await timed_search(
+                rag, QUESTIONS[i % len(QUESTIONS)], doc_ids, args.top_k
+            )
+
+    concurrent = await asyncio.gather(*(bounded(i) for i in range(args.iterations)))
+    report(f"concurrency {args.concurrency}", concurrent)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--doc-id", action="append", default=[])
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--warmup", type=int, default=10)
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(run(args))
+    finally:
+        close_shared_pipeline()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Benchmark embedding backends on chunks of the PDFs in the repo:
+HuggingFaceEmbedding (PyTorch) against the ONNX and int8-quantized ONNX
+exports. Reports throughput (chunks/sec), peak RSS and cosine agreement
+with the PyTorch vectors.
+
+Each backend runs in its own process so peak memory is measured in
+isolation. Run export_onnx_embedding.py first.
+
+No results have been recorded yet (it needs the MiniLM weights from the
+Hugging Face hub), so EMBED_BACKEND keeps defaulting to huggingface.
+
+Usage: python benchmark_embeddings.py [--repeat N] [pdf ...]
+"""
+
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from benchmark_pdf_extraction import DEFAULT_PDFS
+
+MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+BACKENDS = ["huggingface", "onnx", "onnx-int8"]
+
+
+def load_chunks(pdf_paths):
+    from llama_index.core.node_parser import TokenTextSplitter
+
+    from pdf_extractor import PDFExtractor
+
+    extractor = PDFExtractor(max_workers=1)
+    # Same splitter settings as RAGPipeline ingest
+    splitter = TokenTextSplitter(chunk_size=1024, chunk_overlap=50)
+    chunks = []
+    for pdf_path in pdf_paths:
+        text = extractor.extract(Path(pdf_path).read_bytes()).text
+        chunks.extend(splitter.split_text(text))
+    return chunks
+
+
+def build_backend(name: str):
+    if name == "huggingface":
+        from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+
+        return HuggingFaceEmbedding(model_name=MODEL_NAME, embed_batch_size=32)
+
+    from onnx_embedding import OnnxEmbedding
+
+    return OnnxEmbedding(model_name=MODEL_NAME, quantized=name == "onnx-int8")
+
+
+def run_worker(backend: str, pdf_paths, repeat: int, output: str) -> None:
+    chunks = load_chunks(pdf_paths)
+    baseline_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    model = build_backend(backend)
+    model.get_text_embedding_batch(chunks[:2])  # warm-up
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        vectors = model.get_text_embedding_batch(chunks)
+    elapsed = time.perf_counter() - start
+
+    np.save(output, np.asarray(vectors, dtype=np.float32))
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(
+        json.dumps(
+            {
+                "backend": backend,
+                "chunks": len(chunks),
+                "chunks_per_second": len(chunks) * repeat / elapsed,
+                "peak_rss_mb": peak_rss / 1024,
+                "model_rss_mb": (peak_rss - baseline_rss) / 1024,
+            }
+        )
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("pdfs", nargs="*", default=DEFAULT_PDFS)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--backends", nargs="*", default=BACKENDS)
+    parser.add_argument("--worker", choices=BACKENDS, help=argparse.SUPPRESS)
+    parser.add_argument("--output", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker, args.pdfs, args.repeat, args.output)
+        return
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for backend in args.backends:
+            output = str(Path(tmp) / f"{backend}.npy")
+            proc = subprocess.run(
+                [
+                    sys.executable,
+                    __file__,
+                    "--worker",
+                    backend,
+                    "--output",
+                    output,
+                    "--repeat",
+                    str(args.repeat),
+                    *args.pdfs,
+                ],
+                capture_output=True,
+                text=True,
+                check=True,
+            )
+            stats = json.loads(proc.stdout.strip().splitlines()[-1])
+            stats["vectors"] = np.load(output)
+            results[backend] = stats
+
+    reference = results.get("huggingface")
+    print(f"\n{'backend':<12} {'chunks/s':>10} {'model RSS MB':>13} {'cos mean':>9} {'cos min':>9}")
+    for backend, stats in results.items():
+        if reference is not None:
+            # Vectors are L2-normalized, so the row-wise dot is the cosine
+            cosines = (stats["vectors"] * reference["vectors"]).sum(axis=1)
+            cos_mean, cos_min = f"{cosines.mean():.5f}", f"{cosines.min():.5f}"
+        else:
+            cos_mean = cos_min = "-"
+        print(
+            f"{backend:<12} {stats['chunks_per_second']:>10.1f} "
+            f"{stats['model_rss_mb']:>13.0f} {cos_mean:>9} {cos_min:>9}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Check that the API stays responsive while a summary is being generated.
+
+Serves a trivial /ping endpoint in-process and requests it every
+--interval seconds while a document is summarized on the same event loop,
+once with the old pattern (iterating the synchronous stream_chat inside
+an async function) and once with the Summarizer's native async streaming.
+Reports /ping latency percentiles for each. With the blocking pattern the
+worst case approaches the full generation time; with async streaming it
+should stay in the low milliseconds.
+
+Usage: python benchmark_event_loop_latency.py [--simulate] [--chunks N] [pdf ...]
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from pathlib import Path
+
+import httpx
+from fastapi import FastAPI
+from llama_index.core.llms import ChatMessage
+
+from benchmark_pdf_extraction import DEFAULT_PDFS
+from benchmark_summarization import add_llm_arguments, build_llm
+from pdf_extractor import PDFExtractor
+from summarizer import SUMMARY_PROMPT, Summarizer
+
+app = FastAPI()
+
+
+@app.get("/ping")
+async def ping():
+    return {"ok": True}
+
+
+async def blocking_summarize(llm, chunks):
+    """The pre-async summarizer: a sync stream consumed inside async def"""
+    for chunk in chunks:
+        message = ChatMessage(role="user", content=SUMMARY_PROMPT.format(chunk=chunk))
+        for _ in llm.stream_chat([message]):
+            pass
+
+
+async def probe(client: httpx.AsyncClient, interval: float, stop: asyncio.Event):
+    # Latency is measured from when each request was due, not when it was
+    # sent, so time a blocked loop kept the probe from running is counted
+    latencies = []
+    due = time.perf_counter()
+    while True:
+        await client.get("/ping")
+        latencies.append(time.perf_counter() - due)
+        if stop.is_set():
+            return latencies
+        due += interval
+        await asyncio.sleep(max(0.0, due - time.perf_counter()))
+
+
+def percentile(values, q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+async def measure(name: str, work, interval: float) -> None:
+    stop = asyncio.Event()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        prober = asyncio.create_task(probe(client, interval, stop))
+        # Let the probe take a few idle samples first
+        await asyncio.sleep(interval * 3)
+        start = time.perf_counter()
+        await work()
+        elapsed = time.perf_counter() - start
+        stop.set()
+        latencies = await prober
+
+    ms = [latency * 1000 for latency in latencies]
+    expected = int(elapsed / interval) + 3
+    print(
+        f"{name:<10} summary {elapsed:>7.2f}s  /ping served {len(ms):>4}/{expected:<4} "
+        f"p50={statistics.median(ms):>8.1f}ms  p95={percentile(ms, 0.95):>8.1f}ms  "
+        f"max={max(ms):>8.1f}ms"
+    )
+
+
+async def run(args) -> None:
+    extractor = PDFExtractor(max_workers=1)
+    text = "".join(extractor.extract(Path(p).read_bytes()).text for p in args.pdfs)
+
+    llm = build_llm(args)
+    summarizer = Summarizer(llm, concurrency=1, use_cache=False)
+    chunks = summarizer.chunk_text(text)[: args.chunks]
+    print(f"Summarizing {len(chunks)} chunks while probing /ping every {args.interval * 1000:.0f}ms\n")
+
+    await measure("blocking", lambda: blocking_summarize(llm, chunks), args.interval)
+    await measure(
+        "async", lambda: summarizer.summarize(chunks, mode="serial"), args.interval
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("pdfs", nargs="*", default=DEFAULT_PDFS)
+    parser.add_argument("--chunks", type=int, default=2)
+    parser.add_argument("--interval", type=float, default=0.02)
+    add_llm_arguments(parser)
+    args = parser.parse_args()
+
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Compare library-wide retrieval strategies at 10, 100 and 1000 documents
+per user on a synthetic corpus in the local Weaviate instance.
+
+"single-stage" runs one hybrid search over every chunk of the user
+(filtered on user_id). "two-stage" first picks --top-docs candidate
+documents by centroid similarity, then runs the hybrid search only over
+those documents' chunks, as RAGPipeline.query_library does. Reports
+p50/p95 latency of each and how many of the single-stage top-k chunks the
+two-stage search also returns.
+
+Each document gets a random topic vector; its chunks are noisy copies
+of it with text drawn from a topic-specific vocabulary. Data goes to
+throwaway collections that are deleted afterwards. No results have been
+recorded yet.
+
+Usage: python benchmark_library_search.py [--sizes 10 100 1000] [--chunks-per-doc N] [--queries N]
+"""
+
+import argparse
+import statistics
+import time
+
+import numpy as np
+import weaviate
+from weaviate.classes.config import Configure, DataType, Property
+from weaviate.classes.query import Filter, MetadataQuery
+
+from document_centroids import DocumentCentroids, centroid
+
+CHUNK_CLASS = "BenchLibraryChunks"
+CENTROID_CLASS = "BenchLibraryCentroids"
+DIM = 384
+WORDS_PER_TOPIC = 50
+
+
+def percentile(values, q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def unit(vectors: np.ndarray) -> np.ndarray:
+    return vectors / np.linalg.norm(vectors, axis=-1, keepdims=True)
+
+
+def create_chunk_collection(client):
+    client.collections.create(
+        name=CHUNK_CLASS,
+        vectorizer_config=Configure.Vectorizer.none(),
+        properties=[
+            Property(name="content", data_type=DataType.TEXT),
+            Property(name="doc_id", data_type=DataType.TEXT),
+            Property(name="user_id", data_type=DataType.TEXT),
+            Property(name="chunk_id", data_type=DataType.INT),
+        ],
+    )
+    return client.collections.get(CHUNK_CLASS)
+
+
+def load_user(chunks, centroids, rng, user_id: str, docs: int, chunks_per_doc: int):
+    """Insert one user's synthetic library; returns each doc's topic vector"""
+    topics = unit(rng.normal(size=(docs, DIM)).astype(np.float32))
+    with chunks.batch.fixed_size(batch_size=200) as batch:
+        for d in range(docs):
+            doc_id = f"{user_id}-{d}"
+            vectors = unit(topics[d] + 0.8 * unit(rng.normal(size=(chunks_per_doc, DIM))))
+            for c, vector in enumerate(vectors):
+                words = rng.integers(0, WORDS_PER_TOPIC, size=60)
+                content = " ".join(f"topic{d}word{w}" for w in words)
+                batch.add_object(
+                    properties={
+                        "content": content,
+                        "doc_id": doc_id,
+                        "user_id": user_id,
+                        "chunk_id": c,
+                    },
+                    vector=vector.tolist(),
+                )
+            centroids.upsert(doc_id, user_id, centroid(vectors.tolist()), chunks_per_doc)
+    return topics
+
+
+def single_stage(chunks, user_id, text, vector, top_k):
+    return chunks.query.hybrid(
+        query=text,
+        vector=vector,
+        limit=top_k,
+        filters=Filter.by_property("user_id").equal(user_id),
+        return_metadata=MetadataQuery(score=True),
+    ).objects
+
+
+def two_stage(chunks, centroids, user_id, text, vector, top_k, top_docs):
+    candidates = centroids.candidates(user_id, vector, top_docs)
+    doc_ids = [c.vector_doc_id for c in candidates]
+    return chunks.query.hybrid(
+        query=text,
+        vector=vector,
+        limit=top_k,
+        filters=Filter.by_property("doc_id").contains_any(doc_ids)
+        & Filter.by_property("user_id").equal(user_id),
+        return_metadata=MetadataQuery(score=True),
+    ).objects
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--chunks-per-doc", type=int, default=30)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--top-k", type=int, default=8)
+    parser.add_argument("--top-docs", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    client = weaviate.connect_to_local(host="127.0.0.1", port=5000, grpc_port=50051)
+    try:
+        for name in (CHUNK_CLASS, CENTROID_CLASS):
+            client.collections.delete(name)
+        chunks = create_chunk_collection(client)
+        centroids = DocumentCentroids(lambda: client, class_name=CENTROID_CLASS)
+        centroids.ensure_schema()
+
+        print(
+            f"{args.chunks_per_doc} chunks/doc, top_k={args.top_k}, "
+            f"top_docs={args.top_docs}, {args.queries} queries per size\n"
+        )
+        for docs in args.sizes:
+            user_id = f"user{docs}"
+            start = time.perf_counter()
+            topics = load_user(chunks, centroids, rng, user_id, docs, args.chunks_per_doc)
+            load_seconds = time.perf_counter() - start
+
+            timings = {"single-stage": [], "two-stage": []}
+            overlap = []
+            for _ in range(args.queries):
+                d = int(rng.integers(docs))
+                vector = unit(topics[d] + 0.9 * unit(rng.normal(size=DIM))).tolist()
+                words = rng.integers(0, WORDS_PER_TOPIC, size=6)
+                text = " ".join(f"topic{d}word{w}" for w in words)
+
+                t = time.perf_counter()
+                baseline = single_stage(chunks, user_id, text, vector, args.top_k)
+                timings["single-stage"].append(time.perf_counter() - t)
+
+                t = time.perf_counter()
+                staged = two_stage(
+                    chunks, centroids, user_id, text, vector, args.top_k, args.top_docs
+                )
+                timings["two-stage"].append(time.perf_counter() - t)
+
+                expected = {obj.uuid for obj in baseline}
+                if expected:
+                    found = {obj.uuid for obj in staged}
+                    overlap.append(len(expected & found) / len(expected))
+
+            print(f"{docs} docs ({docs * args.chunks_per_doc} chunks, loaded in {load_seconds:.1f}s)")
+            for name, seconds in timings.items():
+                ms = [s * 1000 for s in seconds]
+                print(
+                    f"  {name:<13} p50={statistics.median(ms):>7.1f}ms  "
+                    f"p95={percentile(ms, 0.95):>7.1f}ms"
+                )
+            print(f"  two-stage returns {statistics.mean(overlap):.0%} of single-stage top-k\n")
+    finally:
+        for name in (CHUNK_CLASS, CENTROID_CLASS):
+            client.collections.delete(name)
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
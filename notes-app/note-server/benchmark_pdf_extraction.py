@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Benchmark PDF extraction: the legacy temp-file path (pdfplumber for text,
+then a second PyMuPDF pass for images) against the single-pass in-memory
+PDFExtractor, both sequential and page-sharded across a process pool.
+
+Usage: python benchmark_pdf_extraction.py [--runs N] [--workers N] [pdf ...]
+"""
+
+import argparse
+import logging
+import os
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import fitz  # PyMuPDF
+import pdfplumber
+
+from pdf_extractor import PDFExtractor, ocr_image_bytes
+
+logging.basicConfig(level=logging.WARNING)
+logger = logging.getLogger(__name__)
+
+DEFAULT_PDFS = [
+    "2504.12285v2.pdf",
+    "uploads/user_58/pdfs/20241126_053510_Synchronization.pdf",
+]
+
+
+def legacy_extract(pdf_bytes: bytes) -> str:
+    """The extraction path RAGPipeline used before PDFExtractor"""
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as temp_file:
+        temp_file.write(pdf_bytes)
+        temp_file_path = temp_file.name
+
+    text_content = []
+    try:
+        with pdfplumber.open(temp_file_path) as pdf:
+            for page_num, page in enumerate(pdf.pages):
+                page_text = page.extract_text()
+                if page_text:
+                    text_content.append(f"Page {page_num + 1}:\n{page_text}\n\n")
+
+        pdf_document = fitz.open(temp_file_path)
+        for page_num in range(len(pdf_document)):
+            page = pdf_document[page_num]
+            for img_index, img in enumerate(page.get_images(full=True)):
+                try:
+                    image_bytes = pdf_document.extract_image(img[0])["image"]
+                    ocr_text = ocr_image_bytes(image_bytes)
+                    if ocr_text.strip():
+                        text_content.append(
+                            f"Page {page_num + 1} - Image {img_index + 1} (OCR):\n{ocr_text}\n\n"
+                        )
+                except Exception:
+                    continue
+        pdf_document.close()
+    finally:
+        os.unlink(temp_file_path)
+
+    return "\n".join(text_content)
+
+
+def time_runs(fn, pdf_bytes: bytes, runs: int):
+    timings = []
+    text = ""
+    for _ in range(runs):
+        start = time.perf_counter()
+        text = fn(pdf_bytes)
+        timings.append(time.perf_counter() - start)
+    return timings, text
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("pdfs", nargs="*", default=DEFAULT_PDFS)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    sequential = PDFExtractor(max_workers=1)
+    parallel = PDFExtractor(max_workers=args.workers, parallel_min_pages=1)
+    # Pay the worker start-up cost outside the timed runs
+    parallel._get_pool().submit(int).result()
+
+    modes = (
+        ("legacy", legacy_extract),
+        ("single-pass", lambda data: sequential.extract(data).text),
+        (f"parallel x{args.workers}", lambda data: parallel.extract(data).text),
+    )
+
+    for pdf_path in args.pdfs:
+        pdf_bytes = Path(pdf_path).read_bytes()
+        with fitz.open(stream=pdf_bytes, filetype="pdf") as document:
+            page_count = document.page_count
+
+        print(f"\n{pdf_path} ({page_count} pages, {len(pdf_bytes)} bytes)")
+        for name, fn in modes:
+            timings, text = time_runs(fn, pdf_bytes, args.runs)
+            median = statistics.median(timings)
+            print(
+                f"  {name:<13} median {median * 1000:8.1f} ms  "
+                f"min {min(timings) * 1000:8.1f} ms  "
+                f"{page_count / median:7.1f} pages/s  {len(text)} chars"
+            )
+
+    parallel.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Time the per-query setup of RAGPipeline.query with and without the query
+engine cache.
+
+"rebuild" repeats what query() used to do on every call: a new
+WeaviateVectorStore (which checks the collection schema over HTTP), a new
+VectorStoreIndex and a new query engine. "cached" looks the engine up in
+the LRU that query() now uses. Neither calls the LLM; pass --retrieve to
+also time the retrieval itself for comparison.
+
+Needs the local Weaviate instance RAGPipeline uses (localhost:5000). No
+results have been recorded yet.
+
+Usage: python benchmark_query_engine.py [--iterations N] [--doc-id ID] [--retrieve]
+"""
+
+import argparse
+import statistics
+import time
+
+import weaviate
+from llama_index.core import Settings, VectorStoreIndex
+from llama_index.core.embeddings import MockEmbedding
+from llama_index.core.llms import MockLLM
+from llama_index.core.vector_stores import ExactMatchFilter, MetadataFilters
+from llama_index.vector_stores.weaviate import WeaviateVectorStore
+
+from memory_cache import LRUCache
+
+CLASS_NAME = "PDFDocument"
+QUESTION = "What is the main contribution of this paper?"
+
+
+def build_engine(client, doc_id, top_k: int):
+    vector_store = WeaviateVectorStore(
+        weaviate_client=client,
+        class_name=CLASS_NAME,
+        text_key="content",
+        metadata_key="metadata",
+    )
+    index = VectorStoreIndex([], vector_store=vector_store)
+    filters = None
+    if doc_id:
+        filters = MetadataFilters(filters=[ExactMatchFilter(key="doc_id", value=doc_id)])
+    return index.as_query_engine(
+        similarity_top_k=top_k,
+        vector_store_query_mode="hybrid",
+        filters=filters,
+        llm=MockLLM(),
+    )
+
+
+def report(name: str, seconds) -> None:
+    ms = sorted(s * 1000 for s in seconds)
+    p95 = ms[min(len(ms) - 1, int(0.95 * len(ms)))]
+    print(
+        f"{name:<18} mean={statistics.mean(ms):>8.3f}ms  "
+        f"p50={statistics.median(ms):>8.3f}ms  p95={p95:>8.3f}ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--doc-id", default=None)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--retrieve", action="store_true")
+    args = parser.parse_args()
+
+    # Setup cost only; real embeddings would dominate --retrieve timings
+    Settings.embed_model = MockEmbedding(embed_dim=384)
+    client = weaviate.connect_to_local(host="127.0.0.1", port=5000, grpc_port=50051)
+    try:
+        rebuild = []
+        for _ in range(args.iterations):
+            start = time.perf_counter()
+            build_engine(client, args.doc_id, args.top_k)
+            rebuild.append(time.perf_counter() - start)
+
+        cache = LRUCache(256)
+        key = (args.doc_id, args.top_k, "hybrid")
+        cached = []
+        for _ in range(args.iterations):
+            start = time.perf_counter()
+            engine = cache.get_or_create(
+                key, lambda: build_engine(client, args.doc_id, args.top_k)
+            )
+            cached.append(time.perf_counter() - start)
+
+        print(f"{args.iterations} iterations, doc_id={args.doc_id}, top_k={args.top_k}\n")
+        report("rebuild per query", rebuild)
+        report("cached engine", cached)
+        print(
+            f"\nsetup saved per query: "
+            f"{(statistics.mean(rebuild) - statistics.mean(cached)) * 1000:.3f}ms"
+        )
+
+        if args.retrieve:
+            retrieval = []
+            for _ in range(args.iterations):
+                start = time.perf_counter()
+                engine.retriever.retrieve(QUESTION)
+                retrieval.append(time.perf_counter() - start)
+            report("retrieval", retrieval)
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
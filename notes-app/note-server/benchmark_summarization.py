@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Compare wall-clock time of serial and map-reduce summarization on the
+PDFs in the repo.
+
+By default the configured OpenRouter model is called for real, so the
+numbers include actual API latency. --simulate replaces it with a stand-in
+that waits a fixed time to first token and streams at a fixed rate,
+which isolates the scheduling gain without spending API credits.
+
+Usage: python benchmark_summarization.py [--concurrency N] [--reduce] [--simulate] [pdf ...]
+"""
+
+import argparse
+import asyncio
+import hashlib
+import logging
+import os
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+from dotenv import load_dotenv
+
+from benchmark_pdf_extraction import DEFAULT_PDFS
+from pdf_extractor import PDFExtractor
+from summarizer import SUMMARY_CONCURRENCY, Summarizer
+
+load_dotenv()
+logging.basicConfig(level=logging.WARNING)
+
+
+class SimulatedLLM:
+    """Streams a canned summary with the latency profile of a remote model"""
+
+    def __init__(self, first_token_seconds: float, tokens: int, tokens_per_second: float):
+        self.first_token_seconds = first_token_seconds
+        self.tokens = tokens
+        self.tokens_per_second = tokens_per_second
+
+    def stream_chat(self, messages):
+        """Blocking stream, as the sync client iterates it"""
+        time.sleep(self.first_token_seconds)
+        yield SimpleNamespace(delta=self._tag(messages), additional_kwargs={})
+        # Deltas of 50 tokens keep the stream realistic without a sleep per token
+        for _ in range(0, self.tokens, 50):
+            time.sleep(50 / self.tokens_per_second)
+            yield SimpleNamespace(delta="summary " * 50, additional_kwargs={})
+
+    async def astream_chat(self, messages):
+        async def gen():
+            await asyncio.sleep(self.first_token_seconds)
+            yield SimpleNamespace(delta=self._tag(messages), additional_kwargs={})
+            for _ in range(0, self.tokens, 50):
+                await asyncio.sleep(50 / self.tokens_per_second)
+                yield SimpleNamespace(delta="summary " * 50, additional_kwargs={})
+
+        return gen()
+
+    @staticmethod
+    def _tag(messages) -> str:
+        # Tag the output with its prompt so result order can be checked
+        return f"[{hashlib.sha1(messages[-1].content.encode()).hexdigest()[:8]}] "
+
+
+def build_llm(args):
+    if args.simulate:
+        return SimulatedLLM(args.first_token_seconds, args.tokens, args.tokens_per_second)
+
+    from llama_index.llms.openrouter import OpenRouter
+
+    from http_clients import get_async_http_client, get_http_client
+
+    return OpenRouter(
+        api_key=os.getenv("OPENROUTER_API_KEY"),
+        max_tokens=4000,
+        context_window=8192,
+        model=args.model,
+        timeout=120,
+        http_client=get_http_client(),
+        async_http_client=get_async_http_client(),
+    )
+
+
+def add_llm_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--model", default="nvidia/llama-3.1-nemotron-ultra-253b-v1:free")
+    parser.add_argument("--simulate", action="store_true")
+    parser.add_argument("--first-token-seconds", type=float, default=1.0)
+    parser.add_argument("--tokens", type=int, default=600)
+    parser.add_argument("--tokens-per-second", type=float, default=300)
+
+
+async def run(args) -> None:
+    # Cache off, or the second mode would be served the first mode's summaries
+    summarizer = Summarizer(
+        build_llm(args), concurrency=args.concurrency, use_cache=False
+    )
+
+    extractor = PDFExtractor(max_workers=1)
+    chunks = []
+    for pdf_path in args.pdfs:
+        text = extractor.extract(Path(pdf_path).read_bytes()).text
+        chunks.extend(summarizer.chunk_text(text))
+    chunks = chunks[: args.max_chunks] if args.max_chunks else chunks
+    print(f"{len(chunks)} chunks, concurrency {args.concurrency}, reduce={args.reduce}")
+
+    results = {}
+    for mode in ("serial", "map_reduce"):
+        result = await summarizer.summarize(chunks, mode=mode, reduce=args.reduce)
+        results[mode] = result
+        print(f"\n{mode:<11} {result.elapsed_seconds:>8.2f}s")
+
+    serial, mapped = results["serial"], results["map_reduce"]
+    print(f"\nspeedup: {serial.elapsed_seconds / mapped.elapsed_seconds:.2f}x")
+    if args.simulate:
+        in_order = serial.chunk_summaries == mapped.chunk_summaries
+        print(f"chunk summaries in document order: {in_order}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("pdfs", nargs="*", default=DEFAULT_PDFS)
+    parser.add_argument("--concurrency", type=int, default=SUMMARY_CONCURRENCY)
+    parser.add_argument("--reduce", action="store_true")
+    parser.add_argument("--max-chunks", type=int, default=0)
+    add_llm_arguments(parser)
+    args = parser.parse_args()
+
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Compare the shared chunk collection (one HNSW index, every query filtered
+on user_id and doc_id) with the multi-tenant layout (one tenant per user,
+filtered on doc_id only) on a synthetic corpus in the local Weaviate.
+
+Reports ingest throughput, hybrid query p50/p95 for single documents,
+per-document delete latency, and how long a deactivated tenant takes to
+come back on its first query. Data goes to throwaway collections that are
+deleted afterwards.
+
+Usage: python benchmark_tenancy.py [--users N] [--docs-per-user N] [--chunks-per-doc N] [--queries N]
+"""
+
+import argparse
+import statistics
+import time
+
+import numpy as np
+import weaviate
+from weaviate.classes.query import Filter
+from weaviate.classes.tenants import Tenant, TenantActivityStatus
+
+from RAG import create_chunk_collection
+from tenants import tenant_name
+
+SHARED_CLASS = "BenchTenancyShared"
+TENANT_CLASS = "BenchTenancyTenants"
+DIM = 384
+WORDS_PER_DOC = 50
+
+
+def percentile(values, q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def report(name: str, seconds) -> None:
+    ms = [s * 1000 for s in seconds]
+    print(
+        f"  {name:<10} n={len(ms):<5} p50={statistics.median(ms):>7.1f}ms  "
+        f"p95={percentile(ms, 0.95):>7.1f}ms"
+    )
+
+
+def synthetic_corpus(rng, users: int, docs_per_user: int, chunks_per_doc: int):
+    """Yield (user_id, doc_id, chunk_id, content, vector) for every chunk"""
+    for u in range(users):
+        for d in range(docs_per_user):
+            doc_id = f"{u}-{d}"
+            topic = rng.normal(size=DIM)
+            vectors = topic + 0.8 * rng.normal(size=(chunks_per_doc, DIM))
+            vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+            for c in range(chunks_per_doc):
+                words = rng.integers(0, WORDS_PER_DOC, size=60)
+                content = " ".join(f"doc{doc_id}word{w}" for w in words)
+                yield str(u), doc_id, c, content, vectors[c].tolist()
+
+
+def ingest(client, corpus, multi_tenancy: bool) -> float:
+    """Batch insert the corpus; returns chunks per second"""
+    class_name = TENANT_CLASS if multi_tenancy else SHARED_CLASS
+    count = 0
+    start = time.perf_counter()
+    with client.batch.fixed_size(batch_size=100) as batch:
+        for user_id, doc_id, chunk_id, content, vector in corpus:
+            batch.add_object(
+                collection=class_name,
+                properties={
+                    "content": content,
+                    "doc_id": doc_id,
+                    "user_id": user_id,
+                    "chunk_id": chunk_id,
+                },
+                vector=vector,
+                tenant=tenant_name(user_id) if multi_tenancy else None,
+            )
+            count += 1
+    return count / (time.perf_counter() - start)
+
+
+def scoped(client, multi_tenancy: bool, user_id: str, doc_id: str):
+    """Collection handle and filter reaching one user's document"""
+    doc_filter = Filter.by_property("doc_id").equal(doc_id)
+    if multi_tenancy:
+        return client.collections.get(TENANT_CLASS).with_tenant(tenant_name(user_id)), doc_filter
+    user_filter = Filter.by_property("user_id").equal(user_id)
+    return client.collections.get(SHARED_CLASS), doc_filter & user_filter
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--docs-per-user", type=int, default=20)
+    parser.add_argument("--chunks-per-doc", type=int, default=30)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--deletes", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    client = weaviate.connect_to_local(host="127.0.0.1", port=5000, grpc_port=50051)
+    try:
+        for name in (SHARED_CLASS, TENANT_CLASS):
+            client.collections.delete(name)
+        create_chunk_collection(client, SHARED_CLASS)
+        create_chunk_collection(client, TENANT_CLASS, multi_tenancy=True)
+
+        total = args.users * args.docs_per_user * args.chunks_per_doc
+        print(
+            f"{args.users} users x {args.docs_per_user} docs x "
+            f"{args.chunks_per_doc} chunks = {total} chunks\n"
+        )
+        for multi_tenancy in (False, True):
+            label = "multi-tenant" if multi_tenancy else "shared collection"
+            rng = np.random.default_rng(args.seed)
+            corpus = synthetic_corpus(
+                rng, args.users, args.docs_per_user, args.chunks_per_doc
+            )
+            rate = ingest(client, corpus, multi_tenancy)
+            print(f"{label}: ingest {rate:.0f} chunks/s")
+
+            queries = []
+            for _ in range(args.queries):
+                u = int(rng.integers(args.users))
+                d = int(rng.integers(args.docs_per_user))
+                collection, filters = scoped(client, multi_tenancy, str(u), f"{u}-{d}")
+                words = rng.integers(0, WORDS_PER_DOC, size=6)
+                vector = rng.normal(size=DIM)
+                start = time.perf_counter()
+                collection.query.hybrid(
+                    query=" ".join(f"doc{u}-{d}word{w}" for w in words),
+                    vector=(vector / np.linalg.norm(vector)).tolist(),
+                    limit=5,
+                    filters=filters,
+                )
+                queries.append(time.perf_counter() - start)
+            report("query", queries)
+
+            # Delete whole documents from distinct users, as delete_document does
+            deletes = []
+            for u in range(min(args.deletes, args.users)):
+                collection, filters = scoped(client, multi_tenancy, str(u), f"{u}-0")
+                start = time.perf_counter()
+                collection.data.delete_many(where=filters)
+                deletes.append(time.perf_counter() - start)
+            report("delete", deletes)
+
+        # First query after a tenant was deactivated pays for reloading it
+        tenants = client.collections.get(TENANT_CLASS).tenants
+        reactivations = []
+        for u in range(min(10, args.users)):
+            name = tenant_name(str(u))
+            tenants.update(
+                [Tenant(name=name, activity_status=TenantActivityStatus.INACTIVE)]
+            )
+            start = time.perf_counter()
+            tenants.update([Tenant(name=name, activity_status=TenantActivityStatus.ACTIVE)])
+            client.collections.get(TENANT_CLASS).with_tenant(name).query.fetch_objects(
+                limit=1
+            )
+            reactivations.append(time.perf_counter() - start)
+        print("multi-tenant: inactive tenant back to first result")
+        report("reactivate", reactivations)
+    finally:
+        for name in (SHARED_CLASS, TENANT_CLASS):
+            client.collections.delete(name)
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
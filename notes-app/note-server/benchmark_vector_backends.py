@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Compare the embedded chunk store (NumPy memmap + SQLite FTS5, in-process)
+with the Weaviate chunk store on synthetic corpora of growing size. Both
+are driven through the same ChunkStore interface RAGPipeline uses.
+
+For each --sizes value (total chunks) it reports:
+- ingest throughput;
+- p50/p95 latency of hybrid search filtered to one document (the
+  per-paper chat path);
+- p50/p95 of unfiltered vector-only and hybrid search (library-wide);
+- p50/p95 of deleting a whole document.
+
+For the embedded store, unfiltered vector search runs twice: brute force,
+then with an IVF index built by build_ivf(). Recall@k of the IVF results
+is measured against the brute-force ones.
+
+The embedded store writes to a temporary directory. Weaviate gets a
+throwaway collection on the local instance; --skip-weaviate benchmarks
+the embedded store alone. Everything is deleted afterwards.
+
+Usage: python benchmark_vector_backends.py [--sizes 10000 100000 1000000] [--chunks-per-doc N] [--queries N] [--skip-weaviate]
+"""
+
+import argparse
+import shutil
+import statistics
+import tempfile
+import time
+
+import numpy as np
+
+from embedded_store import EmbeddedChunkStore
+from vector_store import SearchScope
+
+CLASS_NAME = "BenchVectorBackends"
+DIM = 384
+WORDS_PER_DOC = 50
+K = 10
+
+
+def percentile(values, q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def report(name: str, seconds) -> None:
+    ms = [s * 1000 for s in seconds]
+    print(
+        f"  {name:<16} n={len(ms):<5} p50={statistics.median(ms):>8.2f}ms  "
+        f"p95={percentile(ms, 0.95):>8.2f}ms"
+    )
+
+
+def synthetic_documents(rng, docs: int, chunks_per_doc: int):
+    """Yield (doc_id, chunks, vectors) with vectors clustered per document"""
+    for d in range(docs):
+        topic = rng.normal(size=DIM)
+        vectors = topic + 0.8 * rng.normal(size=(chunks_per_doc, DIM))
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        chunks = [
+            " ".join(
+                f"doc{d}word{w}" for w in rng.integers(0, WORDS_PER_DOC, size=60)
+            )
+            for _ in range(chunks_per_doc)
+        ]
+        yield str(d), chunks, vectors.astype(np.float32).tolist()
+
+
+def ingest(store, rng, docs: int, chunks_per_doc: int):
+    """
+    Insert the corpus document by document; returns chunks per second and
+    the first chunk vector of every document
+    """
+    count, anchors = 0, []
+    start = time.perf_counter()
+    for doc_id, chunks, vectors in synthetic_documents(rng, docs, chunks_per_doc):
+        count += store.insert(doc_id, chunks, vectors, {"user_id": "bench"})
+        anchors.append(vectors[0])
+    return count / (time.perf_counter() - start), np.asarray(anchors)
+
+
+def make_queries(rng, anchors: np.ndarray, n: int):
+    """(doc_id, text, vector) triples near a stored chunk of a random document"""
+    queries = []
+    for _ in range(n):
+        d = int(rng.integers(len(anchors)))
+        words = rng.integers(0, WORDS_PER_DOC, size=6)
+        vector = anchors[d] + 0.05 * rng.normal(size=DIM)
+        queries.append(
+            (
+                str(d),
+                " ".join(f"doc{d}word{w}" for w in words),
+                (vector / np.linalg.norm(vector)).tolist(),
+            )
+        )
+    return queries
+
+
+def timed_search(store, queries, scoped: bool, alpha: float):
+    """Latencies and hit lists of one search per query"""
+    latencies, results = [], []
+    for doc_id, text, vector in queries:
+        scopes = [SearchScope(doc_ids=[doc_id])] if scoped else []
+        start = time.perf_counter()
+        hits = store.search(text, vector, scopes, K, alpha=alpha)
+        latencies.append(time.perf_counter() - start)
+        results.append({(hit["doc_id"], hit["chunk_id"]) for hit in hits})
+    return latencies, results
+
+
+def run(store, label: str, rng, args, docs: int, ivf: bool = False) -> None:
+    rate, anchors = ingest(store, rng, docs, args.chunks_per_doc)
+    print(f"{label}: ingest {rate:.0f} chunks/s")
+
+    queries = make_queries(rng, anchors, args.queries)
+    # Warm caches (page cache for the memmap, gRPC channel for Weaviate)
+    timed_search(store, queries[:10], scoped=False, alpha=0.5)
+
+    report("doc hybrid", timed_search(store, queries, scoped=True, alpha=0.5)[0])
+    latencies, exact = timed_search(store, queries, scoped=False, alpha=1.0)
+    report("library vector", latencies)
+    report("library hybrid", timed_search(store, queries, scoped=False, alpha=0.5)[0])
+
+    if ivf:
+        start = time.perf_counter()
+        store.build_ivf()
+        print(f"  IVF built in {time.perf_counter() - start:.1f}s")
+        latencies, approximate = timed_search(store, queries, scoped=False, alpha=1.0)
+        recall = statistics.mean(
+            len(found & expected) / max(len(expected), 1)
+            for found, expected in zip(approximate, exact)
+        )
+        report("ivf vector", latencies)
+        print(f"  ivf recall@{K}   {recall:.3f} (vs brute force)")
+
+    deletes = []
+    for d in range(min(args.deletes, docs)):
+        start = time.perf_counter()
+        store.delete(str(d))
+        deletes.append(time.perf_counter() - start)
+    report("delete doc", deletes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--chunks-per-doc", type=int, default=50)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--deletes", type=int, default=20)
+    parser.add_argument("--skip-weaviate", action="store_true")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    client = None
+    if not args.skip_weaviate:
+        import weaviate
+
+        from RAG import create_chunk_collection
+        from vector_store import WeaviateChunkStore
+
+        client = weaviate.connect_to_local(host="127.0.0.1", port=5000, grpc_port=50051)
+
+    try:
+        for size in args.sizes:
+            docs = max(1, size // args.chunks_per_doc)
+            print(
+                f"\n{docs} docs x {args.chunks_per_doc} chunks = "
+                f"{docs * args.chunks_per_doc} chunks, {DIM} dims"
+            )
+
+            path = tempfile.mkdtemp(prefix="bench_embedded_")
+            store = EmbeddedChunkStore(path)
+            try:
+                run(store, "embedded", np.random.default_rng(args.seed), args, docs, ivf=True)
+            finally:
+                store.close()
+                shutil.rmtree(path, ignore_errors=True)
+
+            if client is not None:
+                client.collections.delete(CLASS_NAME)
+                create_chunk_collection(client, CLASS_NAME)
+                store = WeaviateChunkStore(lambda: client, CLASS_NAME)
+                try:
+                    run(store, "weaviate", np.random.default_rng(args.seed), args, docs)
+                finally:
+                    client.collections.delete(CLASS_NAME)
+    finally:
+        if client is not None:
+            client.close()
+
+
+if __name__ == "__main__":
+    main()
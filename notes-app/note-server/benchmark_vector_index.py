@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Recall vs latency vs memory of Weaviate vector index settings, measured
+against the local Weaviate instance on a synthetic clustered corpus of
+384-dim vectors (the size of the MiniLM embeddings the pipeline stores).
+
+For each compression (none, pq, bq, sq) a throwaway collection is built
+with the given efConstruction/maxConnections and filled. PQ is enabled
+after the load so it trains on the stored vectors. Then each --ef value
+is applied in turn and --queries nearest-neighbour searches are run.
+Recall@k is measured against exact brute-force cosine neighbours
+computed with NumPy.
+
+Memory is reported two ways:
+- an estimate of vectors plus graph links;
+- with --metrics-url, the growth of the Weaviate heap between an empty
+  server and the loaded collection. This needs
+  PROMETHEUS_MONITORING_ENABLED=true on the container.
+
+No results have been recorded yet, so WEAVIATE_VECTOR_COMPRESSION stays
+"none" by default.
+
+Usage: python benchmark_vector_index.py [--vectors N] [--compression none pq bq sq] [--ef 64 128 256] [--metrics-url URL]
+"""
+
+import argparse
+import statistics
+import time
+from dataclasses import replace
+
+import numpy as np
+import requests
+import weaviate
+from weaviate.classes.config import Configure, DataType, Property, Reconfigure
+from weaviate.util import generate_uuid5
+
+from vector_index import VectorIndexSettings
+
+CLASS_NAME = "BenchVectorIndex"
+DIM = 384
+
+
+def percentile(values, q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def synthetic_vectors(rng, n: int, clusters: int) -> np.ndarray:
+    """Unit vectors grouped around random topics, like chunks of many papers"""
+    centers = rng.normal(size=(clusters, DIM)).astype(np.float32)
+    labels = rng.integers(0, clusters, size=n)
+    vectors = centers[labels] + 0.6 * rng.normal(size=(n, DIM)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def exact_neighbours(corpus: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    scores = queries @ corpus.T
+    return np.argpartition(-scores, k, axis=1)[:, :k]
+
+
+def heap_bytes(metrics_url: str) -> float:
+    """Weaviate Go heap in use, from its Prometheus endpoint"""
+    for line in requests.get(metrics_url, timeout=10).text.splitlines():
+        if line.startswith("go_memstats_heap_inuse_bytes"):
+            return float(line.split()[-1])
+    raise ValueError(f"go_memstats_heap_inuse_bytes not found at {metrics_url}")
+
+
+def wait_for_compression(collection, timeout: float = 600) -> None:
+    """Block until the quantizer shows up in the collection config"""
+    deadline = time.monotonic() + timeout
+    while collection.config.get().vector_index_config.quantizer is None:
+        if time.monotonic() > deadline:
+            raise TimeoutError("Compression did not finish in time")
+        time.sleep(1)
+
+
+def build(client, corpus: np.ndarray, settings: VectorIndexSettings, batch_size: int):
+    """Create and fill the benchmark collection; returns (collection, seconds)"""
+    client.collections.delete(CLASS_NAME)
+    # PQ needs vectors to train on, so it is switched on after the load
+    initial = settings
+    if settings.compression == "pq":
+        initial = replace(settings, compression="none")
+    collection = client.collections.create(
+        name=CLASS_NAME,
+        vectorizer_config=Configure.Vectorizer.none(),
+        vector_index_config=initial.create_config(),
+        properties=[Property(name="i", data_type=DataType.INT)],
+    )
+
+    start = time.perf_counter()
+    with collection.batch.fixed_size(batch_size=batch_size) as batch:
+        for i, vector in enumerate(corpus):
+            batch.add_object(
+                properties={"i": i}, uuid=generate_uuid5(i), vector=vector.tolist()
+            )
+    if settings.compression == "pq":
+        settings.apply(collection)
+        wait_for_compression(collection)
+    return collection, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--vectors", type=int, default=100000)
+    parser.add_argument("--clusters", type=int, default=500)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument(
+        "--compression", nargs="+", default=["none", "pq", "bq", "sq"]
+    )
+    parser.add_argument("--ef", type=int, nargs="+", default=[32, 64, 128, 256])
+    parser.add_argument("--ef-construction", type=int, default=128)
+    parser.add_argument("--max-connections", type=int, default=32)
+    parser.add_argument("--pq-segments", type=int, default=96)
+    parser.add_argument("--rescore-limit", type=int, default=-1)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--metrics-url", default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    corpus = synthetic_vectors(rng, args.vectors + args.queries, args.clusters)
+    corpus, queries = corpus[: args.vectors], corpus[args.vectors :]
+    truth = exact_neighbours(corpus, queries, args.k)
+    print(
+        f"{args.vectors} vectors x {DIM} dims, {args.queries} queries, "
+        f"recall@{args.k}, efConstruction={args.ef_construction}, "
+        f"maxConnections={args.max_connections}\n"
+    )
+    print(
+        f"{'compression':<12}{'ef':>6}{'recall':>9}{'p50 ms':>9}{'p95 ms':>9}"
+        f"{'est MB':>9}{'heap MB':>9}{'load s':>8}"
+    )
+
+    client = weaviate.connect_to_local(host="127.0.0.1", port=5000, grpc_port=50051)
+    try:
+        for compression in args.compression:
+            settings = VectorIndexSettings(
+                compression=compression,
+                ef_construction=args.ef_construction,
+                max_connections=args.max_connections,
+                pq_segments=args.pq_segments,
+                training_limit=min(args.vectors, 100000),
+                rescore_limit=args.rescore_limit,
+            )
+            client.collections.delete(CLASS_NAME)
+            baseline = heap_bytes(args.metrics_url) if args.metrics_url else None
+            collection, load_seconds = build(client, corpus, settings, args.batch_size)
+            heap = "-"
+            if baseline is not None:
+                heap = f"{(heap_bytes(args.metrics_url) - baseline) / 2**20:.0f}"
+            # Layer 0 keeps up to 2 * maxConnections 8-byte links per node
+            estimate = args.vectors * (
+                settings.bytes_per_vector(DIM) + 2 * args.max_connections * 8
+            )
+
+            for ef in args.ef:
+                collection.config.update(
+                    vector_index_config=Reconfigure.VectorIndex.hnsw(ef=ef)
+                )
+                for query in queries[:10]:
+                    collection.query.near_vector(query.tolist(), limit=args.k)
+
+                latencies, recalls = [], []
+                for query, expected in zip(queries, truth):
+                    start = time.perf_counter()
+                    response = collection.query.near_vector(
+                        near_vector=query.tolist(),
+                        limit=args.k,
+                        return_properties=["i"],
+                    )
+                    latencies.append(time.perf_counter() - start)
+                    found = {obj.properties["i"] for obj in response.objects}
+                    recalls.append(len(found & set(expected.tolist())) / args.k)
+
+                ms = [s * 1000 for s in latencies]
+                print(
+                    f"{compression:<12}{ef:>6}{statistics.mean(recalls):>9.3f}"
+                    f"{statistics.median(ms):>9.2f}{percentile(ms, 0.95):>9.2f}"
+                    f"{estimate / 2**20:>9.0f}{heap:>9}{load_seconds:>8.1f}"
+                )
+    finally:
+        client.collections.delete(CLASS_NAME)
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
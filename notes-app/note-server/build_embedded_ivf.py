@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""
+Build (or rebuild) the IVF index of the embedded chunk store. The worker
+builds it once EMBEDDED_IVF_MIN_ROWS chunks are stored. Run this to build
+it earlier, or to retrain the lists after the corpus has drifted. Safe
+to run while the API and workers use the store.
+
+Usage: python build_embedded_ivf.py [--path DIR] [--lists N] [--iterations N]
+"""
+
+import argparse
+import logging
+
+from embedded_store import EMBEDDED_STORE_PATH, EmbeddedChunkStore
+
+logging.basicConfig(level=logging.INFO)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--path", default=EMBEDDED_STORE_PATH)
+    parser.add_argument("--lists", type=int, default=None)
+    parser.add_argument("--iterations", type=int, default=10)
+    args = parser.parse_args()
+
+    store = EmbeddedChunkStore(args.path)
+    try:
+        store.build_ivf(lists=args.lists, iterations=args.iterations)
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
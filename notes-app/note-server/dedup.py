@@ -0,0 +1,207 @@
+import hashlib
+import logging
+from datetime import datetime, timezone
+from typing import BinaryIO, Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+import models
+from database import sessionLocal
+
+logger = logging.getLogger(__name__)
+
+# PDF chunks are stored under the PdfDocument id. Video ids come from a
+# separate table, so video chunks and centroids get a prefixed id instead.
+VIDEO_DOC_ID_PREFIX = "video_"
+
+
+def video_vector_doc_id(video_id) -> str:
+    """Id a video's chunks and centroid are stored under"""
+    return f"{VIDEO_DOC_ID_PREFIX}{video_id}"
+
+
+def _pdf_id(doc_id) -> Optional[int]:
+    """PdfDocument id behind a vector doc id, or None for other documents"""
+    doc_id = str(doc_id)
+    return int(doc_id) if doc_id.isdigit() else None
+
+
+def compute_content_hash(fileobj: BinaryIO, chunk_size: int = 1024 * 1024) -> str:
+    """SHA-256 of an uploaded file, leaving the stream rewound for the S3 upload"""
+    digest = hashlib.sha256()
+    fileobj.seek(0)
+    for block in iter(lambda: fileobj.read(chunk_size), b""):
+        digest.update(block)
+    fileobj.seek(0)
+    return digest.hexdigest()
+
+
+def find_canonical_document(
+    db: Session, content_hash: str, exclude_id: int
+) -> Optional[models.PdfDocument]:
+    """Return the completed document that owns the chunks for these PDF bytes"""
+    if not content_hash:
+        return None
+
+    return (
+        db.query(models.PdfDocument)
+        .filter(
+            models.PdfDocument.content_hash == content_hash,
+            models.PdfDocument.processing_status == "completed",
+            models.PdfDocument.source_doc_id.is_(None),
+            models.PdfDocument.id != exclude_id,
+        )
+        .order_by(models.PdfDocument.id)
+        .first()
+    )
+
+
+def link_duplicate_document(
+    db: Session, pdf_doc: models.PdfDocument, canonical: models.PdfDocument
+) -> Optional[str]:
+    """
+    Point pdf_doc at the canonical document's chunks and copy its analysis
+    and related papers, so a repeat upload needs no extraction, embedding
+    or LLM work. Returns the reused analysis.
+    """
+    canonical_history = (
+        db.query(models.History).filter_by(doc_id=str(canonical.id)).first()
+    )
+    if canonical_history is None:
+        return None
+
+    pdf_doc.source_doc_id = canonical.id
+    pdf_doc.processing_status = "completed"
+
+    db.add(
+        models.History(
+            user_id=pdf_doc.user_id,
+            doc_id=str(pdf_doc.id),
+            file_name=pdf_doc.file_name,
+            s3_url=pdf_doc.s3_url,
+            analysis=canonical_history.analysis,
+            processing_status="completed",
+            timestamp=datetime.now(tz=timezone.utc),
+        )
+    )
+
+    for paper in canonical.related_papers:
+        db.add(
+            models.RelatedPaper(
+                doc_id=pdf_doc.id,
+                title=paper.title,
+                url=paper.url,
+                authors=paper.authors,
+                publication_year=paper.publication_year,
+                abstract=paper.abstract,
+                categories=paper.categories,
+                relevance_score=paper.relevance_score,
+            )
+        )
+
+    db.commit()
+    logger.info(
+        f"Linked document {pdf_doc.id} to existing document {canonical.id} "
+        f"(sha256 {pdf_doc.content_hash[:12]})"
+    )
+    return canonical_history.analysis
+
+
+def resolve_vector_doc_id(doc_id: str) -> str:
+    """Map a document id to the id its chunks and vectors are stored under"""
+    pdf_id = _pdf_id(doc_id)
+    if pdf_id is None:
+        # Only PDFs are deduplicated
+        return str(doc_id)
+
+    db = sessionLocal()
+    try:
+        pdf_doc = db.query(models.PdfDocument).filter_by(id=pdf_id).first()
+        if pdf_doc and pdf_doc.source_doc_id:
+            return str(pdf_doc.source_doc_id)
+        return str(doc_id)
+    except Exception as e:
+        logger.warning(f"Could not resolve vector doc_id for {doc_id}: {str(e)}")
+        return str(doc_id)
+    finally:
+        db.close()
+
+
+def vector_doc_ids_for_user(
+    db: Session, user_id: str, doc_id: Optional[str] = None
+) -> Dict[str, List[str]]:
+    """
+    Map the vector doc ids a user's PDFs are stored under to the user's own
+    document ids, optionally for a single document. Deduplicated uploads
+    point at the original upload's chunks.
+    """
+    query = db.query(models.PdfDocument).filter_by(user_id=user_id)
+    if doc_id is not None:
+        query = query.filter_by(id=doc_id)
+
+    mapping: Dict[str, List[str]] = {}
+    for pdf_doc in query.all():
+        vector_doc_id = str(pdf_doc.source_doc_id or pdf_doc.id)
+        mapping.setdefault(vector_doc_id, []).append(str(pdf_doc.id))
+    return mapping
+
+
+def count_linked_documents(doc_id: str) -> int:
+    """Number of other documents still reading this document's chunks"""
+    pdf_id = _pdf_id(doc_id)
+    if pdf_id is None:
+        return 0
+
+    db = sessionLocal()
+    try:
+        return (
+            db.query(models.PdfDocument)
+            .filter(models.PdfDocument.source_doc_id == pdf_id)
+            .count()
+        )
+    finally:
+        db.close()
+
+
+def _video_id(doc_id) -> Optional[int]:
+    """VideoDocument id behind a vector doc id, or None for other documents"""
+    doc_id = str(doc_id)
+    if not doc_id.startswith(VIDEO_DOC_ID_PREFIX):
+        return None
+    video_id = doc_id[len(VIDEO_DOC_ID_PREFIX) :]
+    return int(video_id) if video_id.isdigit() else None
+
+
+def chunk_owners(vector_doc_ids: List[str]) -> Dict[str, str]:
+    """
+    Map vector doc ids of PDFs and videos to the user whose upload owns the
+    chunks, which is the tenant holding them in multi-tenant mode. Unknown
+    ids are omitted.
+    """
+    pdf_ids = {_pdf_id(doc_id) for doc_id in vector_doc_ids} - {None}
+    video_ids = {_video_id(doc_id) for doc_id in vector_doc_ids} - {None}
+    if not pdf_ids and not video_ids:
+        return {}
+
+    db = sessionLocal()
+    try:
+        owners = {}
+        if pdf_ids:
+            rows = (
+                db.query(models.PdfDocument.id, models.PdfDocument.user_id)
+                .filter(models.PdfDocument.id.in_(pdf_ids))
+                .all()
+            )
+            owners.update({str(doc_id): str(user_id) for doc_id, user_id in rows})
+        if video_ids:
+            rows = (
+                db.query(models.VideoDocument.id, models.VideoDocument.user_id)
+                .filter(models.VideoDocument.id.in_(video_ids))
+                .all()
+            )
+            owners.update(
+                {video_vector_doc_id(doc_id): str(user_id) for doc_id, user_id in rows}
+            )
+        return owners
+    finally:
+        db.close()
@@ -0,0 +1,216 @@
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Triggers keep meta.bytes_used equal to SUM(entries.size)
+_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS entries (
+        key TEXT PRIMARY KEY,
+        value TEXT NOT NULL,
+        size INTEGER NOT NULL,
+        expires_at REAL,
+        last_access REAL NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)",
+    "CREATE INDEX IF NOT EXISTS entries_expires_at ON entries (expires_at)",
+    "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)",
+    """
+    CREATE TRIGGER IF NOT EXISTS entries_size_insert AFTER INSERT ON entries
+    BEGIN
+        UPDATE meta SET value = value + NEW.size WHERE key = 'bytes_used';
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS entries_size_delete AFTER DELETE ON entries
+    BEGIN
+        UPDATE meta SET value = value - OLD.size WHERE key = 'bytes_used';
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS entries_size_update AFTER UPDATE OF size ON entries
+    BEGIN
+        UPDATE meta SET value = value + NEW.size - OLD.size WHERE key = 'bytes_used';
+    END
+    """,
+)
+
+
+class DiskLRUCache:
+    """
+    Size-bounded key/value cache on local disk, backed by SQLite.
+
+    Entries are evicted least-recently-used first once the stored values
+    exceed max_bytes, and entries with a TTL expire on read. The file can be
+    shared by several processes; each thread gets its own connection.
+
+    The total size is kept in a meta row that triggers update in the same
+    transaction as each write, so checking the bound never scans the table.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_bytes: int,
+        default_ttl: Optional[int] = None,
+    ):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for statement in _SCHEMA:
+                conn.execute(statement)
+            # One scan for caches created before the running total existed
+            conn.execute(
+                "INSERT OR IGNORE INTO meta (key, value) "
+                "SELECT 'bytes_used', COALESCE(SUM(size), 0) FROM entries"
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _record(self, hit: bool) -> None:
+        with self._stats_lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached value, or None on a miss or expired entry"""
+        try:
+            conn = self._connection()
+            now = time.time()
+            row = conn.execute(
+                "SELECT value, expires_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is None:
+                self._record(False)
+                return None
+
+            value, expires_at = row
+            if expires_at is not None and expires_at <= now:
+                conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self._record(False)
+                return None
+
+            conn.execute(
+                "UPDATE entries SET last_access = ? WHERE key = ?", (now, key)
+            )
+            self._record(True)
+            return value
+        except sqlite3.Error as e:
+            logger.warning(f"Disk cache read failed for {self.path}: {str(e)}")
+            self._record(False)
+            return None
+
+    def set(self, key: str, value: str, ttl: Optional[int] = None) -> None:
+        """Store a value and evict least-recently-used entries over the size bound"""
+        ttl = ttl if ttl is not None else self.default_ttl
+        now = time.time()
+        expires_at = now + ttl if ttl else None
+        size = len(key) + len(value.encode("utf-8"))
+
+        try:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # An upsert rather than INSERT OR REPLACE, whose implicit
+                # delete would not fire the size triggers
+                conn.execute(
+                    "INSERT INTO entries (key, value, size, expires_at, last_access) "
+                    "VALUES (?, ?, ?, ?, ?) ON CONFLICT (key) DO UPDATE SET "
+                    "value = excluded.value, size = excluded.size, "
+                    "expires_at = excluded.expires_at, last_access = excluded.last_access",
+                    (key, value, size, expires_at, now),
+                )
+                self._evict(conn)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        except sqlite3.Error as e:
+            logger.warning(f"Disk cache write failed for {self.path}: {str(e)}")
+
+    def delete(self, key: str) -> None:
+        try:
+            self._connection().execute("DELETE FROM entries WHERE key = ?", (key,))
+        except sqlite3.Error as e:
+            logger.warning(f"Disk cache delete failed for {self.path}: {str(e)}")
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        conn.execute(
+            "DELETE FROM entries WHERE expires_at IS NOT NULL AND expires_at <= ?",
+            (time.time(),),
+        )
+        total = self._total(conn)
+        if total <= self.max_bytes:
+            return
+
+        # Drop the oldest entries until we are back under the bound
+        excess = total - self.max_bytes
+        freed = 0
+        victims = []
+        for key, size in conn.execute(
+            "SELECT key, size FROM entries ORDER BY last_access ASC"
+        ):
+            victims.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        conn.executemany("DELETE FROM entries WHERE key = ?", victims)
+        logger.info(f"Evicted {len(victims)} entries ({freed} bytes) from {self.path}")
+
+    @staticmethod
+    def _total(conn: sqlite3.Connection) -> int:
+        return conn.execute(
+            "SELECT value FROM meta WHERE key = 'bytes_used'"
+        ).fetchone()[0]
+
+    @property
+    def bytes_used(self) -> int:
+        try:
+            return self._total(self._connection())
+        except sqlite3.Error:
+            return 0
+
+    @property
+    def hit_rate(self) -> float:
+        with self._stats_lock:
+            total = self.hits + self.misses
+            return self.hits / total if total else 0.0
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hit_rate,
+            "bytes_used": self.bytes_used,
+            "max_bytes": self.max_bytes,
+        }
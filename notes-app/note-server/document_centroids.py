@@ -0,0 +1,135 @@
+import logging
+import os
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Callable, List, Optional
+
+import numpy as np
+import weaviate
+from weaviate.classes.config import Configure, DataType, Property
+from weaviate.classes.query import Filter, MetadataQuery
+from weaviate.util import generate_uuid5
+
+logger = logging.getLogger(__name__)
+
+CENTROID_CLASS_NAME = os.getenv("CENTROID_CLASS_NAME", "DocumentCentroid")
+
+
+@dataclass
+class CandidateDocument:
+    doc_id: str
+    # Id the document's chunks are stored under (differs for deduplicated uploads)
+    vector_doc_id: str
+    similarity: float
+
+
+def centroid(embeddings: List[List[float]]) -> List[float]:
+    """Normalized mean of a document's chunk embeddings"""
+    vectors = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    mean = (vectors / np.where(norms == 0, 1, norms)).mean(axis=0)
+    return (mean / (np.linalg.norm(mean) or 1.0)).tolist()
+
+
+class DocumentCentroids:
+    """
+    One vector per user document (the centroid of its chunk embeddings) in
+    a small Weaviate collection, filterable by user_id. Library-wide search
+    ranks a user's documents against the question here first, then
+    searches chunks only inside the best candidates.
+    """
+
+    def __init__(
+        self,
+        get_client: Callable[[], weaviate.WeaviateClient],
+        class_name: str = CENTROID_CLASS_NAME,
+    ):
+        self._get_client = get_client
+        self.class_name = class_name
+
+    @property
+    def collection(self):
+        return self._get_client().collections.get(self.class_name)
+
+    def ensure_schema(self) -> None:
+        client = self._get_client()
+        if client.collections.exists(self.class_name):
+            return
+        client.collections.create(
+            name=self.class_name,
+            vectorizer_config=Configure.Vectorizer.none(),
+            properties=[
+                Property(name="doc_id", data_type=DataType.TEXT),
+                Property(name="vector_doc_id", data_type=DataType.TEXT),
+                Property(name="user_id", data_type=DataType.TEXT),
+                Property(name="chunk_count", data_type=DataType.INT),
+                Property(name="updated_at", data_type=DataType.DATE),
+            ],
+        )
+        logger.info(f"Created Weaviate collection {self.class_name}")
+
+    def upsert(
+        self,
+        doc_id: str,
+        user_id: str,
+        vector: List[float],
+        chunk_count: int,
+        vector_doc_id: Optional[str] = None,
+    ) -> None:
+        properties = {
+            "doc_id": str(doc_id),
+            "vector_doc_id": str(vector_doc_id or doc_id),
+            "user_id": str(user_id),
+            "chunk_count": chunk_count,
+            "updated_at": datetime.now(tz=timezone.utc).isoformat(),
+        }
+        # PDFs and videos never share a doc_id (see video_vector_doc_id), so
+        # neither overwrites the other's centroid
+        uuid = generate_uuid5(f"centroid_{doc_id}")
+        collection = self.collection
+        if collection.data.exists(uuid):
+            collection.data.replace(uuid=uuid, properties=properties, vector=vector)
+        else:
+            collection.data.insert(uuid=uuid, properties=properties, vector=vector)
+
+    def link(self, doc_id: str, user_id: str, vector_doc_id: str) -> bool:
+        """Give a deduplicated upload the centroid of the document it reuses"""
+        source = self.collection.query.fetch_object_by_id(
+            generate_uuid5(f"centroid_{vector_doc_id}"), include_vector=True
+        )
+        if source is None:
+            logger.warning(f"No centroid for doc_id {vector_doc_id} to link {doc_id} to")
+            return False
+        self.upsert(
+            doc_id,
+            user_id,
+            source.vector["default"],
+            source.properties.get("chunk_count") or 0,
+            vector_doc_id=vector_doc_id,
+        )
+        return True
+
+    def delete(self, doc_id: str) -> None:
+        self.collection.data.delete_many(
+            where=Filter.by_property("doc_id").equal(str(doc_id))
+        )
+
+    def candidates(
+        self, user_id: str, query_vector: List[float], limit: int
+    ) -> List[CandidateDocument]:
+        """The user's documents whose centroids are closest to the query"""
+        response = self.collection.query.near_vector(
+            near_vector=query_vector,
+            limit=limit,
+            filters=Filter.by_property("user_id").equal(str(user_id)),
+            return_properties=["doc_id", "vector_doc_id"],
+            return_metadata=MetadataQuery(distance=True),
+        )
+        return [
+            CandidateDocument(
+                doc_id=obj.properties["doc_id"],
+                vector_doc_id=obj.properties["vector_doc_id"],
+                similarity=1.0 - float(obj.metadata.distance or 0.0),
+            )
+            for obj in response.objects
+        ]
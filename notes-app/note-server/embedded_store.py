@@ -0,0 +1,606 @@
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from document_centroids import CandidateDocument
+from vector_store import ChunkStore, SearchScope
+
+logger = logging.getLogger(__name__)
+
+EMBEDDED_STORE_PATH = os.getenv("EMBEDDED_STORE_PATH", "./vector_store")
+# Once this many chunks are stored, unfiltered searches switch from brute
+# force to an IVF index, trained by the worker (or build_embedded_ivf.py);
+# 0 disables IVF
+EMBEDDED_IVF_MIN_ROWS = int(os.getenv("EMBEDDED_IVF_MIN_ROWS", 200000))
+# IVF lists probed per query; more is slower and closer to brute force
+EMBEDDED_IVF_NPROBE = int(os.getenv("EMBEDDED_IVF_NPROBE", 16))
+# Candidates taken from each side of a hybrid search before fusion
+EMBEDDED_HYBRID_CANDIDATES = int(os.getenv("EMBEDDED_HYBRID_CANDIDATES", 100))
+
+_BLOCK_ROWS = 1 << 18
+_WORD_RE = re.compile(r"\w+")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS settings (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS chunks (
+    row INTEGER PRIMARY KEY,
+    uuid TEXT UNIQUE,
+    doc_id TEXT,
+    user_id TEXT,
+    chunk_id INTEGER,
+    content TEXT,
+    properties TEXT
+);
+CREATE INDEX IF NOT EXISTS chunks_doc_id ON chunks (doc_id);
+CREATE INDEX IF NOT EXISTS chunks_user_id ON chunks (user_id);
+CREATE VIRTUAL TABLE IF NOT EXISTS chunks_fts USING fts5 (
+    content, content='chunks', content_rowid='row'
+);
+CREATE TABLE IF NOT EXISTS centroids (
+    doc_id TEXT PRIMARY KEY,
+    vector_doc_id TEXT,
+    user_id TEXT,
+    chunk_count INTEGER,
+    vector BLOB
+);
+CREATE INDEX IF NOT EXISTS centroids_user_id ON centroids (user_id);
+"""
+
+
+def _normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def _rescale(scores: Dict[int, float]) -> Dict[int, float]:
+    """Min-max scale to [0, 1], as Weaviate's relative score fusion does"""
+    if not scores:
+        return {}
+    low, high = min(scores.values()), max(scores.values())
+    if high == low:
+        return {row: 1.0 for row in scores}
+    return {row: (score - low) / (high - low) for row, score in scores.items()}
+
+
+def _nearest(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    return np.argmax(vectors @ centroids.T, axis=1).astype(np.int32)
+
+
+def _top(rows: np.ndarray, scores: np.ndarray, k: int) -> Dict[int, float]:
+    if len(rows) > k:
+        best = np.argpartition(-scores, k)[:k]
+        rows, scores = rows[best], scores[best]
+    return dict(zip(rows.tolist(), scores.tolist()))
+
+
+class EmbeddedChunkStore(ChunkStore):
+    """
+    In-process chunk store for single-node and test deployments, with no
+    Weaviate server. Vectors are normalized float32 rows in a memory-mapped
+    file; metadata, chunk text and a BM25 keyword index (SQLite FTS5) live
+    in a SQLite database next to it.
+
+    Filtered searches score the matching rows exactly. Unfiltered searches
+    use brute force until EMBEDDED_IVF_MIN_ROWS chunks are stored, then an
+    IVF index (k-means lists, EMBEDDED_IVF_NPROBE probed per query); new
+    rows join their nearest list. Hybrid search fuses min-max scaled
+    vector and BM25 scores with weight alpha, like Weaviate's relative
+    score fusion. Rows of deleted chunks are not reused.
+
+    Several processes (the API and ingestion workers) may open the same
+    path. Writes take SQLite's write lock and bump a version counter;
+    every operation first reloads the row count, live mask and IVF
+    centroids when another process changed them.
+    """
+
+    def __init__(self, path: str = EMBEDDED_STORE_PATH, dim: Optional[int] = None):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.RLock()
+        self.db = sqlite3.connect(
+            self.path / "chunks.db",
+            check_same_thread=False,
+            isolation_level=None,
+            timeout=30,
+        )
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(_SCHEMA)
+
+        self.dim = dim or 0
+        self.rows = 0
+        self._capacity = 0
+        self._vectors = None
+        self._lists = None
+        self.alive = np.zeros(0, dtype=bool)
+        self.ivf_centroids = None
+        # Versions of the stored data this process has loaded
+        self._version = -1
+        self._ivf_version = -1
+        with self._lock:
+            self._refresh()
+        logger.info(f"Opened embedded chunk store at {self.path} ({self.count()} chunks)")
+
+    def _setting(self, key: str) -> Optional[str]:
+        row = self.db.execute("SELECT value FROM settings WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set(self, key: str, value) -> None:
+        self.db.execute(
+            "INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)", (key, str(value))
+        )
+
+    def _open(self, capacity: int) -> None:
+        """(Re)map the vector and IVF list files with room for `capacity` rows"""
+        if self._vectors is not None:
+            self._vectors.flush()
+            self._lists.flush()
+        for name, dtype, width in (
+            ("vectors.f32", np.float32, self.dim),
+            ("lists.i32", np.int32, 1),
+        ):
+            file = self.path / name
+            size = capacity * width * np.dtype(dtype).itemsize
+            with open(file, "ab") as f:
+                if f.tell() < size:
+                    f.truncate(size)
+        self._vectors = np.memmap(
+            self.path / "vectors.f32", dtype=np.float32, mode="r+", shape=(capacity, self.dim)
+        )
+        self._lists = np.memmap(
+            self.path / "lists.i32", dtype=np.int32, mode="r+", shape=(capacity,)
+        )
+        alive = np.zeros(capacity, dtype=bool)
+        alive[: len(self.alive)] = self.alive
+        self.alive = alive
+        self._capacity = capacity
+
+    def _refresh(self) -> None:
+        """Reload state another process may have changed since the last call"""
+        version = int(self._setting("version") or 0)
+        if version == self._version:
+            return
+        self.dim = int(self._setting("dim") or self.dim or 0)
+        if self.dim:
+            rows = int(self._setting("rows") or 0)
+            if self._vectors is None or rows > self._capacity:
+                self._open(max(rows, 1024))
+            self.rows = rows
+            self._load_alive()
+
+        ivf_version = int(self._setting("ivf_version") or 0)
+        if ivf_version != self._ivf_version:
+            ivf_path = self.path / "ivf_centroids.npy"
+            self.ivf_centroids = np.load(ivf_path) if ivf_path.exists() else None
+            self._ivf_version = ivf_version
+        self._version = version
+
+    def _bump(self) -> None:
+        """Mark the data changed; call inside the write transaction"""
+        self._version = int(self._setting("version") or 0) + 1
+        self._set("version", self._version)
+
+    def _write(self):
+        """Start a write transaction, serialized across processes"""
+        self.db.execute("BEGIN IMMEDIATE")
+        try:
+            self._refresh()
+        except Exception:
+            self.db.execute("ROLLBACK")
+            raise
+
+    def _rollback(self) -> None:
+        self.db.execute("ROLLBACK")
+        # In-memory state may be ahead of the database now
+        self._version = -1
+
+    def _load_alive(self) -> None:
+        rows = np.fromiter(
+            (row for (row,) in self.db.execute("SELECT row FROM chunks")), dtype=np.int64
+        )
+        self.alive[:] = False
+        self.alive[rows] = True
+
+    def count(self) -> int:
+        with self._lock:
+            return self.db.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+
+    def _delete_rows(self, rows: List[tuple]) -> None:
+        """Drop (row, content) pairs from SQLite, the FTS index and the live mask"""
+        self.db.executemany(
+            "INSERT INTO chunks_fts (chunks_fts, rowid, content) VALUES ('delete', ?, ?)",
+            rows,
+        )
+        self.db.executemany("DELETE FROM chunks WHERE row = ?", [(row,) for row, _ in rows])
+        for row, _ in rows:
+            self.alive[row] = False
+
+    def insert(self, doc_id, chunks, embeddings, properties) -> int:
+        if not chunks:
+            self.delete(doc_id)
+            return 0
+        vectors = _normalize_rows(np.asarray(embeddings, dtype=np.float32))
+        extra = {
+            key: value
+            for key, value in properties.items()
+            if key not in ("doc_id", "user_id", "content", "chunk_id")
+        }
+        uuids = [f"{doc_id}_{i}" for i in range(len(chunks))]
+
+        with self._lock:
+            self._write()
+            try:
+                if not self.dim:
+                    self.dim = vectors.shape[1]
+                    self._set("dim", self.dim)
+                    self._open(1024)
+                if self.rows + len(chunks) > self._capacity:
+                    self._open(max(self._capacity * 2, self.rows + len(chunks)))
+
+                # Vectors reach the file before the rows that point at them
+                start = self.rows
+                self._vectors[start : start + len(chunks)] = vectors
+                self._lists[start : start + len(chunks)] = self._assign(vectors)
+                self._vectors.flush()
+                self._lists.flush()
+
+                # Re-ingesting a document replaces all of its chunks, also
+                # those past the end of a now shorter document
+                self._delete_rows(
+                    self.db.execute(
+                        "SELECT row, content FROM chunks WHERE doc_id = ?", (str(doc_id),)
+                    ).fetchall()
+                )
+                records = [
+                    (
+                        start + i,
+                        uuids[i],
+                        str(doc_id),
+                        str(properties.get("user_id") or ""),
+                        i,
+                        chunk,
+                        json.dumps(extra, default=str),
+                    )
+                    for i, chunk in enumerate(chunks)
+                ]
+                self.db.executemany(
+                    "INSERT INTO chunks VALUES (?, ?, ?, ?, ?, ?, ?)", records
+                )
+                self.db.executemany(
+                    "INSERT INTO chunks_fts (rowid, content) VALUES (?, ?)",
+                    [(record[0], record[5]) for record in records],
+                )
+                self._set("rows", start + len(chunks))
+                self._bump()
+                self.db.execute("COMMIT")
+            except Exception:
+                self._rollback()
+                raise
+            self.rows = start + len(chunks)
+            self.alive[start : self.rows] = True
+        return len(chunks)
+
+    def fetch(self, doc_id=None, user_id=None, limit=100):
+        sql = "SELECT doc_id, user_id, chunk_id, content, properties FROM chunks"
+        clauses, params = [], []
+        if doc_id is not None:
+            clauses.append("doc_id = ?")
+            params.append(str(doc_id))
+        if user_id is not None:
+            clauses.append("user_id = ?")
+            params.append(str(user_id))
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        with self._lock:
+            rows = self.db.execute(f"{sql} LIMIT ?", (*params, limit)).fetchall()
+        return [
+            {
+                **json.loads(properties),
+                "doc_id": doc,
+                "user_id": user,
+                "chunk_id": chunk_id,
+                "content": content,
+            }
+            for doc, user, chunk_id, content, properties in rows
+        ]
+
+    def delete(self, doc_id, user_id=None) -> None:
+        sql, params = "SELECT row, content FROM chunks WHERE doc_id = ?", [str(doc_id)]
+        if user_id is not None:
+            sql += " AND user_id = ?"
+            params.append(str(user_id))
+        with self._lock:
+            self._write()
+            try:
+                rows = self.db.execute(sql, params).fetchall()
+                if rows:
+                    self._delete_rows(rows)
+                    self._bump()
+                self.db.execute("COMMIT")
+            except Exception:
+                self._rollback()
+                raise
+
+    @staticmethod
+    def _scope_sql(scopes: List[SearchScope]):
+        """WHERE clause over `chunks` for the scopes, or None for every chunk"""
+        clauses, params = [], []
+        for scope in scopes:
+            parts = []
+            if scope.doc_ids:
+                parts.append(f"chunks.doc_id IN ({','.join('?' * len(scope.doc_ids))})")
+                params.extend(str(doc_id) for doc_id in scope.doc_ids)
+            if scope.user_id:
+                parts.append("chunks.user_id = ?")
+                params.append(str(scope.user_id))
+            if not parts:
+                return None, []
+            clauses.append("(" + " AND ".join(parts) + ")")
+        if not clauses:
+            return None, []
+        return " OR ".join(clauses), params
+
+    def _vector_scores(self, query: np.ndarray, rows: Optional[np.ndarray], k: int):
+        """Top-k cosine similarities among `rows`, or all live rows if None"""
+        if rows is not None:
+            return _top(rows, self._vectors[rows] @ query, k)
+
+        n = self.rows
+        if self.ivf_centroids is not None:
+            probe = np.argsort(-(self.ivf_centroids @ query))[:EMBEDDED_IVF_NPROBE]
+            rows = np.nonzero(np.isin(self._lists[:n], probe) & self.alive[:n])[0]
+            return _top(rows, self._vectors[rows] @ query, k)
+
+        best: Dict[int, float] = {}
+        for start in range(0, n, _BLOCK_ROWS):
+            stop = min(start + _BLOCK_ROWS, n)
+            rows = start + np.nonzero(self.alive[start:stop])[0]
+            best.update(_top(rows, self._vectors[rows] @ query, k))
+        if len(best) > k:
+            best = dict(sorted(best.items(), key=lambda item: -item[1])[:k])
+        return best
+
+    def _keyword_scores(self, query_text: str, where, params, k: int):
+        """Top-k BM25 scores from the FTS index, higher is better"""
+        words = _WORD_RE.findall(query_text.lower())
+        if not words:
+            return {}
+        match = " OR ".join(f'"{word}"' for word in dict.fromkeys(words))
+        sql = (
+            "SELECT chunks_fts.rowid, bm25(chunks_fts) FROM chunks_fts "
+            "JOIN chunks ON chunks.row = chunks_fts.rowid WHERE chunks_fts MATCH ?"
+        )
+        if where:
+            sql += f" AND ({where})"
+        sql += " ORDER BY bm25(chunks_fts) LIMIT ?"
+        rows = self.db.execute(sql, (match, *params, k)).fetchall()
+        return {row: -score for row, score in rows}
+
+    def search(self, query_text, query_embedding, scopes, top_k, alpha=0.5):
+        candidates = max(top_k, EMBEDDED_HYBRID_CANDIDATES)
+        query = _normalize_rows(np.asarray(query_embedding, dtype=np.float32))
+        where, params = self._scope_sql(scopes)
+
+        with self._lock:
+            # One read transaction, so every query sees the same snapshot
+            # while other processes write
+            self.db.execute("BEGIN")
+            try:
+                return self._search(query_text, query, where, params, top_k, candidates, alpha)
+            finally:
+                self.db.execute("COMMIT")
+
+    def _search(self, query_text, query, where, params, top_k, candidates, alpha):
+        self._refresh()
+        if not self.dim:
+            return []
+        vector_scores, keyword_scores = {}, {}
+        if alpha > 0:
+            rows = None
+            if where:
+                rows = np.fromiter(
+                    (
+                        row
+                        for (row,) in self.db.execute(
+                            f"SELECT row FROM chunks WHERE {where}", params
+                        )
+                    ),
+                    dtype=np.int64,
+                )
+            vector_scores = self._vector_scores(query, rows, candidates)
+        if alpha < 1:
+            keyword_scores = self._keyword_scores(query_text, where, params, candidates)
+
+        vector_scores, keyword_scores = _rescale(vector_scores), _rescale(keyword_scores)
+        fused = {
+            row: alpha * vector_scores.get(row, 0.0)
+            + (1 - alpha) * keyword_scores.get(row, 0.0)
+            for row in set(vector_scores) | set(keyword_scores)
+        }
+        best = sorted(fused.items(), key=lambda item: -item[1])[:top_k]
+        if not best:
+            return []
+        marks = ",".join("?" * len(best))
+        records = {
+            row: (doc_id, chunk_id, content)
+            for row, doc_id, chunk_id, content in self.db.execute(
+                f"SELECT row, doc_id, chunk_id, content FROM chunks WHERE row IN ({marks})",
+                [row for row, _ in best],
+            )
+        }
+        return [
+            {
+                "doc_id": records[row][0],
+                "chunk_id": int(records[row][1]),
+                "content": records[row][2],
+                "score": float(score),
+            }
+            for row, score in best
+            if row in records
+        ]
+
+    def _assign(self, vectors: np.ndarray) -> np.ndarray:
+        """Nearest IVF list of each vector, -1 before the index is trained"""
+        if self.ivf_centroids is None:
+            return np.full(len(vectors), -1, dtype=np.int32)
+        return _nearest(vectors, self.ivf_centroids)
+
+    def needs_ivf(self) -> bool:
+        """True once the store is large enough for IVF and has none yet"""
+        with self._lock:
+            self._refresh()
+            return (
+                self.ivf_centroids is None
+                and EMBEDDED_IVF_MIN_ROWS > 0
+                and self.count() >= EMBEDDED_IVF_MIN_ROWS
+            )
+
+    def build_ivf(self, lists: Optional[int] = None, iterations: int = 10) -> None:
+        """
+        Train IVF lists with spherical k-means on a sample of the live rows
+        (sqrt(n) lists by default) and assign every row to its nearest list.
+        Training and most of the assignment run without the store lock, so
+        searches and inserts carry on meanwhile.
+        """
+        start = time.perf_counter()
+        with self._lock:
+            self._refresh()
+            live = np.nonzero(self.alive[: self.rows])[0]
+            if not len(live):
+                return
+            lists = min(lists or int(np.sqrt(len(live))), len(live)) or 1
+            rng = np.random.default_rng(0)
+            sample = np.array(
+                self._vectors[
+                    np.sort(rng.choice(live, min(len(live), lists * 64), replace=False))
+                ]
+            )
+            vectors, trained_rows = self._vectors, self.rows
+
+        centroids = sample[rng.choice(len(sample), lists, replace=False)]
+        for _ in range(iterations):
+            nearest = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, nearest, sample)
+            empty = ~np.any(sums, axis=1)
+            sums[empty] = centroids[empty]
+            centroids = _normalize_rows(sums)
+        assignments = np.empty(trained_rows, dtype=np.int32)
+        for block in range(0, trained_rows, _BLOCK_ROWS):
+            stop = min(block + _BLOCK_ROWS, trained_rows)
+            assignments[block:stop] = _nearest(vectors[block:stop], centroids)
+
+        with self._lock:
+            self._write()
+            try:
+                # Rows inserted while training join their nearest list too
+                self._lists[:trained_rows] = assignments
+                if self.rows > trained_rows:
+                    self._lists[trained_rows : self.rows] = _nearest(
+                        self._vectors[trained_rows : self.rows], centroids
+                    )
+                self._lists.flush()
+                tmp_path = self.path / "ivf_centroids.tmp.npy"
+                np.save(tmp_path, centroids)
+                os.replace(tmp_path, self.path / "ivf_centroids.npy")
+                self._ivf_version = int(self._setting("ivf_version") or 0) + 1
+                self._set("ivf_version", self._ivf_version)
+                self._bump()
+                self.db.execute("COMMIT")
+            except Exception:
+                self._rollback()
+                raise
+            self.ivf_centroids = centroids
+        logger.info(
+            f"Built IVF index with {lists} lists over {len(live)} chunks "
+            f"in {time.perf_counter() - start:.1f}s"
+        )
+
+    def close(self) -> None:
+        with self._lock:
+            if self._vectors is not None:
+                self._vectors.flush()
+                self._lists.flush()
+            self.db.close()
+
+
+class EmbeddedCentroids:
+    """
+    DocumentCentroids counterpart for the embedded store: one normalized
+    centroid per user document in the store's SQLite database, ranked
+    with NumPy over the user's documents.
+    """
+
+    def __init__(self, store: EmbeddedChunkStore):
+        self.store = store
+
+    def ensure_schema(self) -> None:
+        # Created with the chunk tables
+        pass
+
+    def upsert(self, doc_id, user_id, vector, chunk_count, vector_doc_id=None) -> None:
+        with self.store._lock:
+            self.store.db.execute(
+                "INSERT OR REPLACE INTO centroids VALUES (?, ?, ?, ?, ?)",
+                (
+                    str(doc_id),
+                    str(vector_doc_id or doc_id),
+                    str(user_id),
+                    chunk_count,
+                    np.asarray(vector, dtype=np.float32).tobytes(),
+                ),
+            )
+
+    def link(self, doc_id: str, user_id: str, vector_doc_id: str) -> bool:
+        """Give a deduplicated upload the centroid of the document it reuses"""
+        with self.store._lock:
+            source = self.store.db.execute(
+                "SELECT chunk_count, vector FROM centroids WHERE doc_id = ?",
+                (str(vector_doc_id),),
+            ).fetchone()
+        if source is None:
+            logger.warning(f"No centroid for doc_id {vector_doc_id} to link {doc_id} to")
+            return False
+        self.upsert(
+            doc_id,
+            user_id,
+            np.frombuffer(source[1], dtype=np.float32),
+            source[0],
+            vector_doc_id=vector_doc_id,
+        )
+        return True
+
+    def delete(self, doc_id: str) -> None:
+        with self.store._lock:
+            self.store.db.execute("DELETE FROM centroids WHERE doc_id = ?", (str(doc_id),))
+
+    def candidates(
+        self, user_id: str, query_vector: List[float], limit: int
+    ) -> List[CandidateDocument]:
+        """The user's documents whose centroids are closest to the query"""
+        with self.store._lock:
+            rows = self.store.db.execute(
+                "SELECT doc_id, vector_doc_id, vector FROM centroids WHERE user_id = ?",
+                (str(user_id),),
+            ).fetchall()
+        if not rows:
+            return []
+        matrix = np.stack([np.frombuffer(vector, dtype=np.float32) for _, _, vector in rows])
+        query = _normalize_rows(np.asarray(query_vector, dtype=np.float32))
+        similarities = matrix @ query
+        order = np.argsort(-similarities)[:limit]
+        return [
+            CandidateDocument(
+                doc_id=rows[i][0],
+                vector_doc_id=rows[i][1],
+                similarity=float(similarities[i]),
+            )
+            for i in order
+        ]
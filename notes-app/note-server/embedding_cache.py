@@ -0,0 +1,317 @@
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, List, Optional
+
+import numpy as np
+from llama_index.core.base.embeddings.base import BaseEmbedding, Embedding
+from pydantic import PrivateAttr
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", "cache/embeddings")
+EMBEDDING_CACHE_MAX_BYTES = int(
+    os.getenv("EMBEDDING_CACHE_MAX_BYTES", 512 * 1024 * 1024)
+)
+
+
+class EmbeddingStore:
+    """
+    Fixed-capacity embedding store on local disk.
+
+    Vectors live in a memory-mapped float32 matrix with one row per slot;
+    a SQLite index maps cache keys to slots and tracks last access so the
+    least recently used slot is recycled once the store is full. Each slot
+    also records a fingerprint of its key, so a reader never returns a row
+    that another process has just recycled: writers clear a slot's
+    fingerprint before rewriting its vector and set it once the vector is
+    flushed, and readers check it both before and after copying the row.
+    """
+
+    def __init__(self, directory: str, dim: int, max_bytes: int):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.dim = dim
+        self.capacity = max(1, max_bytes // (dim * 4 + 8))
+
+        vectors_path = self.directory / f"vectors_{dim}.f32"
+        fingerprints_path = self.directory / f"fingerprints_{dim}.u64"
+        # Reuse the files only if they were sized for the same capacity
+        reuse = (
+            vectors_path.exists()
+            and fingerprints_path.exists()
+            and vectors_path.stat().st_size == self.capacity * dim * 4
+        )
+        mode = "r+" if reuse else "w+"
+        self._vectors = np.memmap(
+            vectors_path, dtype=np.float32, mode=mode, shape=(self.capacity, dim)
+        )
+        self._fingerprints = np.memmap(
+            fingerprints_path, dtype=np.uint64, mode=mode, shape=(self.capacity,)
+        )
+
+        self._db_path = str(self.directory / f"index_{dim}.sqlite3")
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS slots (
+                    key TEXT PRIMARY KEY,
+                    slot INTEGER NOT NULL UNIQUE,
+                    last_access REAL NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS slots_last_access ON slots (last_access)"
+            )
+            if not reuse:
+                conn.execute("DELETE FROM slots")
+
+    @staticmethod
+    def existing_dim(directory: str) -> Optional[int]:
+        """Vector width of a store previously written to this directory"""
+        for path in Path(directory).glob("vectors_*.f32"):
+            match = re.fullmatch(r"vectors_(\d+)\.f32", path.name)
+            if match:
+                return int(match.group(1))
+        return None
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self._db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _fingerprint(key: str) -> np.uint64:
+        return np.uint64(int(key[:16], 16))
+
+    def get_many(self, keys: List[str]) -> List[Optional[List[float]]]:
+        if not keys:
+            return []
+
+        conn = self._connection()
+        found = {}
+        # Chunked to stay under SQLite's bound-parameter limit
+        for i in range(0, len(keys), 500):
+            batch = keys[i : i + 500]
+            placeholders = ",".join("?" * len(batch))
+            found.update(
+                conn.execute(
+                    f"SELECT key, slot FROM slots WHERE key IN ({placeholders})", batch
+                ).fetchall()
+            )
+
+        results: List[Optional[List[float]]] = []
+        hit_keys = []
+        for key in keys:
+            slot = found.get(key)
+            fingerprint = self._fingerprint(key)
+            vector = None
+            if slot is not None and self._fingerprints[slot] == fingerprint:
+                vector = self._vectors[slot].tolist()
+                # Recycled by another process while it was being copied
+                if self._fingerprints[slot] != fingerprint:
+                    vector = None
+            results.append(vector)
+            if vector is not None:
+                hit_keys.append((time.time(), key))
+
+        if hit_keys:
+            conn.executemany("UPDATE slots SET last_access = ? WHERE key = ?", hit_keys)
+        return results
+
+    def put_many(self, keys: List[str], vectors: List[List[float]]) -> None:
+        if not keys:
+            return
+
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Slots fill densely from 0 and are only recycled once full, so
+            # the row count is read once and tracked for the rest of the batch
+            used = conn.execute("SELECT COUNT(*) FROM slots").fetchone()[0]
+            writes = []
+            for key, vector in zip(keys, vectors):
+                row = conn.execute(
+                    "SELECT slot FROM slots WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    slot = row[0]
+                elif used < self.capacity:
+                    slot = used
+                    used += 1
+                else:
+                    # Recycle the least recently used slot
+                    victim_key, slot = conn.execute(
+                        "SELECT key, slot FROM slots ORDER BY last_access ASC LIMIT 1"
+                    ).fetchone()
+                    conn.execute("DELETE FROM slots WHERE key = ?", (victim_key,))
+
+                writes.append((slot, self._fingerprint(key), vector))
+                conn.execute(
+                    "INSERT OR REPLACE INTO slots (key, slot, last_access) VALUES (?, ?, ?)",
+                    (key, slot, time.time()),
+                )
+
+            # Readers don't take the lock, so a slot's fingerprint is only
+            # set once its new vector is in place
+            for slot, _, _ in writes:
+                self._fingerprints[slot] = 0
+            self._fingerprints.flush()
+            for slot, _, vector in writes:
+                self._vectors[slot] = np.asarray(vector, dtype=np.float32)
+            self._vectors.flush()
+            for slot, fingerprint, _ in writes:
+                self._fingerprints[slot] = fingerprint
+            self._fingerprints.flush()
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def __len__(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM slots").fetchone()[0]
+
+    @property
+    def bytes_used(self) -> int:
+        return len(self) * (self.dim * 4 + 8)
+
+
+class CachedEmbedding(BaseEmbedding):
+    """
+    Wraps an embedding model with a persistent cache keyed by
+    (model name, SHA-256 of the text), so re-ingesting a document or
+    repeating a query never reaches the model for text it has seen.
+    """
+
+    _inner: BaseEmbedding = PrivateAttr()
+    _cache_dir: str = PrivateAttr()
+    _max_bytes: int = PrivateAttr()
+    _store: Optional[EmbeddingStore] = PrivateAttr(default=None)
+    _store_lock: Any = PrivateAttr()
+    _stats_lock: Any = PrivateAttr()
+    _hits: int = PrivateAttr(default=0)
+    _misses: int = PrivateAttr(default=0)
+
+    def __init__(
+        self,
+        inner: BaseEmbedding,
+        cache_dir: str = EMBEDDING_CACHE_DIR,
+        max_bytes: int = EMBEDDING_CACHE_MAX_BYTES,
+        **kwargs: Any,
+    ):
+        super().__init__(
+            model_name=inner.model_name,
+            embed_batch_size=inner.embed_batch_size,
+            **kwargs,
+        )
+        self._inner = inner
+        safe_name = re.sub(r"[^A-Za-z0-9_.-]+", "_", inner.model_name)
+        self._cache_dir = os.path.join(cache_dir, safe_name)
+        self._max_bytes = max_bytes
+        self._store_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "CachedEmbedding"
+
+    @property
+    def inner(self) -> BaseEmbedding:
+        return self._inner
+
+    def _get_store(self, dim: Optional[int] = None) -> Optional[EmbeddingStore]:
+        # The vector width is only known once the model has produced one,
+        # or from a store left on disk by an earlier run
+        with self._store_lock:
+            if self._store is None:
+                dim = dim or EmbeddingStore.existing_dim(self._cache_dir)
+                if dim is None:
+                    return None
+                self._store = EmbeddingStore(self._cache_dir, dim, self._max_bytes)
+                logger.info(
+                    f"Embedding cache at {self._cache_dir}: "
+                    f"{self._store.capacity} slots of {dim} dims"
+                )
+            return self._store
+
+    def _key(self, kind: str, text: str) -> str:
+        digest = hashlib.sha256(
+            f"{self.model_name}\0{kind}\0{text}".encode("utf-8")
+        ).hexdigest()
+        return digest
+
+    def _record(self, hits: int, misses: int) -> None:
+        with self._stats_lock:
+            self._hits += hits
+            self._misses += misses
+
+    def _embed_cached(self, kind: str, texts: List[str], compute) -> List[Embedding]:
+        keys = [self._key(kind, text) for text in texts]
+        store = self._get_store()
+        cached = store.get_many(keys) if store is not None else [None] * len(texts)
+
+        missing = [i for i, vector in enumerate(cached) if vector is None]
+        self._record(len(texts) - len(missing), len(missing))
+        if not missing:
+            return cached
+
+        computed = compute([texts[i] for i in missing])
+        store = self._get_store(len(computed[0]))
+        try:
+            store.put_many([keys[i] for i in missing], computed)
+        except Exception as e:
+            logger.warning(f"Failed to write embedding cache: {str(e)}")
+
+        for i, vector in zip(missing, computed):
+            cached[i] = vector
+        return cached
+
+    def _get_query_embedding(self, query: str) -> Embedding:
+        return self._embed_cached(
+            "query", [query], lambda texts: [self._inner.get_query_embedding(texts[0])]
+        )[0]
+
+    async def _aget_query_embedding(self, query: str) -> Embedding:
+        return self._get_query_embedding(query)
+
+    def get_query_embedding_batch(self, queries: List[str]) -> List[Embedding]:
+        def compute(texts: List[str]) -> List[Embedding]:
+            if hasattr(self._inner, "get_query_embedding_batch"):
+                return self._inner.get_query_embedding_batch(texts)
+            return [self._inner.get_query_embedding(text) for text in texts]
+
+        return self._embed_cached("query", queries, compute)
+
+    def _get_text_embedding(self, text: str) -> Embedding:
+        return self._get_text_embeddings([text])[0]
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[Embedding]:
+        return self._embed_cached("text", texts, self._inner.get_text_embedding_batch)
+
+    @property
+    def hit_rate(self) -> float:
+        with self._stats_lock:
+            total = self._hits + self._misses
+            return self._hits / total if total else 0.0
+
+    def stats(self) -> dict:
+        store = self._store
+        return {
+            "hits": self._hits,
+            "misses": self._misses,
+            "hit_rate": self.hit_rate,
+            "entries": len(store) if store is not None else 0,
+            "bytes_used": store.bytes_used if store is not None else 0,
+            "max_bytes": self._max_bytes,
+        }
@@ -0,0 +1,195 @@
+import asyncio
+import itertools
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, List, Optional
+
+from llama_index.core.base.embeddings.base import BaseEmbedding, Embedding
+from pydantic import PrivateAttr
+
+logger = logging.getLogger(__name__)
+
+EMBED_MAX_BATCH_SIZE = int(os.getenv("EMBED_MAX_BATCH_SIZE", 64))
+# How long a batch may wait for more work before it is sent to the model
+EMBED_MAX_WAIT_MS = float(os.getenv("EMBED_MAX_WAIT_MS", 10))
+EMBED_QUERY_MAX_WAIT_MS = float(os.getenv("EMBED_QUERY_MAX_WAIT_MS", 2))
+
+QUERY_PRIORITY = 0
+INGEST_PRIORITY = 1
+
+
+@dataclass(order=True)
+class _EmbedRequest:
+    priority: int
+    sequence: int
+    kind: str = field(compare=False)
+    text: str = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+
+
+class EmbeddingBatcher:
+    """
+    Coalesces embedding requests from concurrent ingest and query tasks in
+    this process into dynamically sized model batches.
+
+    Requests sit in a priority queue, so a query's single embedding jumps
+    ahead of a document's pending chunks instead of waiting behind them.
+    A batch is dispatched once it is full or its oldest request has waited
+    the max-wait deadline (shorter for queries). The model runs on one
+    dedicated thread, off the event loop.
+    """
+
+    def __init__(
+        self,
+        model: BaseEmbedding,
+        max_batch_size: int = EMBED_MAX_BATCH_SIZE,
+        max_wait_ms: float = EMBED_MAX_WAIT_MS,
+        query_max_wait_ms: float = EMBED_QUERY_MAX_WAIT_MS,
+    ):
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.query_max_wait = query_max_wait_ms / 1000
+
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="embed")
+        self._sequence = itertools.count()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._worker: Optional[asyncio.Task] = None
+
+        self.batches = 0
+        self.items = 0
+
+    def _ensure_worker(self) -> asyncio.PriorityQueue:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            self._loop = loop
+            self._queue = asyncio.PriorityQueue()
+            self._worker = loop.create_task(self._run())
+        return self._queue
+
+    async def _submit(self, kind: str, texts: List[str], priority: int) -> List[Embedding]:
+        queue = self._ensure_worker()
+        loop = asyncio.get_running_loop()
+        futures = []
+        for text in texts:
+            future = loop.create_future()
+            queue.put_nowait(
+                _EmbedRequest(priority, next(self._sequence), kind, text, future)
+            )
+            futures.append(future)
+        return list(await asyncio.gather(*futures))
+
+    async def embed_query(self, query: str) -> Embedding:
+        return (await self._submit("query", [query], QUERY_PRIORITY))[0]
+
+    async def embed_texts(
+        self, texts: List[str], priority: int = INGEST_PRIORITY
+    ) -> List[Embedding]:
+        if not texts:
+            return []
+        return await self._submit("text", texts, priority)
+
+    async def _collect_batch(self) -> List[_EmbedRequest]:
+        first = await self._queue.get()
+        batch = [first]
+        wait = self.query_max_wait if first.priority == QUERY_PRIORITY else self.max_wait
+        deadline = time.monotonic() + wait
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining <= 0:
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except (asyncio.QueueEmpty, asyncio.TimeoutError):
+                break
+        return batch
+
+    def _compute(self, kind: str, texts: List[str]) -> List[Embedding]:
+        if kind == "query":
+            if hasattr(self.model, "get_query_embedding_batch"):
+                return self.model.get_query_embedding_batch(texts)
+            return [self.model.get_query_embedding(text) for text in texts]
+        return self.model.get_text_embedding_batch(texts)
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect_batch()
+
+            # One model call per kind; queries were dequeued first
+            for kind in ("query", "text"):
+                requests = [r for r in batch if r.kind == kind and not r.future.done()]
+                if not requests:
+                    continue
+                try:
+                    vectors = await loop.run_in_executor(
+                        self._executor, self._compute, kind, [r.text for r in requests]
+                    )
+                except Exception as e:
+                    logger.error(f"Embedding batch of {len(requests)} failed: {str(e)}")
+                    for request in requests:
+                        if not request.future.done():
+                            request.future.set_exception(e)
+                    continue
+                # A caller may have been cancelled while the batch ran
+                for request, vector in zip(requests, vectors):
+                    if not request.future.done():
+                        request.future.set_result(vector)
+
+            self.batches += 1
+            self.items += len(batch)
+
+    @property
+    def mean_batch_size(self) -> float:
+        return self.items / self.batches if self.batches else 0.0
+
+    def shutdown(self) -> None:
+        if self._worker is not None and not self._worker.done():
+            self._worker.cancel()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+class BatchedEmbedding(BaseEmbedding):
+    """
+    llama-index facing embedding model that routes async calls through an
+    EmbeddingBatcher, so query engines share batches (at query priority)
+    with concurrent ingest work. Sync calls go straight to the model.
+    """
+
+    _batcher: EmbeddingBatcher = PrivateAttr()
+
+    def __init__(self, batcher: EmbeddingBatcher, **kwargs: Any):
+        super().__init__(
+            model_name=batcher.model.model_name,
+            embed_batch_size=batcher.model.embed_batch_size,
+            **kwargs,
+        )
+        self._batcher = batcher
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "BatchedEmbedding"
+
+    def _get_query_embedding(self, query: str) -> Embedding:
+        return self._batcher.model.get_query_embedding(query)
+
+    async def _aget_query_embedding(self, query: str) -> Embedding:
+        return await self._batcher.embed_query(query)
+
+    def _get_text_embedding(self, text: str) -> Embedding:
+        return self._batcher.model.get_text_embedding(text)
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[Embedding]:
+        return self._batcher.model.get_text_embedding_batch(texts)
+
+    async def _aget_text_embedding(self, text: str) -> Embedding:
+        return (await self._batcher.embed_texts([text]))[0]
+
+    async def _aget_text_embeddings(self, texts: List[str]) -> List[Embedding]:
+        return await self._batcher.embed_texts(texts)
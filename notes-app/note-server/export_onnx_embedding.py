@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Export the sentence-transformers embedding model to ONNX for the
+OnnxEmbedding backend, plus an int8 dynamically-quantized copy.
+
+Usage: python export_onnx_embedding.py [--model NAME] [--output DIR]
+"""
+
+import argparse
+import logging
+from pathlib import Path
+
+import torch
+from onnxruntime.quantization import QuantType, quantize_dynamic
+from transformers import AutoModel, AutoTokenizer
+
+from onnx_embedding import (
+    ONNX_EMBED_MODEL_DIR,
+    ONNX_MODEL_FILE,
+    ONNX_QUANTIZED_MODEL_FILE,
+)
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class _TokenEmbeddings(torch.nn.Module):
+    """Fixes the graph inputs to named tensors and the output to token states"""
+
+    def __init__(self, model, input_names):
+        super().__init__()
+        self.model = model
+        self.input_names = input_names
+
+    def forward(self, *inputs):
+        outputs = self.model(**dict(zip(self.input_names, inputs)))
+        return outputs.last_hidden_state
+
+
+def export(model_name: str, output_dir: Path) -> None:
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModel.from_pretrained(model_name)
+    model.eval()
+
+    # Writes tokenizer.json, which OnnxEmbedding loads with `tokenizers`
+    tokenizer.save_pretrained(output_dir)
+
+    sample = tokenizer(
+        ["an example sentence", "a second, longer example sentence"],
+        padding=True,
+        return_tensors="pt",
+    )
+    input_names = [
+        name
+        for name in ("input_ids", "attention_mask", "token_type_ids")
+        if name in sample
+    ]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+
+    model_path = output_dir / ONNX_MODEL_FILE
+    with torch.no_grad():
+        torch.onnx.export(
+            _TokenEmbeddings(model, input_names),
+            tuple(sample[name] for name in input_names),
+            str(model_path),
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=17,
+            dynamo=False,
+        )
+    logger.info(f"Exported {model_name} to {model_path}")
+
+    quantized_path = output_dir / ONNX_QUANTIZED_MODEL_FILE
+    quantize_dynamic(str(model_path), str(quantized_path), weight_type=QuantType.QInt8)
+    logger.info(f"Wrote int8 quantized model to {quantized_path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--model", default="sentence-transformers/all-MiniLM-L6-v2")
+    parser.add_argument("--output", default=ONNX_EMBED_MODEL_DIR)
+    args = parser.parse_args()
+
+    export(args.model, Path(args.output))
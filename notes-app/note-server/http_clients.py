@@ -0,0 +1,60 @@
+import logging
+import os
+import threading
+from typing import Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+LLM_HTTP_MAX_CONNECTIONS = int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", 20))
+LLM_HTTP_KEEPALIVE = int(os.getenv("LLM_HTTP_KEEPALIVE", 10))
+LLM_HTTP_TIMEOUT = float(os.getenv("LLM_HTTP_TIMEOUT", 120))
+
+_lock = threading.Lock()
+_client: Optional[httpx.Client] = None
+_async_client: Optional[httpx.AsyncClient] = None
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=LLM_HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=LLM_HTTP_KEEPALIVE,
+    )
+
+
+def _timeout() -> httpx.Timeout:
+    # Long reads for streamed generations, but fail fast on connect
+    return httpx.Timeout(LLM_HTTP_TIMEOUT, connect=10.0)
+
+
+def get_http_client() -> httpx.Client:
+    """Process-wide pooled client for synchronous LLM API calls"""
+    global _client
+    with _lock:
+        if _client is None or _client.is_closed:
+            _client = httpx.Client(limits=_limits(), timeout=_timeout())
+        return _client
+
+
+def get_async_http_client() -> httpx.AsyncClient:
+    """
+    Process-wide pooled client for async LLM API calls, so every request
+    reuses warm keep-alive connections instead of a new TLS handshake.
+    """
+    global _async_client
+    with _lock:
+        if _async_client is None or _async_client.is_closed:
+            _async_client = httpx.AsyncClient(limits=_limits(), timeout=_timeout())
+        return _async_client
+
+
+async def aclose_http_clients() -> None:
+    global _client, _async_client
+    with _lock:
+        client, async_client = _client, _async_client
+        _client = _async_client = None
+    if client is not None:
+        client.close()
+    if async_client is not None:
+        await async_client.aclose()
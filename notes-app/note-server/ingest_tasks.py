@@ -0,0 +1,192 @@
+import asyncio
+import logging
+import os
+from datetime import datetime, timezone
+
+import models
+from database import sessionLocal
+from dedup import find_canonical_document, link_duplicate_document, video_vector_doc_id
+from progress import ProgressPublisher
+from RAG import get_shared_pipeline
+from videoProcessor import YoutubeProcessor
+
+logger = logging.getLogger(__name__)
+
+
+def _set_status(model, document_id: str, status: str, error: str = None) -> None:
+    db = sessionLocal()
+    try:
+        doc = db.query(model).filter_by(id=document_id).first()
+        if doc:
+            doc.processing_status = status
+            # Only videos have an error_message column
+            if error is not None and hasattr(model, "error_message"):
+                doc.error_message = error
+            db.commit()
+    finally:
+        db.close()
+
+
+_MODELS = {"pdf": models.PdfDocument, "video": models.VideoDocument}
+
+
+async def fail_document(kind: str, document_id: str, error: str) -> None:
+    """Mark a document whose job is out of attempts failed and end its progress stream"""
+    await asyncio.to_thread(_set_status, _MODELS[kind], document_id, "failed", error)
+    await ProgressPublisher(document_id, kind=kind).done("failed", error)
+
+
+async def process_pdf_background(s3_key: str, document_id: str, user_id: str):
+    """
+    Ingest an uploaded PDF: dedup, extract, embed, index and summarize.
+    Progress is published for the document's SSE stream. Errors are
+    recorded on the PdfDocument and re-raised so the job queue can retry
+    the job.
+    """
+    progress = ProgressPublisher(document_id)
+    try:
+        _set_status(models.PdfDocument, document_id, "processing")
+        await progress.stage("processing")
+
+        # Identical bytes already processed: reuse chunks, vectors and analysis
+        db = sessionLocal()
+        try:
+            pdf_doc = db.query(models.PdfDocument).filter_by(id=document_id).first()
+            canonical = (
+                find_canonical_document(db, pdf_doc.content_hash, pdf_doc.id)
+                if pdf_doc
+                else None
+            )
+            if canonical:
+                analysis = link_duplicate_document(db, pdf_doc, canonical)
+                if analysis is not None:
+                    try:
+                        await asyncio.to_thread(
+                            get_shared_pipeline().centroids.link,
+                            document_id,
+                            user_id,
+                            str(canonical.id),
+                        )
+                    except Exception as e:
+                        logger.error(f"Error linking centroid for {document_id}: {str(e)}")
+                    await progress.stage("deduplicated", source_doc_id=str(canonical.id))
+                    await progress.done("completed")
+                    return {
+                        "doc_id": document_id,
+                        "analysis": analysis,
+                        "source_doc_id": str(canonical.id),
+                    }
+        finally:
+            db.close()
+
+        # Shared, long-lived pipeline; do not close it here
+        rag = get_shared_pipeline()
+
+        # Process PDF directly from S3
+        metadata = {
+            "user_id": user_id,
+            "upload_date": datetime.now(tz=timezone.utc).isoformat(),
+        }
+
+        response = await rag.process_pdf_from_s3(
+            bucket=os.getenv("AWS_BUCKET_NAME"),
+            key=s3_key,
+            doc_id=document_id,
+            metadata=metadata,
+            progress=progress,
+        )
+
+        # Update database status
+        db = sessionLocal()
+        try:
+            pdf_doc = db.query(models.PdfDocument).filter_by(id=document_id).first()
+            if pdf_doc:
+                if response and "analysis" in response:
+                    pdf_doc.processing_status = "completed"
+
+                    # Save the analysis to history
+                    analysis_history = models.History(
+                        user_id=int(user_id),
+                        doc_id=document_id,
+                        file_name=pdf_doc.file_name,
+                        s3_url=pdf_doc.s3_url,
+                        analysis=response["analysis"],
+                        processing_status="completed",
+                        timestamp=datetime.now(tz=timezone.utc),
+                    )
+                    db.add(analysis_history)
+                else:
+                    pdf_doc.processing_status = "failed"
+                db.commit()
+                await progress.done(pdf_doc.processing_status)
+            return response
+        finally:
+            db.close()
+
+    except Exception as e:
+        logger.error(f"PDF processing failed: {str(e)}")
+        _set_status(models.PdfDocument, document_id, "failed", str(e))
+        # Not terminal: the job queue may retry; the worker reports the end
+        await progress.stage("failed", error=str(e))
+        raise
+
+
+async def process_video_background(url: str, document_id: str, user_id: str):
+    """
+    Fetch a YouTube transcript and ingest it through the RAG pipeline.
+    Errors are recorded on the VideoDocument and re-raised so the job
+    queue can retry the job.
+    """
+    progress = ProgressPublisher(document_id, kind="video")
+    try:
+        _set_status(models.VideoDocument, document_id, "processing")
+        await progress.stage("processing")
+
+        # Initialize processors
+        youtube_processor = YoutubeProcessor(
+            aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
+            aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY"),
+            aws_region=os.getenv("AWS_REGION"),
+            bucket_name=os.getenv("AWS_BUCKET_NAME"),
+        )
+
+        # Process video
+        result = await youtube_processor.process_video(url, user_id, document_id)
+
+        # Process transcript through the shared RAG pipeline
+        rag = get_shared_pipeline()
+        metadata = {
+            "user_id": user_id,
+            "upload_date": datetime.now(tz=timezone.utc).isoformat(),
+            "video_url": url,
+            "video_title": result["title"],
+        }
+
+        success = await rag.process_pdf_from_s3(
+            bucket=os.getenv("AWS_BUCKET_NAME"),
+            key=result["transcript_key"],
+            doc_id=video_vector_doc_id(document_id),
+            metadata=metadata,
+            progress=progress,
+        )
+
+        # Update database
+        db = sessionLocal()
+        try:
+            video_doc = db.query(models.VideoDocument).filter_by(id=document_id).first()
+            if video_doc:
+                video_doc.processing_status = "completed" if success else "failed"
+                video_doc.transcript_status = "completed"
+                video_doc.s3_key = result["transcript_key"]
+                video_doc.title = result["title"]
+                video_doc.duration = result["duration"]
+                db.commit()
+                await progress.done(video_doc.processing_status)
+        finally:
+            db.close()
+
+    except Exception as e:
+        logger.error(f"Video processing failed: {str(e)}")
+        _set_status(models.VideoDocument, document_id, "failed", str(e))
+        await progress.stage("failed", error=str(e))
+        raise
@@ -0,0 +1,268 @@
+import json
+import logging
+import os
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+from redis_config import redis_client
+
+logger = logging.getLogger(__name__)
+
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", 3))
+# A claimed job not acked or heartbeated within this window is redelivered
+JOB_VISIBILITY_TIMEOUT = int(os.getenv("JOB_VISIBILITY_TIMEOUT", 300))
+JOB_RETRY_BACKOFF = int(os.getenv("JOB_RETRY_BACKOFF", 30))
+# How long finished job records are kept for inspection
+JOB_RESULT_TTL = int(os.getenv("JOB_RESULT_TTL", 7 * 24 * 60 * 60))
+
+KEY_PREFIX = "jobs"
+
+# Pop the next ready job and lease it until the visibility deadline. A job
+# redelivered after crashing its worker on every attempt goes to the dead
+# list instead of looping forever. Replies {status, job_id}, so the caller
+# can also fail the document of a job that just died.
+_CLAIM = redis_client.register_script(
+    """
+    local job_id = redis.call('RPOP', KEYS[1])
+    if not job_id then
+        return nil
+    end
+    local job_key = ARGV[2] .. ':' .. job_id
+    local attempts = redis.call('HINCRBY', job_key, 'attempts', 1)
+    local max_attempts = tonumber(redis.call('HGET', job_key, 'max_attempts'))
+    if max_attempts and attempts > max_attempts then
+        redis.call('HSET', job_key, 'status', 'dead', 'error', ARGV[5], 'finished_at', ARGV[3])
+        redis.call('EXPIRE', job_key, ARGV[4])
+        redis.call('LPUSH', KEYS[3], job_id)
+        return {'dead', job_id}
+    end
+    redis.call('ZADD', KEYS[2], ARGV[1], job_id)
+    redis.call('HSET', job_key, 'status', 'running', 'claimed_at', ARGV[3])
+    return {'running', job_id}
+    """
+)
+
+LEASE_EXPIRED_ERROR = "lease expired on every attempt"
+
+# Move leases past their deadline and retries whose backoff elapsed
+# back onto the ready list
+_REQUEUE = redis_client.register_script(
+    """
+    local moved = 0
+    for _, job_id in ipairs(redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', ARGV[1])) do
+        redis.call('ZREM', KEYS[2], job_id)
+        redis.call('HSET', ARGV[2] .. ':' .. job_id, 'status', 'queued')
+        redis.call('LPUSH', KEYS[1], job_id)
+        moved = moved + 1
+    end
+    for _, job_id in ipairs(redis.call('ZRANGEBYSCORE', KEYS[3], '-inf', ARGV[1])) do
+        redis.call('ZREM', KEYS[3], job_id)
+        redis.call('HSET', ARGV[2] .. ':' .. job_id, 'status', 'queued')
+        redis.call('LPUSH', KEYS[1], job_id)
+        moved = moved + 1
+    end
+    return moved
+    """
+)
+
+
+class JobQueue:
+    """
+    Durable at-least-once job queue in Redis, one queue per job type.
+
+    Layout under ``jobs:``:
+      job:{id}          hash with type, payload, attempts, status, error
+      {type}:ready      list of job ids waiting for a worker
+      {type}:leased     zset of claimed job ids scored by lease deadline
+      {type}:delayed    zset of failed job ids scored by retry time
+      {type}:dead       list of job ids that exhausted their attempts
+
+    A job stays leased while its worker heartbeats. If the worker dies,
+    the lease expires and requeue_expired hands the job to another worker,
+    so a restart never strands work. Handlers must be safe to re-run.
+    """
+
+    def __init__(
+        self,
+        client=redis_client,
+        visibility_timeout: int = JOB_VISIBILITY_TIMEOUT,
+        retry_backoff: int = JOB_RETRY_BACKOFF,
+    ):
+        self.redis = client
+        self.visibility_timeout = visibility_timeout
+        self.retry_backoff = retry_backoff
+
+    @staticmethod
+    def _key(*parts: str) -> str:
+        return ":".join((KEY_PREFIX,) + parts)
+
+    def _job_key(self, job_id: str) -> str:
+        return self._key("job", job_id)
+
+    def enqueue(
+        self,
+        job_type: str,
+        payload: Dict[str, Any],
+        max_attempts: int = JOB_MAX_ATTEMPTS,
+    ) -> str:
+        job_id = uuid.uuid4().hex
+        pipe = self.redis.pipeline()
+        pipe.hset(
+            self._job_key(job_id),
+            mapping={
+                "type": job_type,
+                "payload": json.dumps(payload),
+                "attempts": 0,
+                "max_attempts": max_attempts,
+                "status": "queued",
+                "created_at": time.time(),
+            },
+        )
+        pipe.lpush(self._key(job_type, "ready"), job_id)
+        pipe.execute()
+        logger.info(f"Enqueued {job_type} job {job_id}")
+        return job_id
+
+    def claim(self, job_type: str) -> Optional[Dict[str, Any]]:
+        """
+        Lease the next ready job of this type, or None if there is none.
+        The job's status is "running", or "dead" if its leases expired on
+        every attempt; a dead job is not leased, but its caller must still
+        fail the job's document.
+        """
+        now = time.time()
+        reply = _CLAIM(
+            keys=[
+                self._key(job_type, "ready"),
+                self._key(job_type, "leased"),
+                self._key(job_type, "dead"),
+            ],
+            args=[
+                now + self.visibility_timeout,
+                self._key("job"),
+                now,
+                JOB_RESULT_TTL,
+                LEASE_EXPIRED_ERROR,
+            ],
+            client=self.redis,
+        )
+        if reply is None:
+            return None
+
+        status, job_id = reply
+        job = self.redis.hgetall(self._job_key(job_id))
+        claimed = {
+            "id": job_id,
+            "type": job_type,
+            "status": status,
+            "payload": json.loads(job["payload"]),
+            "attempts": int(job["attempts"]),
+            "max_attempts": int(job["max_attempts"]),
+        }
+        if status == "dead":
+            claimed["error"] = job["error"]
+            logger.error(f"{job_type} job {job_id} is dead: {job['error']}")
+        return claimed
+
+    def heartbeat(self, job: Dict[str, Any]) -> None:
+        """Extend the lease of a job that is still running"""
+        self.redis.zadd(
+            self._key(job["type"], "leased"),
+            {job["id"]: time.time() + self.visibility_timeout},
+            xx=True,
+        )
+
+    def ack(self, job: Dict[str, Any]) -> None:
+        pipe = self.redis.pipeline()
+        pipe.zrem(self._key(job["type"], "leased"), job["id"])
+        pipe.hset(
+            self._job_key(job["id"]),
+            mapping={"status": "completed", "finished_at": time.time()},
+        )
+        pipe.expire(self._job_key(job["id"]), JOB_RESULT_TTL)
+        pipe.execute()
+
+    def fail(self, job: Dict[str, Any], error: str) -> bool:
+        """
+        Record a failed attempt. Schedules a retry with exponential backoff
+        and returns True, or moves the job to the dead list and returns
+        False once it is out of attempts.
+        """
+        job_key = self._job_key(job["id"])
+        pipe = self.redis.pipeline()
+        pipe.zrem(self._key(job["type"], "leased"), job["id"])
+
+        retry = job["attempts"] < job["max_attempts"]
+        if retry:
+            delay = self.retry_backoff * 2 ** (job["attempts"] - 1)
+            pipe.zadd(self._key(job["type"], "delayed"), {job["id"]: time.time() + delay})
+            pipe.hset(job_key, mapping={"status": "retrying", "error": error})
+            logger.warning(
+                f"{job['type']} job {job['id']} attempt {job['attempts']} failed, "
+                f"retrying in {delay}s: {error}"
+            )
+        else:
+            pipe.lpush(self._key(job["type"], "dead"), job["id"])
+            pipe.hset(
+                job_key,
+                mapping={"status": "dead", "error": error, "finished_at": time.time()},
+            )
+            pipe.expire(job_key, JOB_RESULT_TTL)
+            logger.error(
+                f"{job['type']} job {job['id']} failed after {job['attempts']} attempts: {error}"
+            )
+        pipe.execute()
+        return retry
+
+    def release(self, job: Dict[str, Any]) -> None:
+        """Return an unfinished job to the front of the queue without using up an attempt"""
+        pipe = self.redis.pipeline()
+        pipe.zrem(self._key(job["type"], "leased"), job["id"])
+        pipe.hincrby(self._job_key(job["id"]), "attempts", -1)
+        pipe.hset(self._job_key(job["id"]), "status", "queued")
+        pipe.rpush(self._key(job["type"], "ready"), job["id"])
+        pipe.execute()
+
+    def requeue_expired(self, job_types: List[str]) -> int:
+        """Redeliver expired leases and due retries; safe to run from every worker"""
+        moved = 0
+        for job_type in job_types:
+            moved += _REQUEUE(
+                keys=[
+                    self._key(job_type, "ready"),
+                    self._key(job_type, "leased"),
+                    self._key(job_type, "delayed"),
+                ],
+                args=[time.time(), self._key("job")],
+                client=self.redis,
+            )
+        if moved:
+            logger.info(f"Requeued {moved} expired or delayed jobs")
+        return moved
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = self.redis.hgetall(self._job_key(job_id))
+        return job or None
+
+    def stats(self, job_type: str) -> Dict[str, int]:
+        return {
+            "ready": self.redis.llen(self._key(job_type, "ready")),
+            "leased": self.redis.zcard(self._key(job_type, "leased")),
+            "delayed": self.redis.zcard(self._key(job_type, "delayed")),
+            "dead": self.redis.llen(self._key(job_type, "dead")),
+        }
+
+
+_job_queue: Optional[JobQueue] = None
+
+
+def get_job_queue() -> JobQueue:
+    global _job_queue
+    if _job_queue is None:
+        _job_queue = JobQueue()
+    return _job_queue
+
+
+def enqueue_job(job_type: str, payload: Dict[str, Any]) -> str:
+    return get_job_queue().enqueue(job_type, payload)
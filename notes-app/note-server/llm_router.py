@@ -0,0 +1,351 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+from llama_index.core.base.llms.types import (
+    ChatMessage,
+    ChatResponse,
+    ChatResponseAsyncGen,
+    ChatResponseGen,
+    CompletionResponse,
+    CompletionResponseAsyncGen,
+    CompletionResponseGen,
+    LLMMetadata,
+)
+from llama_index.core.bridge.pydantic import Field, PrivateAttr
+from llama_index.core.llms import LLM
+
+logger = logging.getLogger(__name__)
+
+# Consecutive failures that open a provider's circuit
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", 3))
+# Error rate over the last LLM_BREAKER_WINDOW calls that also opens it
+LLM_BREAKER_ERROR_RATE = float(os.getenv("LLM_BREAKER_ERROR_RATE", 0.5))
+LLM_BREAKER_WINDOW = int(os.getenv("LLM_BREAKER_WINDOW", 20))
+# Seconds an open circuit stays open before one probe request is let through
+LLM_BREAKER_COOLDOWN = float(os.getenv("LLM_BREAKER_COOLDOWN", 30))
+# A stream that has not produced its first token by then counts as failed.
+# Providers given their own timeout (first_token_timeouts) ignore it
+LLM_FIRST_TOKEN_TIMEOUT = float(os.getenv("LLM_FIRST_TOKEN_TIMEOUT", 30))
+# Providers slower than this (smoothed time to first response) are tried
+# after faster healthy ones
+LLM_SLOW_SECONDS = float(os.getenv("LLM_SLOW_SECONDS", 20))
+LLM_LATENCY_EWMA_ALPHA = 0.2
+
+# Key in a response's additional_kwargs naming the provider that produced it
+PROVIDER_KEY = "llm_provider"
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+def provider_name(llm) -> str:
+    return getattr(llm, "model", None) or type(llm).__name__
+
+
+class ProviderHealth:
+    """Error rate, latency and circuit breaker state of one LLM provider"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.consecutive_failures = 0
+        self.outcomes = deque(maxlen=LLM_BREAKER_WINDOW)
+        self.latency: Optional[float] = None
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return self.outcomes.count(False) / len(self.outcomes)
+
+    @property
+    def slow(self) -> bool:
+        return self.latency is not None and self.latency > LLM_SLOW_SECONDS
+
+    def allow_request(self) -> bool:
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            cooled_down = time.monotonic() - self.opened_at >= LLM_BREAKER_COOLDOWN
+            if self.state == OPEN and cooled_down:
+                self.state = HALF_OPEN
+                self._probe_in_flight = False
+            # Half open: a single probe decides whether the circuit closes
+            if self.state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def record_success(self, latency: float) -> None:
+        with self._lock:
+            self.outcomes.append(True)
+            self.consecutive_failures = 0
+            if self.latency is None:
+                self.latency = latency
+            else:
+                self.latency += LLM_LATENCY_EWMA_ALPHA * (latency - self.latency)
+            if self.state != CLOSED:
+                logger.info(f"LLM provider {self.name} recovered, closing circuit")
+            self.state = CLOSED
+            self._probe_in_flight = False
+
+    def record_failure(self, error: Exception) -> None:
+        with self._lock:
+            self.outcomes.append(False)
+            self.consecutive_failures += 1
+            should_open = self.state == HALF_OPEN or (
+                self.consecutive_failures >= LLM_BREAKER_FAILURES
+                or (
+                    len(self.outcomes) >= LLM_BREAKER_WINDOW // 2
+                    and self.error_rate >= LLM_BREAKER_ERROR_RATE
+                )
+            )
+            if should_open and self.state != OPEN:
+                logger.warning(
+                    f"Opening circuit for LLM provider {self.name} for "
+                    f"{LLM_BREAKER_COOLDOWN:.0f}s after: {str(error)}"
+                )
+            if should_open:
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+            self._probe_in_flight = False
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "error_rate": round(self.error_rate, 3),
+            "latency_seconds": (
+                round(self.latency, 3) if self.latency is not None else None
+            ),
+            "consecutive_failures": self.consecutive_failures,
+        }
+
+
+class LLMRouter(LLM):
+    """
+    An LLM that routes each request to the healthiest of several long-lived
+    provider clients, in priority order. A provider whose calls keep failing
+    has its circuit opened and is skipped until a probe succeeds, so
+    requests stop paying a dead endpoint's timeout. Providers whose smoothed
+    response latency exceeds LLM_SLOW_SECONDS are tried after faster ones.
+
+    Streams fail over only before their first token; a failure mid-stream
+    is raised to the caller. first_token_timeouts maps provider names to
+    how long their streams may take to start (LLM_FIRST_TOKEN_TIMEOUT
+    otherwise), as reasoning models think before their first token.
+    Responses carry the serving provider's name in
+    additional_kwargs[PROVIDER_KEY].
+    """
+
+    model: str = Field(description="Name of the primary provider")
+
+    _providers: List[LLM] = PrivateAttr()
+    _health: Dict[str, ProviderHealth] = PrivateAttr()
+    _first_token_timeouts: Dict[str, float] = PrivateAttr()
+
+    def __init__(
+        self,
+        providers: List[LLM],
+        first_token_timeouts: Optional[Dict[str, float]] = None,
+        **kwargs: Any,
+    ):
+        if not providers:
+            raise ValueError("LLMRouter needs at least one provider")
+        super().__init__(model=provider_name(providers[0]), **kwargs)
+        self._providers = list(providers)
+        self._health = {
+            provider_name(llm): ProviderHealth(provider_name(llm)) for llm in providers
+        }
+        self._first_token_timeouts = dict(first_token_timeouts or {})
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "llm_router"
+
+    @property
+    def metadata(self) -> LLMMetadata:
+        return self._providers[0].metadata
+
+    @property
+    def primary(self) -> str:
+        return self.model
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {name: health.stats() for name, health in self._health.items()}
+
+    def _candidates(self) -> Iterator[LLM]:
+        # Stable sort keeps priority order within the fast and slow groups.
+        # Circuits are checked lazily so a half-open probe slot is only
+        # taken by a provider that is actually called
+        ordered = sorted(
+            self._providers, key=lambda llm: self._health[provider_name(llm)].slow
+        )
+        tried = False
+        for llm in ordered:
+            if self._health[provider_name(llm)].allow_request():
+                tried = True
+                yield llm
+        if not tried:
+            # Every circuit is open: trying beats failing without a call
+            logger.warning("All LLM provider circuits are open; trying them in order")
+            yield from ordered
+
+    @staticmethod
+    def _tag(response, name: str):
+        response.additional_kwargs[PROVIDER_KEY] = name
+        return response
+
+    def _call(self, method: str, *args: Any, **kwargs: Any):
+        last_error = None
+        for llm in self._candidates():
+            name = provider_name(llm)
+            start = time.perf_counter()
+            try:
+                response = getattr(llm, method)(*args, **kwargs)
+            except Exception as e:
+                self._health[name].record_failure(e)
+                logger.warning(f"LLM provider {name} failed {method}: {str(e)}")
+                last_error = e
+                continue
+            self._health[name].record_success(time.perf_counter() - start)
+            return self._tag(response, name)
+        raise last_error
+
+    async def _acall(self, method: str, *args: Any, **kwargs: Any):
+        last_error = None
+        for llm in self._candidates():
+            name = provider_name(llm)
+            start = time.perf_counter()
+            try:
+                response = await getattr(llm, method)(*args, **kwargs)
+            except Exception as e:
+                self._health[name].record_failure(e)
+                logger.warning(f"LLM provider {name} failed {method}: {str(e)}")
+                last_error = e
+                continue
+            self._health[name].record_success(time.perf_counter() - start)
+            return self._tag(response, name)
+        raise last_error
+
+    def _stream(self, method: str, *args: Any, **kwargs: Any):
+        last_error = None
+        for llm in self._candidates():
+            name = provider_name(llm)
+            start = time.perf_counter()
+            try:
+                stream = getattr(llm, method)(*args, **kwargs)
+                first = next(stream)
+            except Exception as e:
+                self._health[name].record_failure(e)
+                logger.warning(f"LLM provider {name} failed {method}: {str(e)}")
+                last_error = e
+                continue
+            self._health[name].record_success(time.perf_counter() - start)
+            return self._continue_stream(name, first, stream)
+        raise last_error
+
+    def _continue_stream(self, name: str, first, stream):
+        yield self._tag(first, name)
+        try:
+            for response in stream:
+                yield self._tag(response, name)
+        except Exception as e:
+            self._health[name].record_failure(e)
+            raise
+
+    @staticmethod
+    async def _aclose(name: str, stream) -> None:
+        # Hands the stream's pooled HTTP connection back before failing over
+        aclose = getattr(stream, "aclose", None)
+        if aclose is None:
+            return
+        try:
+            await aclose()
+        except Exception as e:
+            logger.debug(f"Closing abandoned {name} stream failed: {str(e)}")
+
+    async def _astream(self, method: str, *args: Any, **kwargs: Any):
+        last_error = None
+        for llm in self._candidates():
+            name = provider_name(llm)
+            timeout = self._first_token_timeouts.get(name, LLM_FIRST_TOKEN_TIMEOUT)
+            start = time.perf_counter()
+            stream = None
+            try:
+                stream = await asyncio.wait_for(
+                    getattr(llm, method)(*args, **kwargs), timeout
+                )
+                remaining = timeout - (time.perf_counter() - start)
+                first = await asyncio.wait_for(
+                    stream.__anext__(), max(remaining, 0.001)
+                )
+            except Exception as e:
+                if stream is not None:
+                    await self._aclose(name, stream)
+                if isinstance(e, asyncio.TimeoutError):
+                    e = TimeoutError(f"no first token within {timeout:.0f}s")
+                self._health[name].record_failure(e)
+                logger.warning(f"LLM provider {name} failed {method}: {str(e)}")
+                last_error = e
+                continue
+            self._health[name].record_success(time.perf_counter() - start)
+            return self._acontinue_stream(name, first, stream)
+        raise last_error
+
+    async def _acontinue_stream(self, name: str, first, stream):
+        yield self._tag(first, name)
+        try:
+            async for response in stream:
+                yield self._tag(response, name)
+        except Exception as e:
+            self._health[name].record_failure(e)
+            raise
+
+    def chat(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatResponse:
+        return self._call("chat", messages, **kwargs)
+
+    def complete(
+        self, prompt: str, formatted: bool = False, **kwargs: Any
+    ) -> CompletionResponse:
+        return self._call("complete", prompt, formatted=formatted, **kwargs)
+
+    def stream_chat(
+        self, messages: Sequence[ChatMessage], **kwargs: Any
+    ) -> ChatResponseGen:
+        return self._stream("stream_chat", messages, **kwargs)
+
+    def stream_complete(
+        self, prompt: str, formatted: bool = False, **kwargs: Any
+    ) -> CompletionResponseGen:
+        return self._stream("stream_complete", prompt, formatted=formatted, **kwargs)
+
+    async def achat(
+        self, messages: Sequence[ChatMessage], **kwargs: Any
+    ) -> ChatResponse:
+        return await self._acall("achat", messages, **kwargs)
+
+    async def acomplete(
+        self, prompt: str, formatted: bool = False, **kwargs: Any
+    ) -> CompletionResponse:
+        return await self._acall("acomplete", prompt, formatted=formatted, **kwargs)
+
+    async def astream_chat(
+        self, messages: Sequence[ChatMessage], **kwargs: Any
+    ) -> ChatResponseAsyncGen:
+        return await self._astream("astream_chat", messages, **kwargs)
+
+    async def astream_complete(
+        self, prompt: str, formatted: bool = False, **kwargs: Any
+    ) -> CompletionResponseAsyncGen:
+        return await self._astream(
+            "astream_complete", prompt, formatted=formatted, **kwargs
+        )
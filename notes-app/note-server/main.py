@@ -14,6 +14,10 @@ from schema import (
     ElasticSearchRequest,
     PrerequisitePapersRequest,
     PrerequisitePaper,
+    ChunkSearchRequest,
+    ChunkSearchResponse,
+    LibraryQueryRequest,
+    DocumentQueryRequest,
 )
 from pathlib import Path
 import httpx
@@ -27,6 +31,7 @@ from database import Base, engine, sessionLocal
 from sqlalchemy.orm import Session
 from fastapi import FastAPI, Depends, Query
 from fastapi.responses import StreamingResponse
+from fastapi import Header
 
 
 from fastapi import (
@@ -37,10 +42,9 @@ from fastapi import (
     File,
     UploadFile,
     Form,
-    BackgroundTasks,
 )
 from fastapi.security import OAuth2PasswordBearer
-from auth_bearer import JWTBearer
+from auth_bearer import EventStreamBearer, JWTBearer
 from functools import wraps
 from utils import (
     create_access_token,
@@ -58,17 +62,27 @@ import boto3
 from botocore.exceptions import ClientError
 import os
 from dotenv import load_dotenv
-from RAG import RAGPipeline
-from videoProcessor import YoutubeProcessor
+from RAG import get_shared_pipeline, close_shared_pipeline
 from history import load_user_docs
+from dedup import compute_content_hash, vector_doc_ids_for_user
+from job_queue import enqueue_job
+from progress import ProgressPublisher, stream_key, subscribe
+from http_clients import aclose_http_clients
 import arxiv
 from elasticsearch import Elasticsearch, ApiError, AsyncElasticsearch
 import json
 from search import search_arxiv, search_elastic, index_arxiv_paper
-from redis_config import get_cached_data, set_cached_data, CACHE_EXPIRATION
+from redis_config import (
+    async_redis_client,
+    get_cached_data,
+    set_cached_data,
+    CACHE_EXPIRATION,
+)
 import uuid
 import re
 import tempfile
+import asyncio
+from contextlib import asynccontextmanager
 
 
 load_dotenv()
@@ -121,7 +135,20 @@ def get_session():
         session.close()
 
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load the embedding model, Weaviate client and index once per process;
+    # endpoints reuse it through get_shared_pipeline(). Ingestion runs in
+    # worker.py.
+    await asyncio.to_thread(get_shared_pipeline)
+    try:
+        yield
+    finally:
+        close_shared_pipeline()
+        await aclose_http_clients()
+
+
+app = FastAPI(lifespan=lifespan)
 
 
 app.add_middleware(
@@ -305,7 +332,6 @@ def logout(dependencies=Depends(JWTBearer()), db: Session = Depends(get_session)
 
 @app.post("/pdf-extract", response_model=PdfDocumentResponse)
 async def upload_pdf(
-    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     user_id: str = Form(...),
     db: Session = Depends(get_session),
@@ -334,6 +360,8 @@ async def upload_pdf(
                 detail=f"Error accessing AWS: {str(e)}",
             )
 
+        content_hash = compute_content_hash(file.file)
+
         # Generate a unique S3 key
         timestamp = datetime.now(tz=timezone.utc).strftime("%Y%m%d_%H%M%S")
         s3_key = f"pdfs/user_{user_id}/{timestamp}_{file.filename}"
@@ -369,18 +397,28 @@ async def upload_pdf(
             mime_type=file.content_type,
             upload_date=datetime.now(tz=timezone.utc),
             processing_status="pending",
+            content_hash=content_hash,
         )
 
         db.add(pdf_doc)
         db.commit()
         db.refresh(pdf_doc)
 
-        background_tasks.add_task(
-            process_pdf_background,
-            s3_key=s3_key,
-            document_id=str(pdf_doc.id),
-            user_id=user_id,
-        )
+        # Published before the job exists, so a fast worker's stages follow it
+        progress = ProgressPublisher(pdf_doc.id)
+        await progress.stage("queued")
+        # Picked up by worker.py; survives API restarts
+        try:
+            enqueue_job(
+                "pdf",
+                {"s3_key": s3_key, "document_id": str(pdf_doc.id), "user_id": user_id},
+            )
+        except Exception:
+            # No worker will ever claim it, so don't leave it pending
+            pdf_doc.processing_status = "failed"
+            db.commit()
+            await progress.done("failed", "Could not queue processing")
+            raise
 
         return pdf_doc
     except Exception as e:
@@ -392,74 +430,9 @@ async def upload_pdf(
         )
 
 
-async def process_pdf_background(s3_key: str, document_id: str, user_id: str):
-    try:
-        # Initialize RAG pipeline with AWS credentials
-        rag = RAGPipeline(
-            aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
-            aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY"),
-            aws_region=os.getenv("AWS_REGION"),
-        )
-
-        # Use async context manager
-        async with rag:
-            # Process PDF directly from S3
-            metadata = {
-                "user_id": user_id,
-                "upload_date": datetime.now(tz=timezone.utc).isoformat(),
-            }
-
-            response = await rag.process_pdf_from_s3(
-                bucket=os.getenv("AWS_BUCKET_NAME"),
-                key=s3_key,
-                doc_id=document_id,
-                metadata=metadata,
-            )
-
-            # Update database status
-            db = sessionLocal()
-            try:
-                pdf_doc = db.query(models.PdfDocument).filter_by(id=document_id).first()
-                if pdf_doc:
-                    if response and "analysis" in response:
-                        pdf_doc.processing_status = "completed"
-
-                        # Save the analysis to history
-                        analysis_history = models.History(
-                            user_id=int(user_id),
-                            doc_id=document_id,
-                            file_name=pdf_doc.file_name,
-                            s3_url=pdf_doc.s3_url,
-                            analysis=response["analysis"],
-                            processing_status="completed",
-                            timestamp=datetime.now(tz=timezone.utc),
-                        )
-                        db.add(analysis_history)
-                    else:
-                        pdf_doc.processing_status = "failed"
-                    db.commit()
-                return response
-            finally:
-                db.close()
-
-    except Exception as e:
-        logger.error(f"PDF processing failed: {str(e)}")
-        # Update database with error status
-        db = sessionLocal()
-        try:
-            pdf_doc = db.query(models.PdfDocument).filter_by(id=document_id).first()
-            if pdf_doc:
-                pdf_doc.processing_status = "failed"
-                pdf_doc.error_message = str(e)
-                db.commit()
-        finally:
-            db.close()
-
-
 @app.post("/video-extract", response_model=VideoDocumentResponse)
 async def process_youtube_video(
     video: VideoDocumentCreate,
-    background_tasks: BackgroundTasks,
     db: Session = Depends(get_session),
     dependencies=Depends(JWTBearer()),
 ):
@@ -482,13 +455,27 @@ async def process_youtube_video(
         db.commit()
         db.refresh(video_doc)
 
-        # Add background task for processing
-        background_tasks.add_task(
-            process_video_background,
-            url=str(video.url),
-            document_id=str(video_doc.id),
-            user_id=str(video.user_id),
-        )
+        # Published before the job exists, so a fast worker's stages follow it
+        progress = ProgressPublisher(video_doc.id, kind="video")
+        await progress.stage("queued")
+        # Queue for processing by worker.py
+        try:
+            enqueue_job(
+                "video",
+                {
+                    "url": str(video.url),
+                    "document_id": str(video_doc.id),
+                    "user_id": str(video.user_id),
+                },
+            )
+        except Exception as e:
+            # No worker will ever claim it, so don't leave it pending
+            video_doc.processing_status = "failed"
+            video_doc.transcript_status = "failed"
+            video_doc.error_message = f"Could not queue processing: {str(e)}"[:1000]
+            db.commit()
+            await progress.done("failed", video_doc.error_message)
+            raise
 
         return video_doc
 
@@ -550,69 +537,6 @@ async def get_user_analysis_history(
         )
 
 
-async def process_video_background(url: str, document_id: str, user_id: str):
-    try:
-        # Initialize processors
-        youtube_processor = YoutubeProcessor(
-            aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
-            aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY"),
-            aws_region=os.getenv("AWS_REGION"),
-            bucket_name=os.getenv("AWS_BUCKET_NAME"),
-        )
-
-        # Process video
-        result = await youtube_processor.process_video(url, user_id, document_id)
-
-        # Initialize RAG pipeline
-        rag = RAGPipeline(
-            aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
-            aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY"),
-            aws_region=os.getenv("AWS_REGION"),
-        )
-
-        # Process transcript through RAG pipeline
-        async with rag:
-            metadata = {
-                "user_id": user_id,
-                "upload_date": datetime.now(tz=timezone.utc).isoformat(),
-                "video_url": url,
-                "video_title": result["title"],
-            }
-
-            success = await rag.process_pdf_from_s3(
-                bucket=os.getenv("AWS_BUCKET_NAME"),
-                key=result["transcript_key"],
-                doc_id=document_id,
-                metadata=metadata,
-            )
-
-        # Update database
-        db = sessionLocal()
-        try:
-            video_doc = db.query(models.VideoDocument).filter_by(id=document_id).first()
-            if video_doc:
-                video_doc.processing_status = "completed" if success else "failed"
-                video_doc.transcript_status = "completed"
-                video_doc.s3_key = result["transcript_key"]
-                video_doc.title = result["title"]
-                video_doc.duration = result["duration"]
-                db.commit()
-        finally:
-            db.close()
-
-    except Exception as e:
-        logger.error(f"Video processing failed: {str(e)}")
-        db = sessionLocal()
-        try:
-            video_doc = db.query(models.VideoDocument).filter_by(id=document_id).first()
-            if video_doc:
-                video_doc.processing_status = "failed"
-                video_doc.error_message = str(e)
-                db.commit()
-        finally:
-            db.close()
-
-
 def token_required(func):
     @wraps(func)
     def wrapper(*args, **kwargs):
@@ -702,6 +626,85 @@ async def arxiv_search_endpoint(request: ArxivSearchRequest):
     return results
 
 
+@app.post("/search/chunks", response_model=ChunkSearchResponse)
+async def search_chunks_endpoint(
+    request: ChunkSearchRequest,
+    db: Session = Depends(get_session),
+    dependencies=Depends(JWTBearer()),
+):
+    """
+    Retrieval-only hybrid search over the current user's document chunks,
+    for highlighting or jumping to passages. Returns ranked chunks with
+    scores and chunk_ids without calling the LLM.
+    """
+    start = time.perf_counter()
+    payload = jwt.decode(dependencies, JWT_SECRET_KEY, algorithms=[ALGORITHM])
+    owners = vector_doc_ids_for_user(db, payload["sub"], request.doc_id)
+    if request.doc_id is not None and not owners:
+        raise HTTPException(status_code=404, detail="PDF not found or access denied")
+
+    hits = await get_shared_pipeline().search_chunks(
+        request.query, list(owners), top_k=request.top_k, alpha=request.alpha
+    )
+
+    # Report chunks under the user's own ids, not the deduplicated original
+    results = []
+    for hit in hits:
+        for doc_id in owners.get(hit["doc_id"], []):
+            if request.doc_id is None or doc_id == request.doc_id:
+                results.append({**hit, "doc_id": doc_id})
+
+    return {"results": results, "took_ms": (time.perf_counter() - start) * 1000}
+
+
+@app.post("/pdf/{doc_id}/query")
+async def query_document_endpoint(
+    doc_id: str,
+    request: DocumentQueryRequest,
+    db: Session = Depends(get_session),
+    dependencies=Depends(JWTBearer()),
+):
+    """
+    Answer a question from one of the current user's PDFs. Repeated or
+    closely paraphrased questions are served from the semantic answer cache
+    without retrieval or an LLM call.
+    """
+    payload = jwt.decode(dependencies, JWT_SECRET_KEY, algorithms=[ALGORITHM])
+    pdf_doc = (
+        db.query(models.PdfDocument).filter_by(id=doc_id, user_id=payload["sub"]).first()
+    )
+    if not pdf_doc:
+        raise HTTPException(status_code=404, detail="PDF not found or access denied")
+    return await get_shared_pipeline().query(
+        request.query, doc_id=str(pdf_doc.id), top_k=request.top_k, user_id=payload["sub"]
+    )
+
+
+@app.post("/library/query")
+async def library_query_endpoint(
+    request: LibraryQueryRequest,
+    dependencies=Depends(JWTBearer()),
+):
+    """
+    Answer a question from every document in the current user's library:
+    candidate documents are chosen by centroid similarity, then chunks are
+    searched only within them.
+    """
+    payload = jwt.decode(dependencies, JWT_SECRET_KEY, algorithms=[ALGORITHM])
+    return await get_shared_pipeline().query_library(
+        request.query,
+        payload["sub"],
+        top_docs=request.top_docs,
+        top_k=request.top_k,
+    )
+
+
+@app.get("/cache/stats", dependencies=[Depends(JWTBearer())])
+async def cache_stats_endpoint():
+    """Hit rates and sizes of the API process's caches and the shared answer cache"""
+    return await get_shared_pipeline().cache_stats()
+
+
 # Elasticsearch Search endpoint
 @app.post("/search/elastic")
 async def elastic_search_endpoint(request: ElasticSearchRequest):
@@ -909,6 +912,72 @@ async def get_pdf_url(
         )
 
 
+def _sse_frame(event_id: str, event: str, data: dict) -> str:
+    return f"id: {event_id}\nevent: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def _progress_response(doc, kind: str, last_event_id: str) -> StreamingResponse:
+    async def events():
+        # Nothing recorded for an already finished document (processed before
+        # progress streams existed, or the stream expired): end right away
+        if doc.processing_status in ("completed", "failed") and not await (
+            async_redis_client.exists(stream_key(str(doc.id), kind))
+        ):
+            yield _sse_frame("0-0", "done", {"status": doc.processing_status})
+            return
+
+        async for event_id, event, data in subscribe(str(doc.id), kind, last_event_id):
+            if event_id is None:
+                yield ": keep-alive\n\n"
+            else:
+                yield _sse_frame(event_id, event, data)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/pdf/{doc_id}/events")
+async def stream_pdf_events(
+    doc_id: str,
+    db: Session = Depends(get_session),
+    dependencies=Depends(EventStreamBearer()),
+    last_event_id: str = Header("0-0"),
+):
+    """
+    Server-sent events for a PDF's processing: stage changes, per-chunk
+    summary tokens and a final "done" event. Reconnecting clients resume
+    from the Last-Event-ID header. Browsers' EventSource can't send the
+    Authorization header, so the JWT may be given as ?token= instead.
+    """
+    payload = jwt.decode(dependencies, JWT_SECRET_KEY, algorithms=[ALGORITHM])
+    pdf_doc = (
+        db.query(models.PdfDocument).filter_by(id=doc_id, user_id=payload["sub"]).first()
+    )
+    if not pdf_doc:
+        raise HTTPException(status_code=404, detail="PDF not found or access denied")
+    return _progress_response(pdf_doc, "pdf", last_event_id)
+
+
+@app.get("/video/{doc_id}/events")
+async def stream_video_events(
+    doc_id: str,
+    db: Session = Depends(get_session),
+    dependencies=Depends(EventStreamBearer()),
+    last_event_id: str = Header("0-0"),
+):
+    """Server-sent events for a video's processing, as for /pdf/{doc_id}/events"""
+    payload = jwt.decode(dependencies, JWT_SECRET_KEY, algorithms=[ALGORITHM])
+    video_doc = (
+        db.query(models.VideoDocument).filter_by(id=doc_id, user_id=payload["sub"]).first()
+    )
+    if not video_doc:
+        raise HTTPException(status_code=404, detail="Video not found or access denied")
+    return _progress_response(video_doc, "video", last_event_id)
+
+
 @app.post(
     "/prerequisite-papers",
     response_model=List[PrerequisitePaper],
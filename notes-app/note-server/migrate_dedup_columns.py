@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Add the upload deduplication columns (content_hash, source_doc_id) and the
+content_hash index to an existing pdf_documents table. create_all() only
+creates missing tables, so databases created before deduplication lack
+them. Deployments run this once before starting the API and workers
+(the compose migrate service, k8s/migrate-job.yaml, Railway's pre-deploy
+command). It only adds what is missing, so it is safe to re-run, and a
+concurrent run that wins a race is not an error.
+
+Usage: python migrate_dedup_columns.py [--dry-run]
+"""
+
+import argparse
+import logging
+from typing import List
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DBAPIError
+
+logger = logging.getLogger(__name__)
+
+TABLE = "pdf_documents"
+CONTENT_HASH_INDEX = "ix_pdf_documents_content_hash"
+
+
+def pending_statements(engine: Engine) -> List[str]:
+    inspector = inspect(engine)
+    if not inspector.has_table(TABLE):
+        # create_all() will create it with every column
+        return []
+    columns = {column["name"] for column in inspector.get_columns(TABLE)}
+    indexes = {index["name"] for index in inspector.get_indexes(TABLE)}
+
+    statements = []
+    if "content_hash" not in columns:
+        statements.append(f"ALTER TABLE {TABLE} ADD COLUMN content_hash VARCHAR(64)")
+    if "source_doc_id" not in columns:
+        statements.append(
+            f"ALTER TABLE {TABLE} ADD COLUMN source_doc_id INTEGER REFERENCES {TABLE} (id)"
+        )
+    if CONTENT_HASH_INDEX not in indexes:
+        statements.append(f"CREATE INDEX {CONTENT_HASH_INDEX} ON {TABLE} (content_hash)")
+    return statements
+
+
+def add_dedup_columns(engine: Engine) -> List[str]:
+    """Apply the missing schema changes; returns the ones this call applied"""
+    applied = []
+    for statement in pending_statements(engine):
+        try:
+            with engine.begin() as conn:
+                conn.execute(text(statement))
+        except DBAPIError:
+            # Another process may have applied it first
+            if statement in pending_statements(engine):
+                raise
+            logger.info(f"Already applied by another process: {statement}")
+            continue
+        applied.append(statement)
+    if applied:
+        logger.info(f"Migrated {TABLE}: {applied}")
+    return applied
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    from database import engine
+
+    if args.dry_run:
+        for statement in pending_statements(engine) or ["-- nothing to do"]:
+            print(statement)
+        return
+    if not add_dedup_columns(engine):
+        logger.info(f"{TABLE} is up to date")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Copy chunks from the shared PDFDocument collection into the multi-tenant
+collection used when WEAVIATE_MULTI_TENANCY=true, one tenant per user_id.
+
+Objects keep their uuids and vectors, so nothing is re-embedded and the
+copy can be re-run after an interruption. Chunks without a user_id are
+assigned to the uploader of their PDF or video; any still unowned are
+skipped and reported. Per-tenant counts are checked after the copy, and
+the source collection is dropped only with --delete-source and when
+every count matches.
+
+Usage: python migrate_tenants.py [--source PDFDocument] [--batch-size N] [--dry-run] [--delete-source]
+"""
+
+import argparse
+import logging
+import time
+
+import weaviate
+
+from dedup import chunk_owners
+from RAG import create_chunk_collection
+from tenants import TENANT_CLASS_NAME, TenantManager, tenant_name
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--source", default="PDFDocument")
+    parser.add_argument("--target", default=TENANT_CLASS_NAME)
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--dry-run", action="store_true")
+    parser.add_argument("--delete-source", action="store_true")
+    args = parser.parse_args()
+
+    client = weaviate.connect_to_local(host="127.0.0.1", port=5000, grpc_port=50051)
+    try:
+        if not client.collections.exists(args.source):
+            logger.error(f"Source collection {args.source} does not exist")
+            return
+        if not args.dry_run and not client.collections.exists(args.target):
+            create_chunk_collection(client, args.target, multi_tenancy=True)
+            logger.info(f"Created multi-tenant collection {args.target}")
+        tenants = TenantManager(lambda: client, args.target)
+
+        source = client.collections.get(args.source)
+        owners = {}
+        copied = {}
+        skipped = 0
+        start = time.perf_counter()
+        with client.batch.fixed_size(batch_size=args.batch_size) as batch:
+            for obj in source.iterator(include_vector=True):
+                doc_id = str(obj.properties.get("doc_id"))
+                owner = obj.properties.get("user_id")
+                if not owner:
+                    if doc_id not in owners:
+                        owners[doc_id] = chunk_owners([doc_id]).get(doc_id)
+                    owner = owners[doc_id]
+                if not owner:
+                    skipped += 1
+                    continue
+
+                name = tenant_name(owner)
+                if name not in copied:
+                    copied[name] = 0
+                    if not args.dry_run:
+                        tenants.collection(owner)
+                copied[name] += 1
+                if args.dry_run:
+                    continue
+                batch.add_object(
+                    collection=args.target,
+                    properties={**obj.properties, "user_id": str(owner)},
+                    uuid=obj.uuid,
+                    vector=obj.vector["default"],
+                    tenant=name,
+                )
+
+                total = sum(copied.values())
+                if total % 10000 == 0:
+                    rate = total / (time.perf_counter() - start)
+                    logger.info(f"Copied {total} chunks ({rate:.0f} chunks/s)")
+
+        total = sum(copied.values())
+        action = "Would copy" if args.dry_run else "Copied"
+        logger.info(
+            f"{action} {total} chunks into {len(copied)} tenants in "
+            f"{time.perf_counter() - start:.1f}s; skipped {skipped} without an owner"
+        )
+        if args.dry_run:
+            return
+
+        failed = client.batch.failed_objects
+        for failure in failed[:5]:
+            logger.error(f"Failed to copy chunk: {failure.message}")
+
+        target = client.collections.get(args.target)
+        mismatched = []
+        for name, expected in copied.items():
+            found = (
+                target.with_tenant(name).aggregate.over_all(total_count=True).total_count
+            )
+            if found != expected:
+                mismatched.append(name)
+                logger.error(f"Tenant {name} has {found} chunks, expected {expected}")
+
+        if failed or mismatched:
+            logger.error("Migration incomplete; source collection kept")
+        elif args.delete_source:
+            client.collections.delete(args.source)
+            logger.info(f"Deleted source collection {args.source}")
+        else:
+            logger.info(
+                f"All tenant counts match; set WEAVIATE_MULTI_TENANCY=true and "
+                f"re-run with --delete-source to drop {args.source}"
+            )
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
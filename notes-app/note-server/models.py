@@ -58,6 +58,10 @@ class PdfDocument(Base):
     upload_date = Column(DateTime, default=datetime.now(tz=timezone.utc))
     last_accessed = Column(DateTime)
     processing_status = Column(String(20), default="pending")
+    # SHA-256 of the PDF bytes; identical uploads share one set of chunks
+    content_hash = Column(String(64), index=True)
+    # Document whose chunks/vectors this upload reuses, if it is a duplicate
+    source_doc_id = Column(Integer, ForeignKey("pdf_documents.id"), nullable=True)
 
     # user = relationship("User", back_populates="pdf_documents")
 
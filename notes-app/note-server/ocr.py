@@ -0,0 +1,111 @@
+import hashlib
+import logging
+import os
+import queue
+import threading
+from typing import Optional
+
+import pytesseract
+from PIL import Image
+
+from disk_cache import DiskLRUCache
+
+try:
+    import tesserocr
+except ImportError:  # optional: falls back to the pytesseract subprocess path
+    tesserocr = None
+
+logger = logging.getLogger(__name__)
+
+# Long-lived tesseract engines kept per process
+OCR_ENGINES_PER_PROCESS = int(os.getenv("OCR_ENGINES_PER_PROCESS", 2))
+OCR_CACHE_PATH = os.getenv("OCR_CACHE_PATH", "cache/ocr_cache.sqlite3")
+OCR_CACHE_MAX_BYTES = int(os.getenv("OCR_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+
+
+def _parse_tesseract_config(config: str) -> dict:
+    """Turn a "--psm 6 --oem 3" style config into tesserocr keyword arguments"""
+    tokens = config.split()
+    options = {}
+    for flag, value in zip(tokens, tokens[1:]):
+        if flag == "--psm":
+            options["psm"] = int(value)
+        elif flag == "--oem":
+            options["oem"] = int(value)
+    return options
+
+
+class OCREnginePool:
+    """
+    A fixed pool of in-process tesseract engines.
+
+    With tesserocr installed each engine is a PyTessBaseAPI whose language
+    model is loaded once and reused for every image, instead of spawning a
+    tesseract process per call. Without it, calls go through pytesseract.
+    """
+
+    def __init__(self, size: int = OCR_ENGINES_PER_PROCESS, config: str = "--psm 6 --oem 3"):
+        self.config = config
+        self._engines: Optional[queue.Queue] = None
+
+        if tesserocr is not None:
+            options = _parse_tesseract_config(config)
+            self._engines = queue.Queue()
+            for _ in range(max(1, size)):
+                self._engines.put(tesserocr.PyTessBaseAPI(**options))
+            logger.info(f"Started {size} in-process tesseract engines")
+        else:
+            logger.warning(
+                "tesserocr not installed, OCR starts a tesseract process per image"
+            )
+
+    def recognize(self, image: Image.Image) -> str:
+        if self._engines is None:
+            return pytesseract.image_to_string(image, config=self.config)
+
+        engine = self._engines.get()
+        try:
+            engine.SetImage(image)
+            return engine.GetUTF8Text()
+        finally:
+            self._engines.put(engine)
+
+    def close(self) -> None:
+        if self._engines is None:
+            return
+        while not self._engines.empty():
+            self._engines.get_nowait().End()
+
+
+class OCRService:
+    """Content-addressed OCR: results are cached by a hash of the image bytes"""
+
+    def __init__(self, config: str = "--psm 6 --oem 3"):
+        self.config = config
+        self.pool = OCREnginePool(config=config)
+        self.cache = DiskLRUCache(OCR_CACHE_PATH, OCR_CACHE_MAX_BYTES)
+
+    def cache_key(self, image_bytes: bytes) -> str:
+        digest = hashlib.sha256(image_bytes).hexdigest()
+        return f"{self.config}:{digest}"
+
+    def cached(self, image_bytes: bytes) -> Optional[str]:
+        return self.cache.get(self.cache_key(image_bytes))
+
+    def recognize(self, image_bytes: bytes, image: Image.Image) -> str:
+        """OCR a preprocessed image and remember the result for its source bytes"""
+        text = self.pool.recognize(image)
+        self.cache.set(self.cache_key(image_bytes), text)
+        return text
+
+
+_ocr_services = {}
+_ocr_services_lock = threading.Lock()
+
+
+def get_ocr_service(config: str = "--psm 6 --oem 3") -> OCRService:
+    """Return this process's OCR service for the given tesseract config"""
+    with _ocr_services_lock:
+        if config not in _ocr_services:
+            _ocr_services[config] = OCRService(config)
+        return _ocr_services[config]
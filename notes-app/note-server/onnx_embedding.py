@@ -0,0 +1,116 @@
+import logging
+import os
+from pathlib import Path
+from typing import Any, List
+
+import numpy as np
+import onnxruntime as ort
+from llama_index.core.base.embeddings.base import BaseEmbedding, Embedding
+from pydantic import PrivateAttr
+from tokenizers import Tokenizer
+
+logger = logging.getLogger(__name__)
+
+ONNX_EMBED_MODEL_DIR = os.getenv("ONNX_EMBED_MODEL_DIR", "onnx_models/all-MiniLM-L6-v2")
+ONNX_EMBED_QUANTIZED = os.getenv("ONNX_EMBED_QUANTIZED", "true").lower() == "true"
+ONNX_EMBED_THREADS = int(os.getenv("ONNX_EMBED_THREADS", 0))
+
+# File names written by export_onnx_embedding.py
+ONNX_MODEL_FILE = "model.onnx"
+ONNX_QUANTIZED_MODEL_FILE = "model.int8.onnx"
+TOKENIZER_FILE = "tokenizer.json"
+
+
+class OnnxEmbedding(BaseEmbedding):
+    """
+    Sentence-transformers embeddings served from an exported ONNX graph on
+    onnxruntime's CPU provider, optionally with int8 dynamic quantization.
+
+    Output matches HuggingFaceEmbedding for the same model: mean pooling
+    over the attention mask followed by L2 normalization.
+    """
+
+    max_length: int = 256
+
+    _session: Any = PrivateAttr()
+    _tokenizer: Any = PrivateAttr()
+    _input_names: List[str] = PrivateAttr()
+
+    def __init__(
+        self,
+        model_name: str = "sentence-transformers/all-MiniLM-L6-v2",
+        model_dir: str = ONNX_EMBED_MODEL_DIR,
+        quantized: bool = ONNX_EMBED_QUANTIZED,
+        embed_batch_size: int = 32,
+        max_length: int = 256,
+        num_threads: int = ONNX_EMBED_THREADS,
+        **kwargs: Any,
+    ):
+        model_file = ONNX_QUANTIZED_MODEL_FILE if quantized else ONNX_MODEL_FILE
+        # Distinct name so caches never mix vectors from different backends
+        super().__init__(
+            model_name=f"{model_name}:onnx{'-int8' if quantized else ''}",
+            embed_batch_size=embed_batch_size,
+            max_length=max_length,
+            **kwargs,
+        )
+
+        model_path = Path(model_dir) / model_file
+        if not model_path.exists():
+            raise FileNotFoundError(
+                f"{model_path} not found; run export_onnx_embedding.py first"
+            )
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+
+        self._session = ort.InferenceSession(
+            str(model_path), sess_options=options, providers=["CPUExecutionProvider"]
+        )
+        self._input_names = [i.name for i in self._session.get_inputs()]
+
+        self._tokenizer = Tokenizer.from_file(str(Path(model_dir) / TOKENIZER_FILE))
+        self._tokenizer.enable_truncation(max_length=max_length)
+        self._tokenizer.enable_padding()
+
+        logger.info(f"Loaded ONNX embedding model {model_path}")
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "OnnxEmbedding"
+
+    def _embed(self, texts: List[str]) -> List[Embedding]:
+        encodings = self._tokenizer.encode_batch(texts)
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self._input_names:
+            feeds["token_type_ids"] = np.array(
+                [e.type_ids for e in encodings], dtype=np.int64
+            )
+
+        token_embeddings = self._session.run(None, feeds)[0]
+
+        mask = attention_mask[..., None].astype(np.float32)
+        summed = (token_embeddings * mask).sum(axis=1)
+        pooled = summed / np.clip(mask.sum(axis=1), 1e-9, None)
+        norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+        return (pooled / np.clip(norms, 1e-12, None)).tolist()
+
+    def _get_query_embedding(self, query: str) -> Embedding:
+        return self._embed([query])[0]
+
+    async def _aget_query_embedding(self, query: str) -> Embedding:
+        return self._get_query_embedding(query)
+
+    def get_query_embedding_batch(self, queries: List[str]) -> List[Embedding]:
+        return self._embed(queries)
+
+    def _get_text_embedding(self, text: str) -> Embedding:
+        return self._embed([text])[0]
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[Embedding]:
+        return self._embed(texts)
@@ -0,0 +1,311 @@
+import io
+import logging
+import math
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+import cv2
+import fitz  # PyMuPDF
+import numpy as np
+import pytesseract
+from PIL import Image
+
+from ocr import get_ocr_service
+
+logger = logging.getLogger(__name__)
+
+# Number of extraction worker processes; defaults to the host's core count
+PDF_EXTRACT_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", os.cpu_count() or 1))
+# Documents shorter than this are extracted in-process
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", 16))
+
+# OCR gating: pages with at least this many text-layer characters are
+# trusted as-is and their images are not OCR'd
+OCR_TEXT_LAYER_MIN_CHARS = int(os.getenv("OCR_TEXT_LAYER_MIN_CHARS", 200))
+# A sparse-text page is treated as scanned only if images cover this
+# fraction of its area
+OCR_SCANNED_MIN_COVERAGE = float(os.getenv("OCR_SCANNED_MIN_COVERAGE", 0.5))
+# Images smaller than this (either side, in pixels) are logos or glyphs
+OCR_MIN_IMAGE_SIDE = int(os.getenv("OCR_MIN_IMAGE_SIDE", 100))
+# Grayscale Shannon entropy (bits) below which an image is blank or flat
+OCR_MIN_IMAGE_ENTROPY = float(os.getenv("OCR_MIN_IMAGE_ENTROPY", 2.0))
+
+
+def load_grayscale(image_bytes: bytes) -> np.ndarray:
+    """Decode image bytes into an 8-bit grayscale array"""
+    image = Image.open(io.BytesIO(image_bytes)).convert("RGB")
+    cv_image = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
+    return cv2.cvtColor(cv_image, cv2.COLOR_BGR2GRAY)
+
+
+def image_entropy(gray: np.ndarray) -> float:
+    """Shannon entropy of the grayscale histogram, in bits"""
+    histogram = np.bincount(gray.ravel(), minlength=256).astype(np.float64)
+    probabilities = histogram[histogram > 0] / gray.size
+    return float(-(probabilities * np.log2(probabilities)).sum())
+
+
+def binarize(gray: np.ndarray) -> Image.Image:
+    """Otsu-threshold and dilate a grayscale image ahead of OCR"""
+    gray = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)[1]
+
+    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (3, 3))
+    gray = cv2.dilate(gray, kernel, iterations=1)
+
+    return Image.fromarray(gray)
+
+
+def ocr_image_bytes(image_bytes: bytes, config: str = "--psm 6 --oem 3") -> str:
+    """Decode an embedded image and OCR it without gating or caching"""
+    image = binarize(load_grayscale(image_bytes))
+    return pytesseract.image_to_string(image, config=config)
+
+
+@dataclass
+class ExtractionStats:
+    page_count: int = 0
+    elapsed_seconds: float = 0.0
+    workers: int = 1
+    pages_scanned: int = 0
+    images_ocr: int = 0
+    images_skipped: int = 0
+    ocr_cache_hits: int = 0
+
+    def merge(self, other: "ExtractionStats") -> None:
+        """Add the per-page counters of a shard into this result"""
+        self.pages_scanned += other.pages_scanned
+        self.images_ocr += other.images_ocr
+        self.images_skipped += other.images_skipped
+        self.ocr_cache_hits += other.ocr_cache_hits
+
+    @property
+    def pages_per_second(self) -> float:
+        if self.elapsed_seconds <= 0:
+            return 0.0
+        return self.page_count / self.elapsed_seconds
+
+
+@dataclass
+class ExtractionResult:
+    text: str
+    stats: ExtractionStats
+
+
+def _extract_page_range(
+    pdf_bytes: bytes, start: int, end: int, ocr_config: str
+) -> Tuple[List[str], ExtractionStats]:
+    """Process pool entry point: extract pages [start, end) of a PDF"""
+    extractor = PDFExtractor(ocr_config=ocr_config, max_workers=1)
+    stats = ExtractionStats()
+    with fitz.open(stream=pdf_bytes, filetype="pdf") as document:
+        return extractor.extract_pages(document, stats, start, end), stats
+
+
+class PDFExtractor:
+    """
+    Extracts the text layer and OCRs embedded images of a PDF in a single
+    walk over its pages. The document is opened straight from memory, so no
+    temporary file is written and nothing is left behind on errors.
+
+    Long documents are sharded into contiguous page ranges and fanned out
+    to a process pool; the shards are reassembled in page order.
+    """
+
+    def __init__(
+        self,
+        ocr_config: str = "--psm 6 --oem 3",
+        max_workers: Optional[int] = None,
+        parallel_min_pages: int = PDF_PARALLEL_MIN_PAGES,
+    ):
+        self.ocr_config = ocr_config
+        self.max_workers = max(1, max_workers or PDF_EXTRACT_WORKERS)
+        self.parallel_min_pages = parallel_min_pages
+
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+
+        # Cumulative throughput across every document this extractor handled
+        self._metrics_lock = threading.Lock()
+        self.total_pages = 0
+        self.total_seconds = 0.0
+        self.total_images_ocr = 0
+        self.total_images_skipped = 0
+        self.total_ocr_cache_hits = 0
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                logger.info(
+                    f"Starting PDF extraction pool with {self.max_workers} workers"
+                )
+                # spawn keeps worker processes free of the parent's gRPC threads
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._pool
+
+    def shutdown(self) -> None:
+        """Stop the extraction worker processes"""
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=True, cancel_futures=True)
+                self._pool = None
+
+    @property
+    def pages_per_second(self) -> float:
+        """Lifetime extraction throughput of this extractor"""
+        with self._metrics_lock:
+            if self.total_seconds <= 0:
+                return 0.0
+            return self.total_pages / self.total_seconds
+
+    def _is_scanned_page(self, page: fitz.Page, page_text: str) -> bool:
+        """A page needs OCR only if it lacks a usable text layer and is mostly image"""
+        if len(page_text.strip()) >= OCR_TEXT_LAYER_MIN_CHARS:
+            return False
+
+        page_area = abs(page.rect)
+        if page_area <= 0:
+            return False
+
+        image_area = sum(
+            abs(fitz.Rect(info["bbox"]) & page.rect)
+            for info in page.get_image_info()
+        )
+        return image_area / page_area >= OCR_SCANNED_MIN_COVERAGE
+
+    def _ocr_image(self, base_image: dict, stats: ExtractionStats) -> str:
+        """OCR one embedded image unless it is too small or too flat to hold text"""
+        if (
+            base_image.get("width", 0) < OCR_MIN_IMAGE_SIDE
+            or base_image.get("height", 0) < OCR_MIN_IMAGE_SIDE
+        ):
+            stats.images_skipped += 1
+            return ""
+
+        image_bytes = base_image["image"]
+        ocr_service = get_ocr_service(self.ocr_config)
+
+        # Identical figures across uploads share one OCR result
+        cached_text = ocr_service.cached(image_bytes)
+        if cached_text is not None:
+            stats.ocr_cache_hits += 1
+            return cached_text
+
+        gray = load_grayscale(image_bytes)
+        if image_entropy(gray) < OCR_MIN_IMAGE_ENTROPY:
+            stats.images_skipped += 1
+            return ""
+
+        stats.images_ocr += 1
+        return ocr_service.recognize(image_bytes, binarize(gray))
+
+    def extract_pages(
+        self,
+        document: fitz.Document,
+        stats: ExtractionStats,
+        start: int = 0,
+        end: Optional[int] = None,
+    ) -> List[str]:
+        """Return the extracted text blocks of pages [start, end), in page order"""
+        text_content = []
+        end = document.page_count if end is None else end
+
+        for page_num in range(start, end):
+            page = document[page_num]
+
+            page_text = page.get_text("text", sort=True)
+            if page_text.strip():
+                text_content.append(f"Page {page_num + 1}:\n{page_text}\n\n")
+
+            image_list = page.get_images(full=True)
+            if not image_list:
+                continue
+
+            if not self._is_scanned_page(page, page_text):
+                stats.images_skipped += len(image_list)
+                continue
+
+            stats.pages_scanned += 1
+            for img_index, img in enumerate(image_list):
+                try:
+                    xref = img[0]
+                    ocr_text = self._ocr_image(document.extract_image(xref), stats)
+
+                    if ocr_text.strip():
+                        text_content.append(
+                            f"Page {page_num + 1} - Image {img_index + 1} (OCR):\n{ocr_text}\n\n"
+                        )
+                except Exception as img_error:
+                    logger.warning(
+                        f"Error processing image {img_index} on page {page_num + 1}: {str(img_error)}"
+                    )
+                    continue
+
+        return text_content
+
+    def _page_ranges(self, page_count: int) -> List[tuple]:
+        # Two shards per worker so one slow (image-heavy) range does not
+        # leave the other workers idle at the end
+        shard_size = max(1, math.ceil(page_count / (self.max_workers * 2)))
+        return [
+            (start, min(start + shard_size, page_count))
+            for start in range(0, page_count, shard_size)
+        ]
+
+    def _extract_parallel(
+        self, pdf_bytes: bytes, page_count: int, stats: ExtractionStats
+    ) -> List[str]:
+        pool = self._get_pool()
+        futures = [
+            pool.submit(_extract_page_range, pdf_bytes, start, end, self.ocr_config)
+            for start, end in self._page_ranges(page_count)
+        ]
+
+        text_content = []
+        for future in futures:
+            shard_text, shard_stats = future.result()
+            text_content.extend(shard_text)
+            stats.merge(shard_stats)
+        return text_content
+
+    def extract(self, pdf_bytes: bytes) -> ExtractionResult:
+        """Extract text and image OCR from in-memory PDF bytes"""
+        start = time.perf_counter()
+        stats = ExtractionStats()
+
+        with fitz.open(stream=pdf_bytes, filetype="pdf") as document:
+            page_count = document.page_count
+            parallel = self.max_workers > 1 and page_count >= self.parallel_min_pages
+            if not parallel:
+                text_content = self.extract_pages(document, stats)
+
+        if parallel:
+            text_content = self._extract_parallel(pdf_bytes, page_count, stats)
+
+        full_text = "\n".join(text_content)
+
+        stats.page_count = page_count
+        stats.elapsed_seconds = time.perf_counter() - start
+        stats.workers = self.max_workers if parallel else 1
+        with self._metrics_lock:
+            self.total_pages += stats.page_count
+            self.total_seconds += stats.elapsed_seconds
+            self.total_images_ocr += stats.images_ocr
+            self.total_images_skipped += stats.images_skipped
+            self.total_ocr_cache_hits += stats.ocr_cache_hits
+
+        logger.info(
+            f"Extracted {len(full_text)} characters from {page_count} pages in "
+            f"{stats.elapsed_seconds:.2f}s ({stats.pages_per_second:.1f} pages/s, "
+            f"{stats.workers} workers); OCR'd {stats.images_ocr} images on "
+            f"{stats.pages_scanned} scanned pages, skipped {stats.images_skipped}, "
+            f"{stats.ocr_cache_hits} served from the OCR cache"
+        )
+        return ExtractionResult(text=full_text, stats=stats)
@@ -0,0 +1,117 @@
+import json
+import logging
+import os
+import time
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
+from redis_config import async_redis_client
+
+logger = logging.getLogger(__name__)
+
+# Progress streams outlive the job long enough for late subscribers
+PROGRESS_STREAM_TTL = int(os.getenv("PROGRESS_STREAM_TTL", 24 * 60 * 60))
+PROGRESS_STREAM_MAXLEN = int(os.getenv("PROGRESS_STREAM_MAXLEN", 20000))
+# Summary tokens are buffered and published at most this often per chunk
+PROGRESS_FLUSH_INTERVAL = float(os.getenv("PROGRESS_FLUSH_INTERVAL", 0.1))
+# Idle SSE connections get a keep-alive comment this often
+PROGRESS_HEARTBEAT = int(os.getenv("PROGRESS_HEARTBEAT", 15))
+
+TERMINAL_EVENT = "done"
+
+
+def stream_key(doc_id: str, kind: str = "pdf") -> str:
+    # PDF and video ids come from separate tables and can collide
+    return f"progress:{kind}:{doc_id}"
+
+
+class ProgressPublisher:
+    """
+    Publishes a document's processing events to a Redis Stream, which the
+    API's SSE endpoint relays to the browser. Works across processes, so
+    events from an ingestion worker reach whichever API instance the
+    client is connected to, and a reconnecting client resumes from its
+    last event id.
+
+    Summary tokens are coalesced per chunk and flushed every
+    PROGRESS_FLUSH_INTERVAL seconds, so a fast stream does not become one
+    Redis write per token. Publishing is best effort and never fails the
+    job it reports on.
+    """
+
+    def __init__(self, doc_id: str, kind: str = "pdf", client=async_redis_client):
+        self.doc_id = str(doc_id)
+        self.key = stream_key(self.doc_id, kind)
+        self.redis = client
+        self._buffers: Dict[Tuple[str, Any], str] = {}
+        self._last_flush = time.monotonic()
+
+    async def _publish(self, event: str, data: Dict[str, Any]) -> None:
+        try:
+            pipe = self.redis.pipeline()
+            pipe.xadd(
+                self.key,
+                {"event": event, "data": json.dumps(data)},
+                maxlen=PROGRESS_STREAM_MAXLEN,
+                approximate=True,
+            )
+            pipe.expire(self.key, PROGRESS_STREAM_TTL)
+            await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Failed to publish {event} for doc_id {self.doc_id}: {str(e)}")
+
+    async def emit(self, event: str, data: Optional[Dict[str, Any]] = None) -> None:
+        data = data or {}
+        if event in ("token", "reduce_token"):
+            buffer_key = (event, data.get("chunk"))
+            self._buffers[buffer_key] = self._buffers.get(buffer_key, "") + data["text"]
+            if time.monotonic() - self._last_flush >= PROGRESS_FLUSH_INTERVAL:
+                await self.flush()
+            return
+
+        # Keep ordering: buffered tokens go out before any other event
+        await self.flush()
+        await self._publish(event, data)
+
+    async def flush(self) -> None:
+        buffers, self._buffers = self._buffers, {}
+        self._last_flush = time.monotonic()
+        for (event, chunk), text in buffers.items():
+            await self._publish(event, {"chunk": chunk, "text": text})
+
+    async def stage(self, name: str, **data: Any) -> None:
+        await self.emit("stage", {"stage": name, **data})
+
+    async def done(self, status: str, error: Optional[str] = None) -> None:
+        data = {"status": status}
+        if error:
+            data["error"] = error
+        await self.emit(TERMINAL_EVENT, data)
+
+
+async def subscribe(
+    doc_id: str,
+    kind: str = "pdf",
+    last_event_id: str = "0-0",
+    client=async_redis_client,
+) -> AsyncIterator[Tuple[Optional[str], Optional[str], Optional[Dict[str, Any]]]]:
+    """
+    Yield (event_id, event, data) from a document's progress stream,
+    starting after last_event_id, until the terminal event. Yields
+    (None, None, None) when PROGRESS_HEARTBEAT seconds pass without events.
+    """
+    key = stream_key(doc_id, kind)
+    while True:
+        response = await client.xread(
+            {key: last_event_id}, block=PROGRESS_HEARTBEAT * 1000, count=100
+        )
+        if not response:
+            yield None, None, None
+            continue
+
+        for _, entries in response:
+            for event_id, fields in entries:
+                last_event_id = event_id
+                event = fields.get("event")
+                yield event_id, event, json.loads(fields.get("data") or "{}")
+                if event == TERMINAL_EVENT:
+                    return
@@ -1,4 +1,5 @@
 import redis
+import redis.asyncio
 import os
 from dotenv import load_dotenv
 
@@ -19,6 +20,16 @@ redis_client = redis.Redis(
     decode_responses=True,
 )
 
+# Async connection for code running on the event loop (e.g. SSE streams),
+# so blocking reads never stall other requests
+async_redis_client = redis.asyncio.Redis(
+    host=REDIS_HOST,
+    port=REDIS_PORT,
+    db=REDIS_DB,
+    password=REDIS_PASSWORD,
+    decode_responses=True,
+)
+
 # Cache expiration times (in seconds)
 CACHE_EXPIRATION = {
     "papers_with_code": 24 * 60 * 60,  # 24 hours
@@ -100,6 +100,39 @@ class ElasticSearchRequest(BaseModel):
     size: int = 10
 
 
+class ChunkSearchRequest(BaseModel):
+    query: str
+    # Limit the search to one of the user's documents
+    doc_id: Optional[str] = None
+    top_k: int = Field(10, ge=1, le=50)
+    # Hybrid weighting: 0 is keyword (BM25) only, 1 is vector only
+    alpha: float = Field(0.5, ge=0.0, le=1.0)
+
+
+class ChunkSearchResult(BaseModel):
+    doc_id: str
+    chunk_id: int
+    content: str
+    score: float
+
+
+class ChunkSearchResponse(BaseModel):
+    results: List[ChunkSearchResult]
+    took_ms: float
+
+
+class LibraryQueryRequest(BaseModel):
+    query: str
+    # Documents picked by centroid similarity before the chunk search
+    top_docs: int = Field(8, ge=1, le=50)
+    top_k: int = Field(8, ge=1, le=50)
+
+
+class DocumentQueryRequest(BaseModel):
+    query: str
+    top_k: int = Field(5, ge=1, le=50)
+
+
 class PrerequisitePapersRequest(BaseModel):
     title: Optional[str] = None
     doi: Optional[str] = None
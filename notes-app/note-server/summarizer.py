@@ -0,0 +1,453 @@
+import asyncio
+import logging
+import os
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from llama_index.core.llms import ChatMessage
+
+from llm_router import PROVIDER_KEY
+from summary_cache import SummaryCache, get_summary_cache
+from tokens import count_tokens, split_by_tokens
+
+logger = logging.getLogger(__name__)
+
+# "map_reduce" summarizes chunks concurrently, "serial" one after another
+SUMMARY_MODE = os.getenv("SUMMARY_MODE", "map_reduce")
+# Maximum chunk prompts in flight at once for one document
+SUMMARY_CONCURRENCY = int(os.getenv("SUMMARY_CONCURRENCY", 4))
+# Merge the chunk summaries into one document summary with an extra call
+SUMMARY_REDUCE = os.getenv("SUMMARY_REDUCE", "false").lower() == "true"
+SUMMARY_CACHE_ENABLED = os.getenv("SUMMARY_CACHE_ENABLED", "true").lower() == "true"
+# Share of the chunk token budget held back, since the local tokenizer
+# may count differently from the model's own
+SUMMARY_TOKEN_MARGIN = float(os.getenv("SUMMARY_TOKEN_MARGIN", 0.1))
+
+# Limits assumed for LLMs that do not report their own (matches _setup_llm)
+DEFAULT_CONTEXT_WINDOW = 8192
+DEFAULT_MAX_OUTPUT_TOKENS = 4000
+MIN_CHUNK_TOKENS = 256
+
+# Bump whenever SUMMARY_PROMPT or format_summary changes, so cached
+# summaries produced by the old prompt are no longer served
+SUMMARY_PROMPT_VERSION = "1"
+
+SUMMARY_PROMPT = """SYSTEM:
+You are a world‑class AI tutor and research explainer, especially skilled at unraveling complex math in ML/NLP/AI papers.  Whenever a formula or special function (e.g., sin, cos, exp, softmax) appears, you MUST:
+1. Explain the *purpose* of that function in this context (“why sine/cosine for positional encoding?”).  
+2. Give an intuitive analogy or real‑world metaphor (“treat each dimension like a clock hand…”).  
+3. Break down each symbol and term with a toy example.  
+4. Contrast with an alternative (e.g., “they didn't use linear or random encoding because…”).  
+
+Your overall response should follow this structure (using markdown):
+
+# Section Summary  
+_A concise 2–3 sentence overview of what this section is doing._
+
+# Key Concepts  
+- Concept A  
+- Concept B  
+- Concept C  
+
+# Detailed Explanations  
+### Concept A  
+- **Intuition & Analogy:**  
+- [Describe as a story or real‑world metaphor]  
+- **Technical Details:**  
+- [Formal definition, equations]  
+- **Math Breakdown:**  
+1. **Equation (…), step by step:**  
+    - *Term 1* (symbol → meaning)  
+    - *Term 2* (why chosen, e.g., "cosine gives smooth periodic variation")  
+    - *Why this function:* [deep why + alternative comparison]  
+2. **Concrete Example:**  
+    - Numeric instantiation or simple code snippet  
+
+> **Always** include a short "Why this function?" mini‑section under every formula that tackles exactly why it was chosen and what would happen if you replaced it.
+
+# Examples & Applications  
+_Practical scenarios, code sketches, or visual analogies that show how these math pieces work in practice._
+
+---
+
+USER:
+Here is the text chunk to analyze:
+
+{chunk}
+"""
+
+REDUCE_PROMPT = """SYSTEM:
+You are a world‑class AI tutor and research explainer. Below are summaries of consecutive sections of one paper, in order. Merge them into a single coherent explanation of the whole paper using the same markdown structure (Section Summary, Key Concepts, Detailed Explanations, Examples & Applications). Keep every equation breakdown and "Why this function?" section, remove repetition between sections and preserve the order in which ideas are introduced.
+
+---
+
+USER:
+Here are the section summaries:
+
+{summaries}
+"""
+
+
+# Section boundaries; each match starts a new section and stays with it
+_SECTION_HEADER_RE = re.compile(
+    r"\n(?=\d+\.\s+[A-Z][^\n]+"  # 1. Introduction
+    r"|[A-Z][^\n]+\n[-=]+\n"  # Underlined heading
+    r"|##\s+[^\n]+\n"  # Markdown heading
+    r"|[A-Z][^\n]+\n)"  # Capitalized line
+)
+# Finer boundaries for sections too large for one chunk
+_SUBSECTION_HEADER_RE = re.compile(
+    r"\n(?=\d+\.\d+\s+[^\n]+|###\s+[^\n]+\n|[A-Z][^\n]+\n-+\n)"
+)
+_PARAGRAPH_RE = re.compile(r"\n\s*\n")
+
+
+def summary_chunk_budget(
+    context_window: int = DEFAULT_CONTEXT_WINDOW,
+    max_output_tokens: int = DEFAULT_MAX_OUTPUT_TOKENS,
+    model: Optional[str] = None,
+) -> int:
+    """
+    Tokens of document text that fit in one summary prompt: the context
+    window minus the reserved output tokens and the prompt template, less
+    SUMMARY_TOKEN_MARGIN for tokenizer mismatch.
+    """
+    template_tokens = count_tokens(SUMMARY_PROMPT.format(chunk=""), model)
+    available = context_window - max_output_tokens - template_tokens
+    budget = int(available * (1 - SUMMARY_TOKEN_MARGIN))
+    if budget < MIN_CHUNK_TOKENS:
+        logger.warning(
+            f"Context window {context_window} leaves {available} tokens after the "
+            f"prompt and {max_output_tokens} output tokens; using {MIN_CHUNK_TOKENS}"
+        )
+        return MIN_CHUNK_TOKENS
+    return budget
+
+
+def _split_oversized(text: str, max_tokens: int, model: Optional[str]) -> List[str]:
+    # Subsections, then paragraphs, then a hard cut on token boundaries
+    for pattern in (_SUBSECTION_HEADER_RE, _PARAGRAPH_RE):
+        pieces = [p.strip() for p in pattern.split(text) if p.strip()]
+        if len(pieces) > 1:
+            return pieces
+    return split_by_tokens(text, max_tokens, model)
+
+
+def chunk_text_for_summary(
+    text: str, max_tokens: Optional[int] = None, model: Optional[str] = None
+) -> List[str]:
+    """
+    Split text into chunks of at most max_tokens tokens (as counted by the
+    model's tokenizer) that preserve semantic structure and mathematical
+    equations. Sections are packed greedily in document order; only a
+    section larger than the budget is split further.
+    """
+    max_tokens = max_tokens or summary_chunk_budget(model=model)
+    # Joining pieces with a blank line costs about this many tokens
+    separator_tokens = 1
+
+    chunks = []
+    current_chunk: List[str] = []
+    current_tokens = 0
+    # Work list in document order; oversized pieces are replaced by their parts
+    pending = [s.strip() for s in _SECTION_HEADER_RE.split(text) if s.strip()]
+    pending.reverse()
+    while pending:
+        piece = pending.pop()
+        piece_tokens = count_tokens(piece, model)
+
+        if piece_tokens > max_tokens:
+            parts = _split_oversized(piece, max_tokens, model)
+            # A hard cut can re-tokenize a token or two over; keep it as is
+            if len(parts) > 1:
+                pending.extend(reversed(parts))
+                continue
+
+        if current_chunk and current_tokens + separator_tokens + piece_tokens > max_tokens:
+            chunks.append("\n\n".join(current_chunk))
+            current_chunk, current_tokens = [], 0
+        if current_chunk:
+            current_tokens += separator_tokens
+        current_chunk.append(piece)
+        current_tokens += piece_tokens
+
+    if current_chunk:
+        chunks.append("\n\n".join(current_chunk))
+
+    logger.info(f"Split text into {len(chunks)} chunks of at most {max_tokens} tokens")
+    return chunks
+
+
+def format_summary(summary: str) -> str:
+    """
+    Clean and format the summary text for better readability.
+    """
+    summary = re.sub(r"\n{3,}", "\n\n", summary.strip())
+
+    summary = re.sub(r"(#{1,6}\s+[^\n]+)\n", r"\1\n\n", summary)
+
+    summary = re.sub(r"(\n\s*[-*]\s+[^\n]+)\n", r"\1\n\n", summary)
+
+    summary = re.sub(r"```\n", "```\n\n", summary)
+    summary = re.sub(r"\n```", "\n\n```", summary)
+
+    # Add horizontal rule between major sections if not present
+    if not re.search(r"\n---\n", summary):
+        summary = re.sub(r"\n(##\s+[^\n]+)\n", r"\n---\n\n\1\n", summary)
+
+    return summary
+
+
+# Receives progress events ("token", "chunk_reset", "chunk_done", ...) and
+# their data as a summary is generated
+EventCallback = Callable[[str, Dict[str, Any]], Awaitable[None]]
+
+
+@dataclass
+class SummaryResult:
+    text: str
+    chunk_summaries: List[str] = field(default_factory=list)
+    mode: str = SUMMARY_MODE
+    elapsed_seconds: float = 0.0
+    cache_hits: int = 0
+
+
+class Summarizer:
+    """
+    Summarizes a document's chunks with an LLM.
+
+    In map_reduce mode the per-chunk prompts run concurrently, at most
+    `concurrency` at a time, and the chunk summaries are returned in
+    chunk order. An optional reduce step merges them into one summary.
+    Generation uses the LLM's native async streaming, so a long summary
+    never blocks the event loop, and an optional on_event callback sees
+    each token as it arrives.
+    """
+
+    def __init__(
+        self,
+        llm,
+        concurrency: int = SUMMARY_CONCURRENCY,
+        reduce: bool = SUMMARY_REDUCE,
+        cache: Optional[SummaryCache] = None,
+        use_cache: bool = SUMMARY_CACHE_ENABLED,
+    ):
+        self.llm = llm
+        self.concurrency = max(1, concurrency)
+        self.reduce = reduce
+        self.cache = (cache or get_summary_cache()) if use_cache else None
+
+        metadata = getattr(llm, "metadata", None)
+        self.chunk_tokens = summary_chunk_budget(
+            getattr(metadata, "context_window", None) or DEFAULT_CONTEXT_WINDOW,
+            getattr(metadata, "num_output", None) or DEFAULT_MAX_OUTPUT_TOKENS,
+            self.model_id,
+        )
+
+    @property
+    def model_id(self) -> str:
+        return getattr(self.llm, "model", None) or type(self.llm).__name__
+
+    def chunk_text(self, text: str) -> List[str]:
+        """Split text into chunks sized for this summarizer's LLM"""
+        return chunk_text_for_summary(text, self.chunk_tokens, self.model_id)
+
+    async def summarize(
+        self,
+        chunks: List[str],
+        mode: Optional[str] = None,
+        reduce: Optional[bool] = None,
+        on_event: Optional[EventCallback] = None,
+    ) -> SummaryResult:
+        mode = mode or SUMMARY_MODE
+        reduce = self.reduce if reduce is None else reduce
+
+        start = time.perf_counter()
+        if mode == "serial":
+            results = [
+                await self._summarize_chunk(i, len(chunks), chunk, on_event)
+                for i, chunk in enumerate(chunks)
+            ]
+        elif mode == "map_reduce":
+            results = await self._map(chunks, on_event)
+        else:
+            raise ValueError(f"Unknown summary mode: {mode}")
+        summaries = [summary for summary, _ in results]
+        cache_hits = sum(1 for _, cached in results if cached)
+
+        if reduce and len(summaries) > 1:
+            text = await self._reduce(summaries, on_event)
+        else:
+            text = "\n\n---\n\n".join(summaries)
+        elapsed = time.perf_counter() - start
+
+        logger.info(
+            f"Summarized {len(chunks)} chunks in {elapsed:.2f}s "
+            f"(mode={mode}, concurrency={self.concurrency if mode == 'map_reduce' else 1}, "
+            f"reduce={reduce}, cached={cache_hits})"
+        )
+        if self.cache is not None:
+            stats = self.cache.stats()
+            logger.info(
+                f"Summary cache: {stats['hits']} hits, {stats['misses']} misses, "
+                f"{stats['tokens_saved']} tokens saved"
+            )
+        return SummaryResult(
+            text=text,
+            chunk_summaries=summaries,
+            mode=mode,
+            elapsed_seconds=elapsed,
+            cache_hits=cache_hits,
+        )
+
+    async def _map(
+        self, chunks: List[str], on_event: Optional[EventCallback] = None
+    ) -> List[Tuple[str, bool]]:
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def bounded(i: int, chunk: str) -> Tuple[str, bool]:
+            async with semaphore:
+                return await self._summarize_chunk(i, len(chunks), chunk, on_event)
+
+        # gather returns results in argument order, whatever order they finish in
+        return await asyncio.gather(
+            *(bounded(i, chunk) for i, chunk in enumerate(chunks))
+        )
+
+    async def _summarize_chunk(
+        self,
+        index: int,
+        total: int,
+        chunk: str,
+        on_event: Optional[EventCallback] = None,
+    ) -> Tuple[str, bool]:
+        """Summary of one chunk, and whether it came from the cache"""
+        model_id = self.model_id
+        if self.cache is not None:
+            cached = await asyncio.to_thread(
+                self.cache.get, chunk, model_id, SUMMARY_PROMPT_VERSION
+            )
+            if cached is not None:
+                logger.info(f"Chunk {index + 1}/{total} summary served from cache")
+                if on_event is not None:
+                    await on_event(
+                        "chunk_done", {"chunk": index, "cached": True, "summary": cached}
+                    )
+                return cached, True
+
+        logger.info(f"Processing chunk {index + 1}/{total}")
+        prompt = SUMMARY_PROMPT.format(chunk=chunk)
+        message = ChatMessage(role="user", content=prompt)
+        summary, from_primary = await self._generate_with_retry(
+            message, on_event, chunk=index
+        )
+        summary = format_summary(summary)
+        if on_event is not None:
+            await on_event(
+                "chunk_done", {"chunk": index, "cached": False, "summary": summary}
+            )
+
+        # Fallback-model output is not stored under the primary model's key
+        if self.cache is not None and from_primary:
+            tokens = count_tokens(prompt) + count_tokens(summary)
+            await asyncio.to_thread(
+                self.cache.set, chunk, model_id, SUMMARY_PROMPT_VERSION, summary, tokens
+            )
+        return summary, False
+
+    async def _reduce(
+        self, summaries: List[str], on_event: Optional[EventCallback] = None
+    ) -> str:
+        logger.info(f"Reducing {len(summaries)} chunk summaries")
+        message = ChatMessage(
+            role="user",
+            content=REDUCE_PROMPT.format(summaries="\n\n---\n\n".join(summaries)),
+        )
+        summary, _ = await self._generate_with_retry(
+            message, on_event, token_event="reduce_token"
+        )
+        summary = format_summary(summary)
+        if on_event is not None:
+            await on_event("reduce_done", {"summary": summary})
+        return summary
+
+    async def _stream_chat(
+        self,
+        message: ChatMessage,
+        on_delta: Optional[Callable[[str], Awaitable[None]]] = None,
+    ) -> Tuple[str, Optional[str]]:
+        response = await self.llm.astream_chat([message])
+        full_response = ""
+        chunk_count = 0
+        provider = None
+
+        async for r in response:
+            provider = r.additional_kwargs.get(PROVIDER_KEY, provider)
+            if r.delta:
+                full_response += r.delta
+                chunk_count += 1
+                if on_delta is not None:
+                    await on_delta(r.delta)
+
+                if chunk_count % 50 == 0:
+                    logger.debug(
+                        f"Received {chunk_count} chunks, current response length: {len(full_response)}"
+                    )
+
+        logger.info(
+            f"Successfully generated summary with {chunk_count} chunks, total length: {len(full_response)}"
+            + (f" via {provider}" if provider else "")
+        )
+        return full_response, provider
+
+    async def _generate_with_retry(
+        self,
+        message: ChatMessage,
+        on_event: Optional[EventCallback] = None,
+        chunk: Optional[int] = None,
+        token_event: str = "token",
+    ) -> Tuple[str, bool]:
+        """
+        Helper method to generate summary with retries. Returns the text and
+        whether the primary provider (rather than a fallback the LLM router
+        switched to) produced it.
+        Streamed tokens are reported to on_event; a failed attempt reports
+        chunk_reset so listeners drop its partial text.
+        """
+        max_retries = 3
+        retry_count = 0
+        last_error = None
+
+        on_delta = None
+        if on_event is not None:
+
+            async def on_delta(delta: str) -> None:
+                await on_event(token_event, {"chunk": chunk, "text": delta})
+
+        while retry_count < max_retries:
+            try:
+                logger.info(f"Attempt {retry_count + 1} to generate summary")
+                full_response, provider = await self._stream_chat(message, on_delta)
+
+                if len(full_response) < 100:
+                    raise Exception("Response too short, likely incomplete")
+
+                return full_response, provider in (None, self.model_id)
+
+            except Exception as e:
+                retry_count += 1
+                last_error = e
+                logger.warning(f"Attempt {retry_count} failed: {str(e)}")
+                if on_event is not None:
+                    await on_event("chunk_reset", {"chunk": chunk, "event": token_event})
+
+                if retry_count < max_retries:
+                    wait_time = 2**retry_count
+                    logger.info(f"Waiting {wait_time} seconds before retry...")
+                    await asyncio.sleep(wait_time)
+
+        raise Exception(
+            f"Failed to generate summary after {max_retries} attempts: {str(last_error)}"
+        )
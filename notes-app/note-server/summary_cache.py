@@ -0,0 +1,77 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from typing import Optional
+
+from disk_cache import DiskLRUCache
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_CACHE_PATH = os.getenv("SUMMARY_CACHE_PATH", "cache/summary_cache.sqlite3")
+SUMMARY_CACHE_MAX_BYTES = int(os.getenv("SUMMARY_CACHE_MAX_BYTES", 128 * 1024 * 1024))
+SUMMARY_CACHE_TTL = int(os.getenv("SUMMARY_CACHE_TTL", 30 * 24 * 60 * 60))
+
+
+class SummaryCache:
+    """
+    Per-chunk summary cache keyed by (chunk text hash, model id, prompt
+    version), so reprocessing a document or uploading overlapping content
+    only sends new or changed chunks to the LLM. Changing the prompt means
+    bumping its version, which retires every old entry.
+
+    Tracks how many prompt and completion tokens cache hits avoided.
+    """
+
+    def __init__(
+        self,
+        path: str = SUMMARY_CACHE_PATH,
+        max_bytes: int = SUMMARY_CACHE_MAX_BYTES,
+        ttl: int = SUMMARY_CACHE_TTL,
+    ):
+        self._cache = DiskLRUCache(path, max_bytes, default_ttl=ttl)
+        self._lock = threading.Lock()
+        self.tokens_saved = 0
+
+    @staticmethod
+    def key(chunk: str, model_id: str, prompt_version: str) -> str:
+        digest = hashlib.sha256(chunk.encode("utf-8")).hexdigest()
+        return f"summary:{model_id}:{prompt_version}:{digest}"
+
+    def get(self, chunk: str, model_id: str, prompt_version: str) -> Optional[str]:
+        value = self._cache.get(self.key(chunk, model_id, prompt_version))
+        if value is None:
+            return None
+
+        entry = json.loads(value)
+        with self._lock:
+            self.tokens_saved += entry.get("tokens", 0)
+        return entry["summary"]
+
+    def set(
+        self,
+        chunk: str,
+        model_id: str,
+        prompt_version: str,
+        summary: str,
+        tokens: int,
+    ) -> None:
+        self._cache.set(
+            self.key(chunk, model_id, prompt_version),
+            json.dumps({"summary": summary, "tokens": tokens}),
+        )
+
+    def stats(self) -> dict:
+        return {**self._cache.stats(), "tokens_saved": self.tokens_saved}
+
+
+_summary_cache: Optional[SummaryCache] = None
+
+
+def get_summary_cache() -> SummaryCache:
+    """Process-wide summary cache; the file itself is shared across processes"""
+    global _summary_cache
+    if _summary_cache is None:
+        _summary_cache = SummaryCache()
+    return _summary_cache
@@ -0,0 +1,130 @@
+import logging
+import os
+import re
+import threading
+import time
+from typing import Callable, Dict, List
+
+import weaviate
+from weaviate.classes.tenants import Tenant, TenantActivityStatus
+
+from redis_config import redis_client
+
+logger = logging.getLogger(__name__)
+
+# Opt-in: store each user's chunks in their own Weaviate tenant
+WEAVIATE_MULTI_TENANCY = os.getenv("WEAVIATE_MULTI_TENANCY", "false").lower() == "true"
+# Multi-tenancy cannot be switched on for an existing collection, so tenant
+# mode uses its own collection; migrate_tenants.py copies the chunks over
+TENANT_CLASS_NAME = os.getenv("WEAVIATE_TENANT_CLASS_NAME", "PDFDocumentTenant")
+# Tenants unused for this long are moved to WEAVIATE_TENANT_IDLE_STATUS
+TENANT_IDLE_SECONDS = int(os.getenv("WEAVIATE_TENANT_IDLE_SECONDS", 24 * 60 * 60))
+# "INACTIVE" frees memory and keeps shards on local disk; "OFFLOADED"
+# moves them to cloud storage and needs an offload module in Weaviate
+TENANT_IDLE_STATUS = os.getenv("WEAVIATE_TENANT_IDLE_STATUS", "INACTIVE").upper()
+# How long a tenant is trusted to be active before its status is rechecked
+TENANT_STATUS_TTL = float(os.getenv("WEAVIATE_TENANT_STATUS_TTL", 60))
+
+_LAST_USED_KEY = "tenants:last_used"
+_INVALID_CHARS = re.compile(r"[^A-Za-z0-9_-]")
+
+
+def tenant_name(user_id: str) -> str:
+    """Weaviate tenant holding a user's chunks"""
+    return f"user_{_INVALID_CHARS.sub('_', str(user_id))}"[:64]
+
+
+class TenantManager:
+    """
+    Per-user tenants of the multi-tenant chunk collection. Each tenant has
+    its own shard and HNSW index, so filtered queries and deletes only touch
+    one user's chunks, and idle users' shards can be deactivated or
+    offloaded to free memory.
+
+    collection() makes sure the tenant exists and is active before
+    returning a tenant-scoped handle, and records the use in Redis for
+    offload_idle(). Status checks are cached for TENANT_STATUS_TTL.
+    """
+
+    def __init__(
+        self,
+        get_client: Callable[[], weaviate.WeaviateClient],
+        class_name: str = TENANT_CLASS_NAME,
+        redis=redis_client,
+    ):
+        self._get_client = get_client
+        self.class_name = class_name
+        self.redis = redis
+        self._checked: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def base_collection(self):
+        return self._get_client().collections.get(self.class_name)
+
+    def collection(self, user_id: str):
+        """Tenant-scoped collection for a user, creating or activating it"""
+        name = tenant_name(user_id)
+        now = time.monotonic()
+        with self._lock:
+            fresh = now - self._checked.get(name, float("-inf")) < TENANT_STATUS_TTL
+        if not fresh:
+            self._ensure_active(name)
+            with self._lock:
+                self._checked[name] = now
+            try:
+                self.redis.zadd(_LAST_USED_KEY, {name: time.time()})
+            except Exception as e:
+                logger.warning(f"Could not record use of tenant {name}: {str(e)}")
+        return self.base_collection.with_tenant(name)
+
+    def _ensure_active(self, name: str) -> None:
+        tenants = self.base_collection.tenants
+        tenant = tenants.get_by_name(name)
+        if tenant is None:
+            tenants.create([Tenant(name=name)])
+            logger.info(f"Created tenant {name} in {self.class_name}")
+        elif tenant.activity_status != TenantActivityStatus.ACTIVE:
+            start = time.perf_counter()
+            tenants.update(
+                [Tenant(name=name, activity_status=TenantActivityStatus.ACTIVE)]
+            )
+            logger.info(
+                f"Activated {tenant.activity_status.value.lower()} tenant {name} "
+                f"in {time.perf_counter() - start:.2f}s"
+            )
+
+    def names(self) -> List[str]:
+        return list(self.base_collection.tenants.get())
+
+    def offload_idle(
+        self,
+        idle_seconds: int = TENANT_IDLE_SECONDS,
+        status: str = TENANT_IDLE_STATUS,
+    ) -> List[str]:
+        """Move active tenants unused for idle_seconds to `status`"""
+        target = TenantActivityStatus(status)
+        cutoff = time.time() - idle_seconds
+        last_used = dict(self.redis.zrange(_LAST_USED_KEY, 0, -1, withscores=True))
+
+        active = [
+            name
+            for name, tenant in self.base_collection.tenants.get().items()
+            if tenant.activity_status == TenantActivityStatus.ACTIVE
+        ]
+        # Tenants never seen since tracking started are timed from now
+        untracked = {name: time.time() for name in active if name not in last_used}
+        if untracked:
+            self.redis.zadd(_LAST_USED_KEY, untracked, nx=True)
+        idle = [name for name in active if last_used.get(name, time.time()) < cutoff]
+        if not idle:
+            return []
+
+        self.base_collection.tenants.update(
+            [Tenant(name=name, activity_status=target) for name in idle]
+        )
+        with self._lock:
+            for name in idle:
+                self._checked.pop(name, None)
+        logger.info(f"Moved {len(idle)} idle tenants to {target.value}: {idle}")
+        return idle
@@ -0,0 +1,15 @@
+import os
+import sys
+
+import fakeredis
+import pytest
+
+# Modules live flat in note-server/, as the app and scripts import them
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# database.py builds its engine at import time
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+
+@pytest.fixture
+def redis():
+    return fakeredis.FakeRedis(decode_responses=True)
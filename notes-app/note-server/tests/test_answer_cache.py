@@ -0,0 +1,62 @@
+import asyncio
+
+import fakeredis
+
+from answer_cache import SemanticAnswerCache
+from memory_cache import LRUCache
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+def test_answer_cache_hits_similar_questions_and_counts_them():
+    cache = SemanticAnswerCache(fakeredis.FakeAsyncRedis(decode_responses=True), threshold=0.9)
+
+    async def main():
+        assert await cache.get("1", [1.0, 0.0], top_k=3) is None
+        await cache.set("1", "what is it?", [1.0, 0.0], 3, {"answer": "a"})
+        close = await cache.get("1", [0.99, 0.05], top_k=3)
+        other_top_k = await cache.get("1", [1.0, 0.0], top_k=5)
+        far = await cache.get("1", [0.0, 1.0], top_k=3)
+        return close, other_top_k, far, await cache.stats()
+
+    close, other_top_k, far, stats = _run(main())
+
+    assert close["answer"] == "a" and close["cached"] is True
+    assert other_top_k is None and far is None
+    assert stats == {"hits": 1, "misses": 3, "hit_rate": 0.25}
+
+
+def test_answer_cache_invalidate_drops_document_entries():
+    cache = SemanticAnswerCache(fakeredis.FakeAsyncRedis(decode_responses=True))
+
+    async def main():
+        await cache.set("1", "q", [1.0, 0.0], 3, {"answer": "a"})
+        await cache.set("2", "q", [1.0, 0.0], 3, {"answer": "b"})
+        await cache.invalidate("1")
+        return await cache.get("1", [1.0, 0.0], 3), await cache.get("2", [1.0, 0.0], 3)
+
+    dropped, kept = _run(main())
+
+    assert dropped is None
+    assert kept["answer"] == "b"
+
+
+def test_lru_cache_evicts_least_recently_used_and_counts():
+    cache = LRUCache(2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get_or_create("a", lambda: 0) == 1
+    assert cache.get_or_create("d", lambda: 4) == 4
+    assert cache.stats() == {
+        "size": 2,
+        "max_size": 2,
+        "hits": 2,
+        "misses": 2,
+        "hit_rate": 0.5,
+    }
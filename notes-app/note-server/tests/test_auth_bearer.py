@@ -0,0 +1,57 @@
+import os
+import time
+
+import jwt
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+os.environ.setdefault("JWT_SECRET_KEY", "test-secret")
+
+from auth_bearer import EventStreamBearer, JWTBearer  # noqa: E402
+
+
+def token(expires_in: int = 60) -> str:
+    return jwt.encode(
+        {"sub": "1", "exp": int(time.time()) + expires_in},
+        os.environ["JWT_SECRET_KEY"],
+        algorithm="HS256",
+    )
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+
+    @app.get("/events")
+    async def events(credentials=Depends(EventStreamBearer())):
+        return {"token": credentials}
+
+    @app.get("/api")
+    async def api(credentials=Depends(JWTBearer())):
+        return {"token": credentials}
+
+    return TestClient(app)
+
+
+def test_event_stream_accepts_query_token(client):
+    valid = token()
+    response = client.get("/events", params={"token": valid})
+    assert response.status_code == 200
+    assert response.json() == {"token": valid}
+
+
+def test_event_stream_accepts_header(client):
+    valid = token()
+    response = client.get("/events", headers={"Authorization": f"Bearer {valid}"})
+    assert response.json() == {"token": valid}
+
+
+@pytest.mark.parametrize("params", [{"token": "garbage"}, {"token": token(-60)}, {}])
+def test_event_stream_rejects_bad_or_missing_token(client, params):
+    # HTTPBearer answers a missing header with 403 (401 on newer FastAPI)
+    assert client.get("/events", params=params).status_code in (401, 403)
+
+
+def test_other_routes_ignore_query_token(client):
+    assert client.get("/api", params={"token": token()}).status_code in (401, 403)
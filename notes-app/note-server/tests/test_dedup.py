@@ -0,0 +1,58 @@
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import dedup
+import models
+from database import Base
+
+
+@pytest.fixture
+def session_factory(monkeypatch):
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=[models.PdfDocument.__table__, models.VideoDocument.__table__])
+    factory = sessionmaker(bind=engine, expire_on_commit=False)
+    monkeypatch.setattr(dedup, "sessionLocal", factory)
+
+    db = factory()
+    now = datetime.now(tz=timezone.utc)
+    db.add_all(
+        [
+            models.PdfDocument(id=1, user_id=10, file_name="a.pdf", s3_key="a", upload_date=now),
+            models.PdfDocument(
+                id=2, user_id=20, file_name="a.pdf", s3_key="b", upload_date=now, source_doc_id=1
+            ),
+            models.VideoDocument(id=2, user_id=30, url="u", s3_key="v", upload_date=now),
+        ]
+    )
+    db.commit()
+    db.close()
+    return factory
+
+
+def test_duplicate_pdf_resolves_to_source(session_factory):
+    assert dedup.resolve_vector_doc_id("2") == "1"
+    assert dedup.resolve_vector_doc_id("1") == "1"
+
+
+def test_video_ids_are_not_pdf_ids(session_factory):
+    video = dedup.video_vector_doc_id(2)
+    assert video == "video_2"
+    assert dedup.resolve_vector_doc_id(video) == video
+    assert dedup.count_linked_documents(video) == 0
+
+
+def test_count_linked_documents(session_factory):
+    assert dedup.count_linked_documents("1") == 1
+    assert dedup.count_linked_documents("2") == 0
+
+
+def test_chunk_owners_of_pdfs(session_factory):
+    assert dedup.chunk_owners(["1", "2", "99"]) == {"1": "10", "2": "20"}
+
+
+def test_chunk_owners_of_videos(session_factory):
+    owners = dedup.chunk_owners(["1", dedup.video_vector_doc_id(2), "video_99", "video_x"])
+    assert owners == {"1": "10", "video_2": "30"}
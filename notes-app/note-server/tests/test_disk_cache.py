@@ -0,0 +1,82 @@
+import sqlite3
+import time
+
+from disk_cache import DiskLRUCache
+
+
+def make_cache(tmp_path, max_bytes=1000, **kwargs):
+    return DiskLRUCache(str(tmp_path / "cache.sqlite3"), max_bytes, **kwargs)
+
+
+def actual_bytes(cache) -> int:
+    conn = sqlite3.connect(cache.path)
+    try:
+        return conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_get_set_and_stats(tmp_path):
+    cache = make_cache(tmp_path)
+    assert cache.get("a") is None
+    cache.set("a", "value")
+    assert cache.get("a") == "value"
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+    assert stats["hit_rate"] == 0.5
+    assert stats["bytes_used"] == len("a") + len("value")
+
+
+def test_ttl_expires_on_read(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.set("a", "value", ttl=1)
+    cache.set("b", "value")
+    assert cache.get("a") == "value"
+
+    conn = sqlite3.connect(cache.path)
+    conn.execute("UPDATE entries SET expires_at = ? WHERE key = 'a'", (time.time() - 1,))
+    conn.commit()
+    conn.close()
+    assert cache.get("a") is None
+    assert cache.bytes_used == actual_bytes(cache) == len("b") + len("value")
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = make_cache(tmp_path, max_bytes=30)
+    cache.set("a", "x" * 9)
+    cache.set("b", "x" * 9)
+    cache.set("c", "x" * 9)
+    cache.get("a")
+    cache.set("d", "x" * 9)
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("d") is not None
+    assert cache.bytes_used <= 30
+
+
+def test_running_total_tracks_every_write(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.set("a", "x" * 50)
+    cache.set("a", "x" * 10)
+    cache.set("b", "é" * 5)
+    cache.delete("a")
+    assert cache.bytes_used == actual_bytes(cache) == len("b") + 10
+
+
+def test_total_initialized_for_existing_cache(tmp_path):
+    path = tmp_path / "cache.sqlite3"
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE entries (key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+        "size INTEGER NOT NULL, expires_at REAL, last_access REAL NOT NULL)"
+    )
+    conn.execute("INSERT INTO entries VALUES ('old', 'v', 42, NULL, 0)")
+    conn.commit()
+    conn.close()
+
+    cache = DiskLRUCache(str(path), 1000)
+    assert cache.bytes_used == 42
+    # Reopening does not count entries twice
+    assert DiskLRUCache(str(path), 1000).bytes_used == 42
@@ -0,0 +1,172 @@
+import numpy as np
+import pytest
+
+import embedded_store
+from embedded_store import EmbeddedCentroids, EmbeddedChunkStore
+from vector_store import SearchScope
+
+DIM = 16
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "store")
+
+
+@pytest.fixture
+def store(path):
+    store = EmbeddedChunkStore(path)
+    yield store
+    store.close()
+
+
+def vectors(seed: int, n: int) -> list:
+    return np.random.default_rng(seed).normal(size=(n, DIM)).tolist()
+
+
+def insert(store, doc_id: str, n: int = 5, user_id: str = "u1", seed: int = 0):
+    chunks = [f"doc{doc_id} chunk{i} topic{seed}" for i in range(n)]
+    embeddings = vectors(seed, n)
+    store.insert(doc_id, chunks, embeddings, {"user_id": user_id, "source": "s3"})
+    return embeddings
+
+
+def test_insert_fetch_and_replace(store):
+    insert(store, "1", n=5)
+    insert(store, "2", n=2)
+    # A shorter re-ingest leaves none of the earlier chunks behind
+    insert(store, "1", n=3, seed=1)
+
+    fetched = sorted(store.fetch(doc_id="1"), key=lambda p: p["chunk_id"])
+    assert [p["chunk_id"] for p in fetched] == [0, 1, 2]
+    assert fetched[0]["content"] == "doc1 chunk0 topic1"
+    assert fetched[0]["source"] == "s3"
+    assert store.count() == 5
+    hits = store.search(
+        "chunk4", vectors(0, 1)[0], [SearchScope(doc_ids=["1"])], top_k=5, alpha=0.0
+    )
+    assert not hits
+
+
+def test_vector_search_finds_exact_match(store):
+    embeddings = insert(store, "1", n=20)
+    hits = store.search("", embeddings[7], [], top_k=3, alpha=1.0)
+    assert (hits[0]["doc_id"], hits[0]["chunk_id"]) == ("1", 7)
+    assert hits[0]["score"] == pytest.approx(1.0)
+
+
+def test_keyword_search(store):
+    insert(store, "1", n=5)
+    insert(store, "2", n=5, seed=1)
+    hits = store.search("topic1", vectors(9, 1)[0], [], top_k=10, alpha=0.0)
+    assert {hit["doc_id"] for hit in hits} == {"2"}
+
+
+def test_scopes_filter_by_document_and_user(store):
+    insert(store, "1", user_id="u1")
+    insert(store, "2", user_id="u1", seed=1)
+    insert(store, "3", user_id="u2", seed=2)
+    query = vectors(3, 1)[0]
+
+    hits = store.search("chunk0", query, [SearchScope(doc_ids=["2"])], top_k=10)
+    assert {hit["doc_id"] for hit in hits} == {"2"}
+    hits = store.search("chunk0", query, [SearchScope(user_id="u2")], top_k=10)
+    assert {hit["doc_id"] for hit in hits} == {"3"}
+    scopes = [SearchScope(doc_ids=["1"], user_id="u1"), SearchScope(user_id="u2")]
+    hits = store.search("chunk0", query, scopes, top_k=20)
+    assert {hit["doc_id"] for hit in hits} == {"1", "3"}
+
+
+def test_delete(store):
+    embeddings = insert(store, "1")
+    insert(store, "2", seed=1)
+    store.delete("1")
+
+    assert store.fetch(doc_id="1") == []
+    hits = store.search("doc1", embeddings[0], [], top_k=10)
+    assert {hit["doc_id"] for hit in hits} == {"2"}
+
+
+def test_reopen_keeps_chunks(path):
+    store = EmbeddedChunkStore(path)
+    embeddings = insert(store, "1")
+    store.close()
+
+    store = EmbeddedChunkStore(path)
+    try:
+        assert store.count() == 5
+        hits = store.search("", embeddings[2], [], top_k=1, alpha=1.0)
+        assert hits[0]["chunk_id"] == 2
+    finally:
+        store.close()
+
+
+def test_sees_writes_from_another_process(path):
+    # Two handles on one path stand in for the API and a worker process
+    api = EmbeddedChunkStore(path)
+    worker = EmbeddedChunkStore(path)
+    try:
+        insert(api, "0", n=10)
+        embeddings = insert(worker, "1", n=2000, seed=1)
+
+        hits = api.search("", embeddings[1500], [SearchScope(doc_ids=["1"])], 1, alpha=1.0)
+        assert hits[0]["chunk_id"] == 1500
+        hits = api.search("", embeddings[1999], [], 1, alpha=1.0)
+        assert (hits[0]["doc_id"], hits[0]["chunk_id"]) == ("1", 1999)
+
+        worker.delete("1")
+        hits = api.search("", embeddings[1999], [], 5, alpha=1.0)
+        assert {hit["doc_id"] for hit in hits} == {"0"}
+        # Rows allocated by both handles never overlap
+        insert(api, "2", n=3, seed=2)
+        assert worker.count() == 13
+    finally:
+        api.close()
+        worker.close()
+
+
+def test_ivf_is_built_out_of_band(path, monkeypatch):
+    monkeypatch.setattr(embedded_store, "EMBEDDED_IVF_MIN_ROWS", 500)
+    monkeypatch.setattr(embedded_store, "EMBEDDED_IVF_NPROBE", 4)
+    store = EmbeddedChunkStore(path)
+    other = EmbeddedChunkStore(path)
+    try:
+        rng = np.random.default_rng(0)
+        centers = rng.normal(size=(20, DIM))
+        corpus = centers[rng.integers(0, 20, size=1000)] + 0.1 * rng.normal(size=(1000, DIM))
+        for d in range(10):
+            store.insert(
+                str(d), [f"c{i}" for i in range(100)], corpus[d * 100 : (d + 1) * 100].tolist(), {}
+            )
+        assert store.ivf_centroids is None
+        assert store.needs_ivf()
+
+        other.build_ivf()
+        assert not store.needs_ivf()
+        assert store.ivf_centroids is not None
+
+        found = 0
+        for i in range(0, 1000, 50):
+            hit = store.search("", corpus[i].tolist(), [], 1, alpha=1.0)[0]
+            found += (hit["doc_id"], hit["chunk_id"]) == (str(i // 100), i % 100)
+        assert found >= 18
+    finally:
+        store.close()
+        other.close()
+
+
+def test_centroids_rank_user_documents(store):
+    centroids = EmbeddedCentroids(store)
+    a, b = np.eye(DIM)[0], np.eye(DIM)[1]
+    centroids.upsert("1", "u1", a, 5)
+    centroids.upsert("2", "u1", b, 5)
+    centroids.upsert("3", "u2", a, 5)
+    assert centroids.link("4", "u1", "1")
+
+    ranked = centroids.candidates("u1", a.tolist(), limit=3)
+    assert [c.doc_id for c in ranked][:2] in (["1", "4"], ["4", "1"])
+    assert ranked[-1].doc_id == "2"
+    assert ranked[0].vector_doc_id == "1"
+
+    centroids.delete("4")
+    assert [c.doc_id for c in centroids.candidates("u1", a.tolist(), limit=5)] == ["1", "2"]
@@ -0,0 +1,120 @@
+import asyncio
+import threading
+
+import pytest
+
+from embedding_service import EmbeddingBatcher
+
+
+class FakeModel:
+    """Embeds text as [len(text)] and records each batch it is given"""
+
+    model_name = "fake"
+    embed_batch_size = 10
+
+    def __init__(self, gate: threading.Event = None, error: Exception = None):
+        self.calls = []
+        self.gate = gate
+        self.error = error
+
+    def _embed(self, kind, texts):
+        if self.gate is not None:
+            self.gate.wait(5)
+        self.calls.append((kind, list(texts)))
+        if self.error is not None:
+            raise self.error
+        return [[float(len(text))] for text in texts]
+
+    def get_query_embedding_batch(self, texts):
+        return self._embed("query", texts)
+
+    def get_text_embedding_batch(self, texts):
+        return self._embed("text", texts)
+
+
+def run(batcher, coro):
+    async def main():
+        try:
+            return await coro()
+        finally:
+            batcher.shutdown()
+
+    return asyncio.run(main())
+
+
+def test_concurrent_requests_share_a_batch():
+    model = FakeModel()
+    batcher = EmbeddingBatcher(model, max_batch_size=8, max_wait_ms=50)
+
+    async def scenario():
+        return await asyncio.gather(
+            batcher.embed_texts(["a", "bb"]),
+            batcher.embed_texts(["ccc"]),
+            batcher.embed_query("dddd"),
+        )
+
+    texts_1, texts_2, query = run(batcher, scenario)
+    assert texts_1 == [[1.0], [2.0]]
+    assert texts_2 == [[3.0]]
+    assert query == [4.0]
+    assert sorted(kind for kind, _ in model.calls) == ["query", "text"]
+    assert batcher.batches == 1
+    assert batcher.mean_batch_size == 4
+
+
+def test_batches_respect_max_size():
+    model = FakeModel()
+    batcher = EmbeddingBatcher(model, max_batch_size=3, max_wait_ms=50)
+
+    vectors = run(batcher, lambda: batcher.embed_texts(["x"] * 7))
+    assert len(vectors) == 7
+    assert [len(texts) for _, texts in model.calls] == [3, 3, 1]
+
+
+def test_queries_jump_ahead_of_pending_ingest():
+    gate = threading.Event()
+    model = FakeModel(gate=gate)
+    batcher = EmbeddingBatcher(model, max_batch_size=2, max_wait_ms=0)
+
+    async def scenario():
+        ingest = asyncio.ensure_future(batcher.embed_texts(["t"] * 6))
+        await asyncio.sleep(0.05)
+        query = asyncio.ensure_future(batcher.embed_query("q"))
+        await asyncio.sleep(0.05)
+        gate.set()
+        await asyncio.gather(ingest, query)
+
+    run(batcher, scenario)
+    # The first text batch was already running; the query went next
+    assert model.calls[1] == ("query", ["q"])
+
+
+def test_cancelled_request_does_not_fail_its_batch():
+    gate = threading.Event()
+    model = FakeModel(gate=gate)
+    batcher = EmbeddingBatcher(model, max_batch_size=8, max_wait_ms=20)
+
+    async def scenario():
+        cancelled = asyncio.ensure_future(batcher.embed_texts(["a"]))
+        sibling = asyncio.ensure_future(batcher.embed_texts(["bb"]))
+        await asyncio.sleep(0.1)
+        cancelled.cancel()
+        gate.set()
+        return await sibling
+
+    assert run(batcher, scenario) == [[2.0]]
+
+
+def test_model_error_fails_every_request_in_the_batch():
+    model = FakeModel(error=RuntimeError("model crashed"))
+    batcher = EmbeddingBatcher(model, max_batch_size=8, max_wait_ms=20)
+
+    async def scenario():
+        return await asyncio.gather(
+            batcher.embed_texts(["a"]),
+            batcher.embed_query("b"),
+            return_exceptions=True,
+        )
+
+    results = run(batcher, scenario)
+    assert all(isinstance(result, RuntimeError) for result in results)
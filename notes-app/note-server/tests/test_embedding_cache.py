@@ -0,0 +1,125 @@
+from llama_index.core.embeddings import MockEmbedding
+
+from embedding_cache import CachedEmbedding, EmbeddingStore
+
+DIM = 4
+SLOT_BYTES = DIM * 4 + 8
+
+
+def _key(n: int) -> str:
+    # Slots are fingerprinted by the first 16 hex digits
+    return f"{n:016x}" * 4
+
+
+def _vector(n: int) -> list:
+    return [float(n)] * DIM
+
+
+def test_round_trip(tmp_path):
+    store = EmbeddingStore(str(tmp_path), DIM, 8 * SLOT_BYTES)
+    store.put_many([_key(1), _key(2)], [_vector(1), _vector(2)])
+
+    assert store.get_many([_key(2), _key(3), _key(1)]) == [_vector(2), None, _vector(1)]
+    assert len(store) == 2
+    assert store.bytes_used == 2 * SLOT_BYTES
+
+
+def test_batch_fills_free_slots_then_recycles_lru(tmp_path):
+    store = EmbeddingStore(str(tmp_path), DIM, 3 * SLOT_BYTES)
+    store.put_many([_key(1), _key(2)], [_vector(1), _vector(2)])
+    store.get_many([_key(1)])
+
+    # One free slot, then the least recently used entries are recycled
+    store.put_many([_key(3), _key(4), _key(5)], [_vector(3), _vector(4), _vector(5)])
+
+    assert len(store) == 3
+    assert store.get_many([_key(1), _key(2), _key(3), _key(4), _key(5)]) == [
+        None,
+        None,
+        _vector(3),
+        _vector(4),
+        _vector(5),
+    ]
+
+
+def test_existing_key_is_overwritten_in_place(tmp_path):
+    store = EmbeddingStore(str(tmp_path), DIM, 2 * SLOT_BYTES)
+    store.put_many([_key(1), _key(2)], [_vector(1), _vector(2)])
+    store.put_many([_key(1)], [_vector(9)])
+
+    assert len(store) == 2
+    assert store.get_many([_key(1), _key(2)]) == [_vector(9), _vector(2)]
+
+
+def test_reopened_store_keeps_entries(tmp_path):
+    EmbeddingStore(str(tmp_path), DIM, 4 * SLOT_BYTES).put_many([_key(1)], [_vector(1)])
+
+    store = EmbeddingStore(str(tmp_path), DIM, 4 * SLOT_BYTES)
+
+    assert EmbeddingStore.existing_dim(str(tmp_path)) == DIM
+    assert store.get_many([_key(1)]) == [_vector(1)]
+    store.put_many([_key(2)], [_vector(2)])
+    assert store.get_many([_key(1), _key(2)]) == [_vector(1), _vector(2)]
+
+
+def test_cached_embedding_counts_hits_and_misses(tmp_path):
+    embedding = CachedEmbedding(MockEmbedding(embed_dim=DIM), cache_dir=str(tmp_path))
+
+    first = embedding.get_text_embedding_batch(["a", "b"])
+    second = embedding.get_text_embedding_batch(["a", "b", "c"])
+
+    assert second[:2] == first
+    stats = embedding.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (2, 3, 3)
+    assert stats["hit_rate"] == 0.4
+    assert stats["bytes_used"] == 3 * SLOT_BYTES
+
+
+class _Watched:
+    """Delegates to a memmap, calling hooks on row reads and writes"""
+
+    def __init__(self, inner, on_get=None, on_set=None):
+        self.inner = inner
+        self.on_get = on_get
+        self.on_set = on_set
+
+    def __getitem__(self, slot):
+        if self.on_get:
+            self.on_get(slot)
+        return self.inner[slot]
+
+    def __setitem__(self, slot, value):
+        if self.on_set:
+            self.on_set(slot)
+        self.inner[slot] = value
+
+    def flush(self):
+        self.inner.flush()
+
+
+def test_vector_is_written_while_its_fingerprint_is_cleared(tmp_path):
+    store = EmbeddingStore(str(tmp_path), DIM, 2 * SLOT_BYTES)
+    store.put_many([_key(1), _key(2)], [_vector(1), _vector(2)])
+    seen = []
+    store._vectors = _Watched(
+        store._vectors, on_set=lambda slot: seen.append(int(store._fingerprints[slot]))
+    )
+
+    # Overwrites one slot and recycles the other
+    store.put_many([_key(1), _key(3)], [_vector(9), _vector(3)])
+
+    assert seen == [0, 0]
+    assert store.get_many([_key(1), _key(3)]) == [_vector(9), _vector(3)]
+
+
+def test_slot_recycled_during_a_read_is_a_miss(tmp_path):
+    reader = EmbeddingStore(str(tmp_path), DIM, SLOT_BYTES)
+    writer = EmbeddingStore(str(tmp_path), DIM, SLOT_BYTES)
+    reader.put_many([_key(1)], [_vector(1)])
+
+    def recycle(slot):
+        writer.put_many([_key(2)], [_vector(2)])
+
+    reader._vectors = _Watched(reader._vectors, on_get=recycle)
+
+    assert reader.get_many([_key(1)]) == [None]
@@ -0,0 +1,91 @@
+import time
+
+from job_queue import JobQueue
+
+
+def make_queue(redis, **kwargs):
+    return JobQueue(client=redis, **kwargs)
+
+
+def test_claim_and_ack(redis):
+    queue = make_queue(redis)
+    job_id = queue.enqueue("pdf", {"document_id": "1"})
+
+    job = queue.claim("pdf")
+    assert job["id"] == job_id
+    assert job["payload"] == {"document_id": "1"}
+    assert job["attempts"] == 1
+    assert queue.claim("pdf") is None
+    assert queue.stats("pdf")["leased"] == 1
+
+    queue.ack(job)
+    assert queue.get_job(job_id)["status"] == "completed"
+    assert queue.stats("pdf") == {"ready": 0, "leased": 0, "delayed": 0, "dead": 0}
+
+
+def test_job_types_are_separate(redis):
+    queue = make_queue(redis)
+    queue.enqueue("video", {"document_id": "1"})
+    assert queue.claim("pdf") is None
+    assert queue.claim("video") is not None
+
+
+def test_failed_job_is_retried_then_dead(redis):
+    queue = make_queue(redis, retry_backoff=0)
+    job_id = queue.enqueue("pdf", {}, max_attempts=2)
+
+    assert queue.fail(queue.claim("pdf"), "boom") is True
+    assert queue.get_job(job_id)["status"] == "retrying"
+    assert queue.requeue_expired(["pdf"]) == 1
+
+    job = queue.claim("pdf")
+    assert job["attempts"] == 2
+    assert queue.fail(job, "boom again") is False
+    assert queue.get_job(job_id)["status"] == "dead"
+    assert queue.stats("pdf")["dead"] == 1
+
+
+def test_expired_lease_is_redelivered(redis):
+    queue = make_queue(redis, visibility_timeout=-1)
+    job_id = queue.enqueue("pdf", {})
+    queue.claim("pdf")
+
+    assert queue.requeue_expired(["pdf"]) == 1
+    assert queue.claim("pdf")["id"] == job_id
+
+
+def test_heartbeat_extends_lease(redis):
+    queue = make_queue(redis, visibility_timeout=60)
+    queue.enqueue("pdf", {})
+    job = queue.claim("pdf")
+    before = redis.zscore("jobs:pdf:leased", job["id"])
+
+    time.sleep(0.01)
+    queue.heartbeat(job)
+    assert redis.zscore("jobs:pdf:leased", job["id"]) > before
+    assert queue.requeue_expired(["pdf"]) == 0
+
+
+def test_release_keeps_attempt_and_goes_first(redis):
+    queue = make_queue(redis)
+    first = queue.enqueue("pdf", {})
+    queue.enqueue("pdf", {})
+
+    job = queue.claim("pdf")
+    queue.release(job)
+    again = queue.claim("pdf")
+    assert again["id"] == first
+    assert again["attempts"] == 1
+
+
+def test_job_crashing_every_attempt_goes_dead(redis):
+    queue = make_queue(redis, visibility_timeout=-1)
+    job_id = queue.enqueue("pdf", {}, max_attempts=1)
+    queue.claim("pdf")
+    queue.requeue_expired(["pdf"])
+
+    dead = queue.claim("pdf")
+    assert (dead["id"], dead["status"], dead["payload"]) == (job_id, "dead", {})
+    assert queue.get_job(job_id)["status"] == "dead"
+    assert queue.stats("pdf") == {"ready": 0, "leased": 0, "delayed": 0, "dead": 1}
+    assert queue.claim("pdf") is None
@@ -0,0 +1,60 @@
+import asyncio
+from types import SimpleNamespace
+
+import llm_router
+from llm_router import PROVIDER_KEY, LLMRouter
+
+
+class FakeStream:
+    """Async response stream whose tokens each take delay seconds"""
+
+    def __init__(self, texts, delay=0.0):
+        self.texts = list(texts)
+        self.delay = delay
+        self.closed = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        await asyncio.sleep(self.delay)
+        if not self.texts:
+            raise StopAsyncIteration
+        return SimpleNamespace(delta=self.texts.pop(0), additional_kwargs={})
+
+    async def aclose(self):
+        self.closed = True
+
+
+class FakeProvider:
+    def __init__(self, model, stream):
+        self.model = model
+        self.stream = stream
+
+    async def astream_complete(self, *args, **kwargs):
+        return self.stream
+
+
+async def _collect(router):
+    stream = await router.astream_complete("prompt")
+    return [(r.delta, r.additional_kwargs[PROVIDER_KEY]) async for r in stream]
+
+
+def test_slow_first_token_closes_stream_and_fails_over(monkeypatch):
+    monkeypatch.setattr(llm_router, "LLM_FIRST_TOKEN_TIMEOUT", 0.05)
+    slow = FakeProvider("slow", FakeStream(["late"], delay=1))
+    fast = FakeProvider("fast", FakeStream(["a", "b"]))
+    router = LLMRouter([slow, fast])
+
+    assert asyncio.run(_collect(router)) == [("a", "fast"), ("b", "fast")]
+    assert slow.stream.closed
+    assert not fast.stream.closed
+
+
+def test_per_provider_first_token_timeout(monkeypatch):
+    monkeypatch.setattr(llm_router, "LLM_FIRST_TOKEN_TIMEOUT", 0.05)
+    thinking = FakeProvider("thinking", FakeStream(["answer"], delay=0.2))
+    fallback = FakeProvider("fallback", FakeStream(["other"]))
+    router = LLMRouter([thinking, fallback], first_token_timeouts={"thinking": 5})
+
+    assert asyncio.run(_collect(router)) == [("answer", "thinking")]
@@ -0,0 +1,52 @@
+from sqlalchemy import create_engine, inspect, text
+
+import migrate_dedup_columns
+from migrate_dedup_columns import CONTENT_HASH_INDEX, add_dedup_columns, pending_statements
+
+
+def _legacy_engine():
+    engine = create_engine("sqlite://")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE pdf_documents (id INTEGER PRIMARY KEY, file_name VARCHAR)"))
+        conn.execute(text("INSERT INTO pdf_documents (id, file_name) VALUES (1, 'a.pdf')"))
+    return engine
+
+
+def test_adds_missing_columns_and_index():
+    engine = _legacy_engine()
+
+    assert len(add_dedup_columns(engine)) == 3
+
+    inspector = inspect(engine)
+    columns = {column["name"] for column in inspector.get_columns("pdf_documents")}
+    assert {"content_hash", "source_doc_id"} <= columns
+    assert CONTENT_HASH_INDEX in {index["name"] for index in inspector.get_indexes("pdf_documents")}
+    with engine.connect() as conn:
+        row = conn.execute(text("SELECT file_name, content_hash, source_doc_id FROM pdf_documents")).one()
+    assert tuple(row) == ("a.pdf", None, None)
+
+
+def test_rerun_is_a_no_op():
+    engine = _legacy_engine()
+    add_dedup_columns(engine)
+
+    assert add_dedup_columns(engine) == []
+
+
+def test_missing_table_is_left_to_create_all():
+    assert pending_statements(create_engine("sqlite://")) == []
+
+
+def test_statements_applied_by_a_concurrent_run_are_skipped(monkeypatch):
+    engine = _legacy_engine()
+    stale = pending_statements(engine)
+    # Another replica migrates between our check and our ALTERs
+    add_dedup_columns(engine)
+    checks = iter([stale])
+    monkeypatch.setattr(
+        migrate_dedup_columns,
+        "pending_statements",
+        lambda e: next(checks, None) or pending_statements(e),
+    )
+
+    assert migrate_dedup_columns.add_dedup_columns(engine) == []
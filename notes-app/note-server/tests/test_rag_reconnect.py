@@ -0,0 +1,55 @@
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+import RAG
+
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    connected = SimpleNamespace(is_connected=lambda: True)
+    monkeypatch.setattr(
+        RAG, "weaviate", SimpleNamespace(connect_to_local=lambda **kwargs: connected)
+    )
+
+    def make(multi_tenancy):
+        # Skip __init__: only the reconnect state matters here
+        pipeline = RAG.RAGPipeline.__new__(RAG.RAGPipeline)
+        pipeline.vector_backend = "weaviate"
+        pipeline.multi_tenancy = multi_tenancy
+        pipeline._weaviate_lock = threading.Lock()
+        pipeline.weaviate_client = SimpleNamespace(is_connected=lambda: False)
+        pipeline.index = None
+        pipeline.built = 0
+
+        def build_index():
+            pipeline.built += 1
+            pipeline.index = object()
+
+        pipeline._build_index = build_index
+        return pipeline
+
+    return make
+
+
+def test_tenant_mode_reconnect_keeps_querying_through_the_chunk_store(pipeline):
+    rag = pipeline(multi_tenancy=True)
+
+    rag._ensure_weaviate_connected()
+    rag.weaviate_client = None
+    rag._ensure_weaviate_connected()
+
+    assert rag.weaviate_client.is_connected()
+    assert rag.built == 0
+    assert rag.index is None
+
+
+def test_single_tenant_reconnect_rebuilds_the_index(pipeline):
+    rag = pipeline(multi_tenancy=False)
+
+    rag._ensure_weaviate_connected()
+
+    assert rag.weaviate_client.is_connected()
+    assert rag.built == 1
+    assert rag.index is not None
@@ -0,0 +1,49 @@
+import operator
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+from weaviate.collections.classes.filters import _FilterAnd, _Operator
+
+from vector_store import WeaviateChunkStore
+
+OPERATORS = {_Operator.EQUAL: operator.eq, _Operator.GREATER_THAN_EQUAL: operator.ge}
+
+
+def matches(where, properties) -> bool:
+    if isinstance(where, _FilterAnd):
+        return all(matches(f, properties) for f in where.filters)
+    return OPERATORS[where.operator](properties[where.target], where.value)
+
+
+class FakeCollection:
+    """Objects by uuid, with the batch and delete_many calls insert uses"""
+
+    def __init__(self):
+        self.objects = {}
+        self.batch = SimpleNamespace(fixed_size=self._batch, failed_objects=[])
+        self.data = SimpleNamespace(delete_many=self._delete_many)
+
+    @contextmanager
+    def _batch(self, batch_size):
+        def add_object(properties, uuid, vector):
+            self.objects[uuid] = properties
+
+        yield SimpleNamespace(add_object=add_object)
+
+    def _delete_many(self, where):
+        for uuid, properties in list(self.objects.items()):
+            if matches(where, properties):
+                del self.objects[uuid]
+
+
+def test_reinsert_with_fewer_chunks_drops_the_rest():
+    collection = FakeCollection()
+    client = SimpleNamespace(collections=SimpleNamespace(get=lambda name: collection))
+    store = WeaviateChunkStore(lambda: client, "Chunks")
+
+    store.insert("1", [f"old{i}" for i in range(5)], [[0.0]] * 5, {"doc_id": "1"})
+    store.insert("2", ["other"], [[0.0]], {"doc_id": "2"})
+    assert store.insert("1", ["new0", "new1"], [[0.0]] * 2, {"doc_id": "1"}) == 2
+
+    contents = sorted(p["content"] for p in collection.objects.values())
+    assert contents == ["new0", "new1", "other"]
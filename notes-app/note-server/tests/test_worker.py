@@ -0,0 +1,163 @@
+import asyncio
+import itertools
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import ingest_tasks
+import models
+import worker
+from database import Base
+from job_queue import LEASE_EXPIRED_ERROR, JobQueue
+
+
+class FakeQueue:
+    """Endless supply of jobs; records what the worker does with them"""
+
+    visibility_timeout = 300
+
+    def __init__(self, jobs=None):
+        self.ids = itertools.count()
+        self.jobs = jobs
+        self.acked, self.failed, self.released = [], [], []
+
+    def claim(self, job_type):
+        if self.jobs is not None and not self.jobs:
+            return None
+        if self.jobs is not None:
+            self.jobs.pop()
+        return {
+            "id": str(next(self.ids)),
+            "type": job_type,
+            "status": "running",
+            "payload": {"document_id": "1"},
+            "attempts": 1,
+            "max_attempts": 3,
+        }
+
+    def heartbeat(self, job):
+        pass
+
+    def ack(self, job):
+        self.acked.append(job["id"])
+
+    def fail(self, job, error):
+        self.failed.append(job["id"])
+        return True
+
+    def release(self, job):
+        self.released.append(job["id"])
+
+    def requeue_expired(self, job_types):
+        return 0
+
+
+@pytest.fixture
+def queue(monkeypatch):
+    queue = FakeQueue()
+    monkeypatch.setattr(worker, "get_job_queue", lambda: queue)
+    monkeypatch.setattr(worker, "get_shared_pipeline", lambda: SimpleNamespace(tenants=None))
+    monkeypatch.setattr(worker, "WORKER_POLL_INTERVAL", 0.01)
+
+    async def aclose():
+        pass
+
+    monkeypatch.setattr(worker, "aclose_http_clients", aclose)
+    return queue
+
+
+async def run_then_stop(w, after: float, timeout: float):
+    runner = asyncio.create_task(w.run())
+    await asyncio.sleep(after)
+    w.stop()
+    await asyncio.wait_for(runner, timeout)
+
+
+def test_stop_with_every_slot_busy_honours_drain_timeout(queue, monkeypatch):
+    async def stuck(**payload):
+        await asyncio.sleep(60)
+
+    monkeypatch.setitem(worker.JOB_HANDLERS, "pdf", stuck)
+    w = worker.Worker({"pdf": 2}, drain_timeout=0.2)
+
+    asyncio.run(run_then_stop(w, after=0.2, timeout=5))
+    assert sorted(queue.released) == ["0", "1"]
+    assert not queue.acked
+
+
+def test_stop_waits_for_jobs_that_finish_in_time(queue, monkeypatch):
+    async def quick(**payload):
+        await asyncio.sleep(0.3)
+
+    queue.jobs = [None]
+    monkeypatch.setitem(worker.JOB_HANDLERS, "pdf", quick)
+    w = worker.Worker({"pdf": 2}, drain_timeout=5)
+
+    asyncio.run(run_then_stop(w, after=0.1, timeout=5))
+    assert queue.acked == ["0"]
+    assert not queue.released
+
+
+def test_failed_job_is_reported_to_the_queue(queue, monkeypatch):
+    async def broken(**payload):
+        raise RuntimeError("boom")
+
+    queue.jobs = [None]
+    monkeypatch.setitem(worker.JOB_HANDLERS, "pdf", broken)
+    w = worker.Worker({"pdf": 1}, drain_timeout=1)
+
+    asyncio.run(run_then_stop(w, after=0.1, timeout=5))
+    assert queue.failed == ["0"]
+    assert not queue.acked
+
+
+def test_job_whose_worker_died_on_every_attempt_fails_its_document(redis, tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'app.db'}")
+    Base.metadata.create_all(engine, tables=[models.PdfDocument.__table__])
+    factory = sessionmaker(bind=engine)
+    monkeypatch.setattr(ingest_tasks, "sessionLocal", factory)
+    db = factory()
+    db.add(models.PdfDocument(id=1, user_id=1, file_name="a.pdf", s3_key="a", processing_status="processing"))
+    db.commit()
+
+    done = []
+
+    class Progress:
+        def __init__(self, document_id, kind):
+            self.key = (kind, document_id)
+
+        async def done(self, status, error=None):
+            done.append((self.key, status, error))
+
+    monkeypatch.setattr(ingest_tasks, "ProgressPublisher", Progress)
+
+    # Each claim's lease expires without an ack, as when the worker is OOM-killed
+    queue = JobQueue(client=redis, visibility_timeout=-1)
+    job_id = queue.enqueue("pdf", {"document_id": "1"}, max_attempts=2)
+    for _ in range(2):
+        assert queue.claim("pdf")["status"] == "running"
+        queue.requeue_expired(["pdf"])
+
+    async def never_called(**payload):
+        raise AssertionError("dead job was run")
+
+    monkeypatch.setattr(worker, "get_job_queue", lambda: queue)
+    monkeypatch.setattr(worker, "get_shared_pipeline", lambda: SimpleNamespace(tenants=None))
+    monkeypatch.setattr(worker, "WORKER_POLL_INTERVAL", 0.01)
+    monkeypatch.setitem(worker.JOB_HANDLERS, "pdf", never_called)
+
+    async def aclose():
+        pass
+
+    monkeypatch.setattr(worker, "aclose_http_clients", aclose)
+    w = worker.Worker({"pdf": 1}, drain_timeout=1)
+
+    asyncio.run(run_then_stop(w, after=0.2, timeout=5))
+
+    db.expire_all()
+    doc = db.query(models.PdfDocument).filter_by(id=1).one()
+    assert doc.processing_status == "failed"
+    assert done == [(("pdf", "1"), "failed", LEASE_EXPIRED_ERROR)]
+    assert queue.get_job(job_id)["status"] == "dead"
@@ -0,0 +1,199 @@
+import logging
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from tokens import count_tokens
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_STRIP_REFERENCES = os.getenv("SUMMARY_STRIP_REFERENCES", "true").lower() == "true"
+# Appendices often hold proofs worth explaining, so they are kept by default
+SUMMARY_STRIP_APPENDICES = os.getenv("SUMMARY_STRIP_APPENDICES", "false").lower() == "true"
+SUMMARY_STRIP_FRONT_MATTER = (
+    os.getenv("SUMMARY_STRIP_FRONT_MATTER", "true").lower() == "true"
+)
+# If cleaning would remove more than this share of the text, a heading was
+# probably misdetected and the text is used unchanged
+SUMMARY_MAX_STRIPPED_RATIO = float(os.getenv("SUMMARY_MAX_STRIPPED_RATIO", 0.6))
+
+# "Page 3:" and "Page 3 - Image 1 (OCR):" markers added by PDFExtractor
+_PAGE_MARKER_RE = re.compile(r"Page \d+(?: - Image \d+ \(OCR\))?:[ \t]*\n")
+# arXiv identifier stamped along the margin of preprints
+_ARXIV_STAMP_RE = re.compile(
+    r"arXiv:\d{4}\.\d{4,5}(?:v\d+)?\s*\[[\w.\-]+\]\s*\d{1,2}\s+\w{3}\s+\d{4}\n?"
+)
+_EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+_BLANK_LINES_RE = re.compile(r"\n\s*\n(?:\s*\n)+")
+
+_ABSTRACT_RE = re.compile(r"^[ \t]*(?:abstract|a\s*b\s*s\s*t\s*r\s*a\s*c\s*t)\b", re.I | re.M)
+_REFERENCES_RE = re.compile(
+    r"^[ \t]*(?:\d+\.?[ \t]*)?(?:references|bibliography|works cited|literature cited)"
+    r"[ \t]*$",
+    re.I | re.M,
+)
+_ACKNOWLEDGEMENTS_RE = re.compile(
+    r"^[ \t]*(?:\d+\.?[ \t]*)?acknowledge?ments?[ \t]*$", re.I | re.M
+)
+# "Appendix", "Appendix A: Proofs", "Supplementary Material" or a lettered
+# heading such as "A Proof of Lemma 1" / "A.1 Setup"; author lines like
+# "A. Vaswani, N. Shazeer" are excluded by the comma and period checks
+_APPENDIX_RE = re.compile(
+    r"^[ \t]*(?:(?i:appendix|appendices|supplementary material)\b[^\n]*"
+    r"|A(?:\.\d+)?[ \t]+[A-Z][^\n,]{2,60}(?<!\.))$",
+    re.M,
+)
+_SECTION_RE = re.compile(
+    r"^[ \t]*(?:\d+\.?|[A-H](?:\.\d+)?)[ \t]+[A-Z][^\n,]{2,80}(?<!\.)$", re.M
+)
+
+# The abstract must start within this many characters for the text before
+# it to be treated as title, authors and affiliations
+_FRONT_MATTER_MAX_CHARS = 5000
+# Back matter headings are only trusted past this point of the document,
+# so a table of contents entry is not mistaken for the real section
+_BACK_MATTER_MIN_POSITION = 0.3
+
+
+@dataclass
+class CleanedText:
+    text: str
+    tokens_before: int
+    tokens_after: int
+    # Characters removed per kind of content
+    removed: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.tokens_before - self.tokens_after
+
+
+def merge_overlapping_chunks(chunks: List[str], probe_chars: int = 64) -> str:
+    """
+    Join consecutive index chunks, dropping the overlap the text splitter
+    repeats at the start of each chunk so it is not summarized twice.
+    """
+    if not chunks:
+        return ""
+
+    parts = [chunks[0]]
+    for previous, chunk in zip(chunks, chunks[1:]):
+        probe = chunk[:probe_chars]
+        start = previous.rfind(probe) if probe else -1
+        # Confirm the whole tail of the previous chunk matches, not just the probe
+        if start > 0 and chunk.startswith(previous[start:]):
+            parts.append(chunk[len(previous) - start :])
+        else:
+            parts.append("\n" + chunk)
+    return "".join(parts)
+
+
+def _back_matter_start(
+    pattern: re.Pattern, text: str, last: bool = True
+) -> Optional[re.Match]:
+    # Headings before _BACK_MATTER_MIN_POSITION are contents entries or
+    # cross references. Of the rest, a single section such as the reference
+    # list is the last match; a run of appendices starts at the first
+    min_start = len(text) * _BACK_MATTER_MIN_POSITION
+    match = None
+    for candidate in pattern.finditer(text):
+        if candidate.start() < min_start:
+            continue
+        match = candidate
+        if not last:
+            break
+    return match
+
+
+def _section_end(text: str, start: int) -> int:
+    ends = [
+        match.start()
+        for match in (
+            pattern.search(text, start)
+            for pattern in (_SECTION_RE, _REFERENCES_RE, _APPENDIX_RE)
+        )
+        if match
+    ]
+    return min(ends, default=len(text))
+
+
+def clean_for_summary(
+    text: str,
+    strip_references: bool = SUMMARY_STRIP_REFERENCES,
+    strip_appendices: bool = SUMMARY_STRIP_APPENDICES,
+    strip_front_matter: bool = SUMMARY_STRIP_FRONT_MATTER,
+    model: Optional[str] = None,
+) -> CleanedText:
+    """
+    Remove content that costs tokens without adding to a paper summary:
+    extraction markers, author and affiliation front matter, acknowledgements,
+    the reference list and, if configured, appendices.
+    """
+    tokens_before = count_tokens(text, model)
+    removed: Dict[str, int] = {}
+
+    def drop(kind: str, start: int, end: int) -> None:
+        nonlocal text
+        removed[kind] = removed.get(kind, 0) + end - start
+        text = text[:start] + text[end:]
+
+    original = text
+    size = len(text)
+    text = _PAGE_MARKER_RE.sub("", text)
+    text = _ARXIV_STAMP_RE.sub("", text)
+    text = _EMAIL_RE.sub("", text)
+    removed["artifacts"] = size - len(text)
+
+    if strip_front_matter:
+        abstract = _ABSTRACT_RE.search(text, 0, _FRONT_MATTER_MAX_CHARS)
+        if abstract:
+            # Keep the title line, drop the author and affiliation block
+            title_end = text.find("\n", 0, abstract.start())
+            if 0 <= title_end < abstract.start():
+                drop("front_matter", title_end + 1, abstract.start())
+
+    if strip_appendices:
+        appendix = _back_matter_start(_APPENDIX_RE, text, last=False)
+        if appendix:
+            # Appendices run to the end of the document, unless the reference
+            # list follows them, which is dropped separately below
+            references = _back_matter_start(_REFERENCES_RE, text)
+            end = len(text)
+            if references and references.start() > appendix.start():
+                end = references.start()
+            drop("appendices", appendix.start(), end)
+
+    if strip_references:
+        references = _back_matter_start(_REFERENCES_RE, text)
+        if references:
+            end = len(text)
+            if not strip_appendices:
+                # Keep appendices that follow the reference list
+                appendix = _APPENDIX_RE.search(text, references.end())
+                end = appendix.start() if appendix else end
+            drop("references", references.start(), end)
+
+    acknowledgements = _back_matter_start(_ACKNOWLEDGEMENTS_RE, text)
+    if acknowledgements:
+        drop(
+            "acknowledgements",
+            acknowledgements.start(),
+            _section_end(text, acknowledgements.end()),
+        )
+
+    text = _BLANK_LINES_RE.sub("\n\n", text).strip()
+
+    if len(text) < len(original) * (1 - SUMMARY_MAX_STRIPPED_RATIO):
+        logger.warning(
+            f"Cleaning would remove {1 - len(text) / len(original):.0%} of the text "
+            f"({removed}); summarizing it unchanged"
+        )
+        return CleanedText(original, tokens_before, tokens_before)
+
+    return CleanedText(
+        text=text,
+        tokens_before=tokens_before,
+        tokens_after=count_tokens(text, model),
+        removed={kind: chars for kind, chars in removed.items() if chars},
+    )
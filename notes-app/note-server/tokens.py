@@ -0,0 +1,72 @@
+import logging
+import os
+import threading
+from typing import Any, Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# tiktoken encoding for models tiktoken has no mapping for (most OpenRouter models)
+TOKEN_ENCODING = os.getenv("TOKEN_ENCODING", "cl100k_base")
+# Estimate used when no tokenizer can be loaded
+CHARS_PER_TOKEN = 4
+
+_encoding_lock = threading.Lock()
+_encodings: Dict[str, Any] = {}
+_failed_encodings: Set[str] = set()
+
+
+def _encoding_name(model: Optional[str]) -> str:
+    if model:
+        try:
+            from tiktoken.model import encoding_name_for_model
+
+            # "openai/gpt-4o-mini" -> "gpt-4o-mini"; ":free" style suffixes dropped
+            return encoding_name_for_model(model.split("/")[-1].split(":")[0])
+        except Exception:
+            # Not an OpenAI model; TOKEN_ENCODING is a close enough stand-in
+            pass
+    return TOKEN_ENCODING
+
+
+def _get_encoding(model: Optional[str] = None):
+    name = _encoding_name(model)
+    with _encoding_lock:
+        if name not in _encodings and name not in _failed_encodings:
+            try:
+                import tiktoken
+
+                _encodings[name] = tiktoken.get_encoding(name)
+            except Exception as e:
+                # The encoding file is downloaded on first use; without it
+                # fall back to an estimate rather than failing the caller
+                logger.warning(
+                    f"Could not load tiktoken encoding {name}, "
+                    f"estimating token counts: {str(e)}"
+                )
+                _failed_encodings.add(name)
+        return _encodings.get(name)
+
+
+def count_tokens(text: Optional[str], model: Optional[str] = None) -> int:
+    """Number of tokens in text, or ~4 characters per token if no tokenizer is available"""
+    if not text:
+        return 0
+    encoding = _get_encoding(model)
+    if encoding is None:
+        return max(1, len(text) // CHARS_PER_TOKEN)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def split_by_tokens(text: str, max_tokens: int, model: Optional[str] = None) -> List[str]:
+    """Cut text into consecutive pieces of at most max_tokens tokens each"""
+    max_tokens = max(1, max_tokens)
+    encoding = _get_encoding(model)
+    if encoding is None:
+        step = max_tokens * CHARS_PER_TOKEN
+        return [text[i : i + step] for i in range(0, len(text), step)]
+
+    tokens = encoding.encode(text, disallowed_special=())
+    return [
+        encoding.decode(tokens[i : i + max_tokens])
+        for i in range(0, len(tokens), max_tokens)
+    ]
@@ -0,0 +1,147 @@
+import logging
+import os
+from dataclasses import dataclass, field
+from typing import List
+
+from weaviate.classes.config import Configure, Reconfigure
+
+logger = logging.getLogger(__name__)
+
+# "none", "pq" (product), "bq" (binary) or "sq" (scalar) quantization of the
+# in-memory vectors; full vectors stay on disk for rescoring
+WEAVIATE_VECTOR_COMPRESSION = os.getenv("WEAVIATE_VECTOR_COMPRESSION", "none").lower()
+# Query-time candidate list size; -1 derives it from the query limit
+WEAVIATE_HNSW_EF = int(os.getenv("WEAVIATE_HNSW_EF", -1))
+# Build-time settings, fixed once the collection exists
+WEAVIATE_HNSW_EF_CONSTRUCTION = int(os.getenv("WEAVIATE_HNSW_EF_CONSTRUCTION", 128))
+WEAVIATE_HNSW_MAX_CONNECTIONS = int(os.getenv("WEAVIATE_HNSW_MAX_CONNECTIONS", 32))
+# PQ segments (bytes per vector); must divide the vector size. 96 bytes
+# against 1536 for 384 float32s; 0 lets Weaviate pick
+WEAVIATE_PQ_SEGMENTS = int(os.getenv("WEAVIATE_PQ_SEGMENTS", 96))
+# Vectors used to fit the PQ/SQ codebook
+WEAVIATE_COMPRESSION_TRAINING_LIMIT = int(
+    os.getenv("WEAVIATE_COMPRESSION_TRAINING_LIMIT", 100000)
+)
+# BQ/SQ candidates re-ranked with full vectors; -1 keeps the server default
+WEAVIATE_RESCORE_LIMIT = int(os.getenv("WEAVIATE_RESCORE_LIMIT", -1))
+
+COMPRESSIONS = ("none", "pq", "bq", "sq")
+
+
+def _optional(value: int):
+    return None if value <= 0 else value
+
+
+@dataclass
+class VectorIndexSettings:
+    """HNSW and quantization settings for a chunk collection"""
+
+    compression: str = field(default_factory=lambda: WEAVIATE_VECTOR_COMPRESSION)
+    ef: int = field(default_factory=lambda: WEAVIATE_HNSW_EF)
+    ef_construction: int = field(default_factory=lambda: WEAVIATE_HNSW_EF_CONSTRUCTION)
+    max_connections: int = field(default_factory=lambda: WEAVIATE_HNSW_MAX_CONNECTIONS)
+    pq_segments: int = field(default_factory=lambda: WEAVIATE_PQ_SEGMENTS)
+    training_limit: int = field(
+        default_factory=lambda: WEAVIATE_COMPRESSION_TRAINING_LIMIT
+    )
+    rescore_limit: int = field(default_factory=lambda: WEAVIATE_RESCORE_LIMIT)
+
+    def __post_init__(self):
+        if self.compression not in COMPRESSIONS:
+            raise ValueError(
+                f"Unknown vector compression {self.compression!r}, "
+                f"expected one of {COMPRESSIONS}"
+            )
+
+    def bytes_per_vector(self, dims: int) -> int:
+        """In-memory size of one vector after quantization"""
+        if self.compression == "pq":
+            # Rough guess when Weaviate picks the segment count
+            return self.pq_segments or dims // 4
+        if self.compression == "bq":
+            return (dims + 7) // 8
+        if self.compression == "sq":
+            return dims
+        return 4 * dims
+
+    def _quantizer(self):
+        if self.compression == "pq":
+            # On an empty collection PQ is trained once training_limit
+            # vectors exist (needs ASYNC_INDEXING on the server)
+            return Configure.VectorIndex.Quantizer.pq(
+                segments=_optional(self.pq_segments),
+                training_limit=self.training_limit,
+            )
+        if self.compression == "bq":
+            return Configure.VectorIndex.Quantizer.bq(
+                rescore_limit=_optional(self.rescore_limit)
+            )
+        if self.compression == "sq":
+            return Configure.VectorIndex.Quantizer.sq(
+                rescore_limit=_optional(self.rescore_limit),
+                training_limit=self.training_limit,
+            )
+        return None
+
+    def create_config(self):
+        """Vector index config for collections.create()"""
+        return Configure.VectorIndex.hnsw(
+            ef=self.ef,
+            ef_construction=self.ef_construction,
+            max_connections=self.max_connections,
+            quantizer=self._quantizer(),
+        )
+
+    def _update_quantizer(self):
+        if self.compression == "pq":
+            return Reconfigure.VectorIndex.Quantizer.pq(
+                segments=_optional(self.pq_segments),
+                training_limit=self.training_limit,
+            )
+        if self.compression == "bq":
+            return Reconfigure.VectorIndex.Quantizer.bq(
+                rescore_limit=_optional(self.rescore_limit)
+            )
+        if self.compression == "sq":
+            return Reconfigure.VectorIndex.Quantizer.sq(
+                rescore_limit=_optional(self.rescore_limit),
+                training_limit=self.training_limit,
+            )
+        return None
+
+    def apply(self, collection) -> List[str]:
+        """
+        Bring an existing collection's index in line with these settings
+        where Weaviate allows it: ef, and turning on quantization (PQ trains
+        on the vectors already stored). Settings fixed at creation are only
+        reported. Returns what was changed.
+        """
+        current = collection.config.get().vector_index_config
+        changed = []
+        update = {}
+        if current.ef != self.ef:
+            update["ef"] = self.ef
+            changed.append(f"ef {current.ef} -> {self.ef}")
+        if current.quantizer is None and self.compression != "none":
+            update["quantizer"] = self._update_quantizer()
+            changed.append(f"compression none -> {self.compression}")
+        elif current.quantizer is not None and self.compression == "none":
+            logger.warning(
+                f"{collection.name} keeps its vector compression; "
+                "it cannot be turned off on an existing collection"
+            )
+
+        for name in ("ef_construction", "max_connections"):
+            if getattr(current, name) != getattr(self, name):
+                logger.warning(
+                    f"{collection.name} was built with {name}="
+                    f"{getattr(current, name)}; {getattr(self, name)} only applies "
+                    "to new collections"
+                )
+
+        if update:
+            collection.config.update(
+                vector_index_config=Reconfigure.VectorIndex.hnsw(**update)
+            )
+            logger.info(f"Updated vector index of {collection.name}: {changed}")
+        return changed
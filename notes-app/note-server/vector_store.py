@@ -0,0 +1,199 @@
+import logging
+import os
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+import weaviate
+from weaviate.classes.query import Filter, MetadataQuery
+from weaviate.util import generate_uuid5
+
+from tenants import TenantManager
+
+logger = logging.getLogger(__name__)
+
+# "weaviate" (server) or "embedded" (in-process NumPy/SQLite, no server)
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "weaviate").lower()
+# Objects per gRPC batch request when writing chunks to Weaviate
+WEAVIATE_BATCH_SIZE = int(os.getenv("WEAVIATE_BATCH_SIZE", 100))
+
+
+@dataclass
+class SearchScope:
+    """
+    Chunks a search may return: those of `doc_ids` (any document if None)
+    that belong to `user_id` (any user if None). A search over several
+    scopes returns chunks matching any of them.
+    """
+
+    doc_ids: Optional[List[str]] = None
+    user_id: Optional[str] = None
+
+
+class ChunkStore(ABC):
+    """
+    Storage and retrieval of document chunks with their embeddings, as used
+    by RAGPipeline. Methods are blocking; async callers run them in a
+    thread. Search results are dicts with doc_id, chunk_id, content and
+    score, best first.
+    """
+
+    # True when chunks are partitioned by owner, so reads and deletes need
+    # the chunks' user_id and each search scope must name one
+    scoped_by_user = False
+
+    @abstractmethod
+    def insert(
+        self,
+        doc_id: str,
+        chunks: List[str],
+        embeddings: List[List[float]],
+        properties: Dict[str, Any],
+    ) -> int:
+        """Store a document's chunks (replacing earlier ones); returns how many"""
+
+    @abstractmethod
+    def fetch(
+        self,
+        doc_id: Optional[str] = None,
+        user_id: Optional[str] = None,
+        limit: int = 100,
+    ) -> List[Dict[str, Any]]:
+        """Stored properties (including content) of a document's chunks"""
+
+    @abstractmethod
+    def delete(self, doc_id: str, user_id: Optional[str] = None) -> None:
+        """Remove every chunk of a document"""
+
+    @abstractmethod
+    def search(
+        self,
+        query_text: str,
+        query_embedding: List[float],
+        scopes: List[SearchScope],
+        top_k: int,
+        alpha: float = 0.5,
+    ) -> List[Dict[str, Any]]:
+        """
+        Hybrid search: alpha 1 ranks by vector similarity only, 0 by
+        keyword (BM25) score only
+        """
+
+    def close(self) -> None:
+        pass
+
+
+class WeaviateChunkStore(ChunkStore):
+    """Chunks in a Weaviate collection, optionally one tenant per user"""
+
+    def __init__(
+        self,
+        get_client: Callable[[], weaviate.WeaviateClient],
+        class_name: str,
+        tenants: Optional[TenantManager] = None,
+    ):
+        self._get_client = get_client
+        self.class_name = class_name
+        self.tenants = tenants
+        self.scoped_by_user = tenants is not None
+
+    def _collection(self, user_id: Optional[str] = None):
+        """Chunk collection, scoped to the owner's tenant in multi-tenant mode"""
+        if self.tenants is None:
+            return self._get_client().collections.get(self.class_name)
+        if not user_id:
+            raise ValueError("user_id is required to reach chunks in multi-tenant mode")
+        return self.tenants.collection(user_id)
+
+    def _filter(self, scope: SearchScope):
+        filters = None
+        if scope.doc_ids:
+            if len(scope.doc_ids) == 1:
+                filters = Filter.by_property("doc_id").equal(scope.doc_ids[0])
+            else:
+                filters = Filter.by_property("doc_id").contains_any(scope.doc_ids)
+        # A tenant holds only its user's chunks
+        if scope.user_id and self.tenants is None:
+            user_filter = Filter.by_property("user_id").equal(scope.user_id)
+            filters = user_filter if filters is None else filters & user_filter
+        return filters
+
+    def insert(self, doc_id, chunks, embeddings, properties) -> int:
+        """Write chunks with their vectors through the Weaviate gRPC batch API"""
+        collection = self._collection(properties.get("user_id"))
+        with collection.batch.fixed_size(batch_size=WEAVIATE_BATCH_SIZE) as batch:
+            for i, (chunk, vector) in enumerate(zip(chunks, embeddings)):
+                batch.add_object(
+                    properties={**properties, "content": chunk, "chunk_id": i},
+                    uuid=generate_uuid5(f"{doc_id}_{i}"),
+                    vector=vector,
+                )
+
+        failed = collection.batch.failed_objects
+        for failure in failed[:5]:
+            logger.error(f"Error inserting chunk for doc_id {doc_id}: {failure.message}")
+
+        # The uuids above overwrote the earlier chunks with the same index;
+        # drop the ones past the end of a now shorter document
+        collection.data.delete_many(
+            where=Filter.by_property("doc_id").equal(doc_id)
+            & Filter.by_property("chunk_id").greater_or_equal(len(chunks))
+        )
+        return len(chunks) - len(failed)
+
+    def fetch(self, doc_id=None, user_id=None, limit=100):
+        filters = None
+        if doc_id is not None:
+            filters = Filter.by_property("doc_id").equal(doc_id)
+        response = self._collection(user_id).query.fetch_objects(
+            limit=limit, filters=filters
+        )
+        return [obj.properties for obj in response.objects]
+
+    def delete(self, doc_id, user_id=None) -> None:
+        self._collection(user_id).data.delete_many(
+            where=Filter.by_property("doc_id").equal(doc_id)
+        )
+
+    def search(self, query_text, query_embedding, scopes, top_k, alpha=0.5):
+        if self.tenants is not None and len(scopes) > 1:
+            # One search per tenant, merged by score. Fusion scores are
+            # normalized per search, so the merged order is approximate
+            hits = [
+                hit
+                for scope in scopes
+                for hit in self.search(
+                    query_text, query_embedding, [scope], top_k, alpha
+                )
+            ]
+            hits.sort(key=lambda hit: hit["score"], reverse=True)
+            return hits[:top_k]
+
+        filters = None
+        for scope in scopes:
+            scope_filter = self._filter(scope)
+            if scope_filter is None:
+                # This scope matches every chunk
+                filters = None
+                break
+            filters = scope_filter if filters is None else filters | scope_filter
+
+        user_id = scopes[0].user_id if scopes else None
+        response = self._collection(user_id).query.hybrid(
+            query=query_text,
+            vector=query_embedding,
+            alpha=alpha,
+            limit=top_k,
+            filters=filters,
+            return_properties=["doc_id", "chunk_id", "content"],
+            return_metadata=MetadataQuery(score=True),
+        )
+        return [
+            {
+                "doc_id": obj.properties["doc_id"],
+                "chunk_id": int(obj.properties.get("chunk_id") or 0),
+                "content": obj.properties["content"],
+                "score": float(obj.metadata.score or 0.0),
+            }
+            for obj in response.objects
+        ]
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Ingestion worker: runs queued PDF and video jobs outside the API process.
+
+Each job type has its own concurrency limit, so a burst of slow video
+jobs cannot starve PDF ingestion. On SIGTERM/SIGINT the worker stops
+claiming, lets in-flight jobs finish for up to --drain-timeout seconds
+and hands any still running back to the queue for another worker.
+
+Usage: python worker.py [--pdf-concurrency N] [--video-concurrency N]
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import signal
+from typing import Dict
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from embedded_store import EmbeddedChunkStore
+from http_clients import aclose_http_clients
+from ingest_tasks import fail_document, process_pdf_background, process_video_background
+from job_queue import get_job_queue
+from RAG import close_shared_pipeline, get_shared_pipeline
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+JOB_HANDLERS = {
+    "pdf": process_pdf_background,
+    "video": process_video_background,
+}
+
+WORKER_PDF_CONCURRENCY = int(os.getenv("WORKER_PDF_CONCURRENCY", 2))
+WORKER_VIDEO_CONCURRENCY = int(os.getenv("WORKER_VIDEO_CONCURRENCY", 1))
+WORKER_POLL_INTERVAL = float(os.getenv("WORKER_POLL_INTERVAL", 1.0))
+WORKER_DRAIN_TIMEOUT = float(os.getenv("WORKER_DRAIN_TIMEOUT", 120))
+# How often idle Weaviate tenants are deactivated (multi-tenant mode only)
+WORKER_TENANT_OFFLOAD_INTERVAL = float(os.getenv("WORKER_TENANT_OFFLOAD_INTERVAL", 600))
+# How often the embedded store is checked for needing an IVF index
+WORKER_IVF_CHECK_INTERVAL = float(os.getenv("WORKER_IVF_CHECK_INTERVAL", 300))
+
+
+class Worker:
+    def __init__(self, concurrency: Dict[str, int], drain_timeout: float):
+        self.queue = get_job_queue()
+        self.concurrency = concurrency
+        self.drain_timeout = drain_timeout
+        self._stopping = asyncio.Event()
+        self._running: Dict[asyncio.Task, dict] = {}
+
+    def stop(self) -> None:
+        if not self._stopping.is_set():
+            logger.info("Shutdown requested, draining in-flight jobs")
+            self._stopping.set()
+
+    async def _sleep(self, seconds: float) -> None:
+        # Returns early when shutdown starts
+        try:
+            await asyncio.wait_for(self._stopping.wait(), seconds)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _acquire(self, slots: asyncio.Semaphore) -> bool:
+        """Take a free slot; returns False instead if shutdown starts first"""
+        acquire = asyncio.create_task(slots.acquire())
+        stopping = asyncio.create_task(self._stopping.wait())
+        await asyncio.wait({acquire, stopping}, return_when=asyncio.FIRST_COMPLETED)
+        stopping.cancel()
+        if not acquire.done():
+            acquire.cancel()
+            await asyncio.gather(acquire, return_exceptions=True)
+        if acquire.cancelled() or acquire.exception() is not None:
+            return False
+        if self._stopping.is_set():
+            slots.release()
+            return False
+        return True
+
+    async def _heartbeat(self, job: dict) -> None:
+        interval = self.queue.visibility_timeout / 3
+        while True:
+            await asyncio.sleep(interval)
+            await asyncio.to_thread(self.queue.heartbeat, job)
+
+    async def _fail_document(self, job: dict, error: str) -> None:
+        """The job is out of attempts: fail its document and end the progress stream"""
+        document_id = job["payload"].get("document_id")
+        if not document_id:
+            return
+        try:
+            await fail_document(job["type"], document_id, error)
+        except Exception as e:
+            logger.error(f"Failed to mark {job['type']} {document_id} failed: {str(e)}")
+
+    async def _run_job(self, job: dict) -> None:
+        handler = JOB_HANDLERS[job["type"]]
+        heartbeat = asyncio.create_task(self._heartbeat(job))
+        logger.info(
+            f"Running {job['type']} job {job['id']} "
+            f"(attempt {job['attempts']}/{job['max_attempts']})"
+        )
+        try:
+            await handler(**job["payload"])
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            if not await asyncio.to_thread(self.queue.fail, job, str(e)):
+                await self._fail_document(job, str(e))
+        else:
+            await asyncio.to_thread(self.queue.ack, job)
+            logger.info(f"Completed {job['type']} job {job['id']}")
+        finally:
+            heartbeat.cancel()
+
+    async def _consume(self, job_type: str, limit: int) -> None:
+        slots = asyncio.Semaphore(limit)
+        while not self._stopping.is_set():
+            # With every slot busy this would otherwise block past shutdown
+            if not await self._acquire(slots):
+                break
+            try:
+                job = await asyncio.to_thread(self.queue.claim, job_type)
+            except Exception as e:
+                logger.error(f"Failed to claim {job_type} job: {str(e)}")
+                job = None
+            if job is None:
+                slots.release()
+                await self._sleep(WORKER_POLL_INTERVAL)
+                continue
+            if job["status"] == "dead":
+                # Its worker died on every attempt; the handler never ran
+                slots.release()
+                await self._fail_document(job, job["error"])
+                continue
+
+            task = asyncio.create_task(self._run_job(job))
+            self._running[task] = job
+            task.add_done_callback(lambda t: (self._running.pop(t, None), slots.release()))
+
+    async def _requeue_loop(self) -> None:
+        job_types = list(self.concurrency)
+        while not self._stopping.is_set():
+            try:
+                await asyncio.to_thread(self.queue.requeue_expired, job_types)
+            except Exception as e:
+                logger.error(f"Failed to requeue expired jobs: {str(e)}")
+            await self._sleep(WORKER_POLL_INTERVAL * 5)
+
+    async def _offload_loop(self) -> None:
+        tenants = get_shared_pipeline().tenants
+        if tenants is None:
+            return
+        while not self._stopping.is_set():
+            try:
+                await asyncio.to_thread(tenants.offload_idle)
+            except Exception as e:
+                logger.error(f"Failed to offload idle tenants: {str(e)}")
+            await self._sleep(WORKER_TENANT_OFFLOAD_INTERVAL)
+
+    async def _ivf_loop(self) -> None:
+        # Built here rather than inside an insert, so neither ingestion
+        # nor API searches wait on k-means
+        store = getattr(get_shared_pipeline(), "store", None)
+        if not isinstance(store, EmbeddedChunkStore):
+            return
+        while not self._stopping.is_set():
+            try:
+                if await asyncio.to_thread(store.needs_ivf):
+                    await asyncio.to_thread(store.build_ivf)
+            except Exception as e:
+                logger.error(f"Failed to build IVF index: {str(e)}")
+            await self._sleep(WORKER_IVF_CHECK_INTERVAL)
+
+    async def _drain(self) -> None:
+        if not self._running:
+            return
+        logger.info(f"Waiting up to {self.drain_timeout}s for {len(self._running)} jobs")
+        _, pending = await asyncio.wait(list(self._running), timeout=self.drain_timeout)
+        for task in pending:
+            job = self._running.get(task)
+            task.cancel()
+            if job is not None:
+                logger.warning(f"Returning unfinished {job['type']} job {job['id']} to the queue")
+                await asyncio.to_thread(self.queue.release, job)
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, self.stop)
+
+        # Load the embedding model and Weaviate client before taking jobs
+        await asyncio.to_thread(get_shared_pipeline)
+
+        logger.info(f"Worker started with concurrency {self.concurrency}")
+        await asyncio.gather(
+            self._requeue_loop(),
+            self._offload_loop(),
+            self._ivf_loop(),
+            *(self._consume(job_type, limit) for job_type, limit in self.concurrency.items()),
+        )
+        await self._drain()
+        await aclose_http_clients()
+        logger.info("Worker stopped")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pdf-concurrency", type=int, default=WORKER_PDF_CONCURRENCY)
+    parser.add_argument("--video-concurrency", type=int, default=WORKER_VIDEO_CONCURRENCY)
+    parser.add_argument("--drain-timeout", type=float, default=WORKER_DRAIN_TIMEOUT)
+    args = parser.parse_args()
+
+    concurrency = {"pdf": args.pdf_concurrency, "video": args.video_concurrency}
+    worker = Worker(
+        {job_type: limit for job_type, limit in concurrency.items() if limit > 0},
+        args.drain_timeout,
+    )
+    try:
+        asyncio.run(worker.run())
+    finally:
+        close_shared_pipeline()
+
+
+if __name__ == "__main__":
+    main()
@@ -56,8 +56,8 @@ echo "Building and pushing Docker image..."
 docker build -t gcr.io/$PROJECT_ID/notes-app:latest ./note-server
 docker push gcr.io/$PROJECT_ID/notes-app:latest
 
-# Update deployment file with project ID
-sed -i "s/YOUR_PROJECT_ID/$PROJECT_ID/g" k8s/fastapi-deployment.yaml
+# Update deployment files with project ID
+sed -i "s/YOUR_PROJECT_ID/$PROJECT_ID/g" k8s/fastapi-deployment.yaml k8s/migrate-job.yaml
 
 # Deploy Weaviate
 echo "Deploying Weaviate..."
@@ -67,13 +67,21 @@ kubectl apply -f k8s/weaviate-deployment.yaml
 echo "Waiting for Weaviate to be ready..."
 kubectl wait --for=condition=ready pod -l app=weaviate -n notes-app --timeout=300s
 
-# Deploy FastAPI
-echo "Deploying FastAPI..."
+# Migrate the database before any new API or worker pod starts. Jobs are
+# immutable, so the previous run is replaced
+echo "Running database migration..."
+kubectl delete job migrate -n notes-app --ignore-not-found=true
+kubectl apply -f k8s/migrate-job.yaml
+kubectl wait --for=condition=complete job/migrate -n notes-app --timeout=300s
+
+# Deploy FastAPI and the ingestion worker
+echo "Deploying FastAPI and worker..."
 kubectl apply -f k8s/fastapi-deployment.yaml
 
 # Wait for deployment
-echo "Waiting for FastAPI deployment..."
+echo "Waiting for FastAPI and worker deployments..."
 kubectl wait --for=condition=available deployment/fastapi -n notes-app --timeout=300s
+kubectl wait --for=condition=available deployment/worker -n notes-app --timeout=300s
 
 # Get external IPs
 echo "Getting service URLs..."
@@ -82,5 +90,5 @@ kubectl get services -n notes-app
 echo "Deployment complete!"
 echo "Next steps:"
 echo "1. Create secrets: kubectl create secret generic app-secrets --from-env-file=.env.gcp -n notes-app"
-echo "2. Update Redis URL in fastapi-deployment.yaml with Memorystore IP"
-echo "3. Restart FastAPI deployment: kubectl rollout restart deployment/fastapi -n notes-app"
\ No newline at end of file
+echo "2. Update Redis URL in fastapi-deployment.yaml (FastAPI and worker) with Memorystore IP"
+echo "3. Restart the deployments: kubectl rollout restart deployment/fastapi deployment/worker -n notes-app"
\ No newline at end of file
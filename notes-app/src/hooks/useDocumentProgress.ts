@@ -0,0 +1,48 @@
+import { useEffect, useRef, useState } from 'react';
+import { DocumentKind, stageLabel, subscribeToProgress } from '../services/progressService';
+
+export interface DocumentProgress {
+  stage?: string;
+  summary?: string;
+}
+
+// Follows the processing of the given documents over SSE. Returns each
+// one's current stage label and the summary streamed so far, which stays
+// after the document finishes; onDone is called with its final status.
+export const useDocumentProgress = (
+  kind: DocumentKind,
+  docIds: string[],
+  onDone: (docId: string, status: string) => void
+) => {
+  const [progress, setProgress] = useState<{ [docId: string]: DocumentProgress }>({});
+  const onDoneRef = useRef(onDone);
+  onDoneRef.current = onDone;
+
+  // Resubscribe only when the set of documents changes
+  const key = docIds.join(',');
+
+  useEffect(() => {
+    if (!key) {
+      return;
+    }
+    const update = (docId: string, change: DocumentProgress) =>
+      setProgress(prev => ({ ...prev, [docId]: { ...prev[docId], ...change } }));
+
+    const unsubscribers = key.split(',').map(docId =>
+      subscribeToProgress(kind, docId, {
+        onStage: (stage, data) => update(docId, { stage: stageLabel(stage, data) }),
+        onSummary: (summary) => update(docId, { summary }),
+        onDone: (status) => {
+          // Keep the streamed summary on screen; only the stage is over
+          update(docId, { stage: undefined });
+          onDoneRef.current(docId, status);
+        },
+      })
+    );
+    return () => unsubscribers.forEach(unsubscribe => unsubscribe());
+  }, [kind, key]);
+
+  return progress;
+};
+
+export default useDocumentProgress;
@@ -2,6 +2,7 @@ import React, { useState, useEffect } from 'react';
 import { useNavigate } from 'react-router-dom';
 import { jwtDecode } from 'jwt-decode';
 import axiosClient from "../services/axiosInstance";
+import { useDocumentProgress } from "../hooks/useDocumentProgress";
 import '../styles/collection.css';
 import { Card, CardContent, CardHeader, CardTitle } from "../ui/card";
 import { Button } from "../ui/button";
@@ -69,6 +70,18 @@ export function CollectionPage() {
     }
   }, [userId]);
 
+  // Follow documents still processing over SSE instead of re-fetching the list
+  const progress = useDocumentProgress(
+    'pdf',
+    pdfs
+      .filter(pdf => !['completed', 'failed'].includes(pdf.processing_status))
+      .map(pdf => String(pdf.id)),
+    (pdfId, status) =>
+      setPdfs(prev =>
+        prev.map(pdf => (String(pdf.id) === pdfId ? { ...pdf, processing_status: status } : pdf))
+      )
+  );
+
   const fetchPdfs = async () => {
     setLoading(true);
     try {
@@ -180,7 +193,12 @@ export function CollectionPage() {
                     color: pdf.processing_status === 'completed' ? '#007bff' : '#666',
                   }}
                 >
-                  {pdf.file_name} {pdf.processing_status !== 'completed' && '(Processing...)'}
+                  {pdf.file_name}{' '}
+                  {pdf.processing_status !== 'completed' &&
+                    `(${progress[pdf.id]?.stage || (pdf.processing_status === 'failed' ? 'Failed' : 'Processing...')})`}
+                  {progress[pdf.id]?.summary && (
+                    <p className="streamed-summary">{progress[pdf.id].summary}</p>
+                  )}
                 </div>
                 {pdf.processing_status === 'completed' && (
                   <div className="pdf-actions">
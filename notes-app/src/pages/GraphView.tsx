@@ -4,6 +4,7 @@ import React, { useState, useEffect } from 'react';
 import { useNavigate } from 'react-router-dom';
 import { jwtDecode } from 'jwt-decode';
 import axiosClient from "../services/axiosInstance";
+import { useDocumentProgress } from "../hooks/useDocumentProgress";
 import { Network } from 'vis-network';
 import { DataSet } from 'vis-data';
 import '../styles/graphView.css';
@@ -74,6 +75,19 @@ export function GraphViewPage() {
     }
   }, [userId]);
 
+  // Follow documents still processing over SSE instead of re-fetching the
+  // list. Progress is kept apart from pdfs so streamed tokens don't rebuild
+  // the network
+  const processing = pdfs.filter(pdf => !['completed', 'failed'].includes(pdf.processing_status));
+  const progress = useDocumentProgress(
+    'pdf',
+    processing.map(pdf => String(pdf.id)),
+    (pdfId, status) =>
+      setPdfs(prev =>
+        prev.map(pdf => (String(pdf.id) === pdfId ? { ...pdf, processing_status: status } : pdf))
+      )
+  );
+
   const fetchPdfs = async () => {
     setLoading(true);
     try {
@@ -219,6 +233,18 @@ export function GraphViewPage() {
   return (
     <div className="graph-view-page">
       <h1>Research Paper Connections</h1>
+      {processing.length > 0 && (
+        <ul className="processing-list">
+          {processing.map(pdf => (
+            <li key={pdf.id} className="processing-item">
+              <strong>{pdf.file_name}</strong> ({progress[pdf.id]?.stage || 'Processing...'})
+              {progress[pdf.id]?.summary && (
+                <p className="streamed-summary">{progress[pdf.id].summary}</p>
+              )}
+            </li>
+          ))}
+        </ul>
+      )}
       <div className="graph-container" ref={networkRef}></div>
     </div>
   );
@@ -0,0 +1,127 @@
+const API_URL = process.env.REACT_APP_API_URL || 'http://localhost:8000';
+
+export type DocumentKind = 'pdf' | 'video';
+
+export interface ProgressHandlers {
+  onStage?: (stage: string, data: any) => void;
+  // The summary generated so far, re-sent whenever streamed tokens add to it
+  onSummary?: (summary: string) => void;
+  onDone?: (status: string, error?: string) => void;
+}
+
+const STAGE_LABELS: { [stage: string]: string } = {
+  queued: 'Queued',
+  processing: 'Starting',
+  deduplicated: 'Already in your library, reusing its results',
+  downloaded: 'Downloaded',
+  extracted: 'Text extracted',
+  chunked: 'Split into passages',
+  embedded: 'Embedded',
+  indexed: 'Indexed',
+  summarizing: 'Summarizing',
+  failed: 'Attempt failed',
+};
+
+export const stageLabel = (stage: string, data: any = {}): string => {
+  const label = STAGE_LABELS[stage] || stage;
+  return data.chunks ? `${label} (${data.chunks} chunks)` : label;
+};
+
+// Rebuilds the summary from streamed events: per-chunk tokens while chunks
+// are summarized, then the combined summary once its tokens start arriving
+const summaryAssembler = (onSummary: (summary: string) => void) => {
+  const chunks = new Map<number, string>();
+  let combined = '';
+
+  const render = () => {
+    if (combined) {
+      onSummary(combined);
+      return;
+    }
+    const ordered = Array.from(chunks.entries()).sort(([a], [b]) => a - b);
+    onSummary(ordered.map(([, text]) => text).join('\n\n'));
+  };
+
+  return (event: string, data: any) => {
+    const chunk = data.chunk ?? 0;
+    switch (event) {
+      case 'token':
+        chunks.set(chunk, (chunks.get(chunk) || '') + data.text);
+        break;
+      case 'chunk_done':
+        chunks.set(chunk, data.summary);
+        break;
+      case 'reduce_token':
+        combined += data.text;
+        break;
+      case 'reduce_done':
+        combined = data.summary;
+        break;
+      case 'stage':
+        // A retried job starts its summary over
+        if (data.stage !== 'processing') {
+          return;
+        }
+        chunks.clear();
+        combined = '';
+        break;
+      case 'chunk_reset':
+        // A failed attempt is retried from scratch
+        if (data.event === 'reduce_token') {
+          combined = '';
+        } else {
+          chunks.delete(chunk);
+        }
+        break;
+      default:
+        return;
+    }
+    render();
+  };
+};
+
+const SUMMARY_EVENTS = ['token', 'chunk_done', 'reduce_token', 'reduce_done', 'chunk_reset'];
+
+// Subscribes to a document's processing events over server-sent events.
+// EventSource cannot send an Authorization header, so the JWT goes in the
+// query string. It reconnects on its own and resumes from the last event.
+// Returns a function that closes the stream.
+export const subscribeToProgress = (
+  kind: DocumentKind,
+  docId: string,
+  handlers: ProgressHandlers
+): (() => void) => {
+  const token = localStorage.getItem('access_token');
+  const query = token ? `?token=${encodeURIComponent(token)}` : '';
+  const source = new EventSource(`${API_URL}/${kind}/${docId}/events${query}`);
+
+  const assemble = handlers.onSummary ? summaryAssembler(handlers.onSummary) : null;
+
+  source.addEventListener('stage', (event) => {
+    const data = JSON.parse((event as MessageEvent).data);
+    assemble?.('stage', data);
+    handlers.onStage?.(data.stage, data);
+  });
+
+  if (assemble) {
+    SUMMARY_EVENTS.forEach((name) =>
+      source.addEventListener(name, (event) =>
+        assemble(name, JSON.parse((event as MessageEvent).data))
+      )
+    );
+  }
+
+  source.addEventListener('done', (event) => {
+    const data = JSON.parse((event as MessageEvent).data);
+    source.close();
+    handlers.onDone?.(data.status, data.error);
+  });
+
+  source.onerror = () => {
+    if (source.readyState === EventSource.CLOSED) {
+      console.error(`Progress stream for ${kind} ${docId} closed`);
+    }
+  };
+
+  return () => source.close();
+};